@@ -12,5 +12,9 @@ python manage.py collectstatic --noinput
 # Run migrations
 python manage.py migrate --noinput
 
+# Copy user fields into CV profiles saved before they were stored there;
+# listings hide profiles without them
+python manage.py backfill_profile_users --missing-only || echo "Skipped profile user backfill (MongoDB unreachable); it runs again on release"
+
 echo "Build complete!"
 
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class CvExtractionConfig(AppConfig):
+    name = 'cv_extraction'
+
+    def ready(self):
+        from . import signals  # noqa: F401 - registers the user sync receivers
+
+        if settings.MONGODB_ENSURE_INDEXES_ON_STARTUP:
+            from .mongo_indexes import ensure_indexes_in_background
+            ensure_indexes_in_background()
@@ -0,0 +1,97 @@
+"""
+Process-wide Cohere client with keep-alive connection pooling.
+"""
+import os
+import threading
+import logging
+from typing import Optional
+
+import cohere
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CohereClientManager:
+    """
+    Singleton Cohere client shared by all CVExtractor instances in a process.
+
+    The client wraps a pooled ``httpx.Client`` so back-to-back extractions
+    reuse the open HTTPS connection instead of paying a new TLS handshake.
+    Connection pools must not be shared across ``fork()`` (gunicorn workers),
+    so the client is rebuilt whenever it is used from a different process.
+    """
+    _client: Optional[cohere.Client] = None
+    _httpx_client: Optional[httpx.Client] = None
+    _pid: Optional[int] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_client(cls) -> cohere.Client:
+        """Get the Cohere client for this process, creating it on first use."""
+        pid = os.getpid()
+        if cls._client is None or cls._pid != pid:
+            with cls._lock:
+                if cls._client is None or cls._pid != pid:
+                    if cls._pid is not None and cls._pid != pid:
+                        # Inherited from the parent process - drop without
+                        # closing, the sockets still belong to the parent
+                        cls._client = None
+                        cls._httpx_client = None
+                    cls._create_client()
+                    cls._pid = pid
+        return cls._client
+
+    @classmethod
+    def _create_client(cls):
+        api_key = settings.COHERE_API_KEY
+        if not api_key:
+            raise ValueError("COHERE_API_KEY not set in settings")
+
+        timeout = httpx.Timeout(
+            settings.COHERE_TIMEOUT_SECONDS,
+            connect=settings.COHERE_CONNECT_TIMEOUT_SECONDS,
+        )
+        limits = httpx.Limits(
+            max_connections=settings.COHERE_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.COHERE_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.COHERE_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        cls._httpx_client = httpx.Client(timeout=timeout, limits=limits)
+        cls._client = cohere.Client(
+            api_key,
+            timeout=settings.COHERE_TIMEOUT_SECONDS,
+            httpx_client=cls._httpx_client,
+        )
+        logger.info(f'Cohere client created for process {os.getpid()}')
+
+    @classmethod
+    def close_client(cls):
+        """Close the pooled connections of this process's client."""
+        with cls._lock:
+            if cls._httpx_client is not None and cls._pid == os.getpid():
+                try:
+                    cls._httpx_client.close()
+                except Exception:
+                    pass
+            cls._client = None
+            cls._httpx_client = None
+            cls._pid = None
+
+    @classmethod
+    def reset_client(cls):
+        """Reset the Cohere client (useful after connection errors)."""
+        cls.close_client()
+
+
+def _reset_after_fork():
+    # The lock may have been held by another thread at fork time
+    CohereClientManager._lock = threading.Lock()
+    CohereClientManager._client = None
+    CohereClientManager._httpx_client = None
+    CohereClientManager._pid = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
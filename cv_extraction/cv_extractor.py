@@ -1,49 +1,50 @@
 """
 CV extraction service using Cohere API.
 """
-import os
-import cohere
+import time
 from typing import Optional
-import PyPDF2
-from docx import Document
-from io import BytesIO
 from django.conf import settings
 from .schemas import CVExtract
+from . import parsing_pool
+from .cohere_client import CohereClientManager
+from .model_registry import model_registry, classify_model_error
+from .rate_limiter import cohere_rate_limiter
+from .prompt_compaction import compact_cv_text
+from .local_extractor import extract_fast_fields, extract_fallback_fields, extract_offline
+from .extraction_cache import (
+    extraction_cache, hash_file_content, hash_cv_text, LEVEL_FILE, LEVEL_TEXT
+)
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields requested from Cohere, with the type description used in the prompt
+CV_FIELD_SCHEMA = [
+    ('full_name', '"string or null"'),
+    ('email', '"string or null"'),
+    ('phone', '"string or null"'),
+    ('summary', '"string or null"'),
+    ('skills', '["array of strings - each skill as a simple string"]'),
+    ('education', """["array of strings - each education entry as a single string like 'Degree - Institution - Year'"]"""),
+    ('experience', """["array of strings - each experience as a single string like 'Position - Company - Description'"]"""),
+    ('certifications', '["array of strings - each certification as a single string"]'),
+    ('languages', '["array of strings - each language as a simple string"]'),
+    ('gpa', '"float or null"'),
+    ('major', '"string or null"'),
+]
 
 
 class CVExtractor:
     """CV extraction using Cohere API."""
     
-    def __init__(self):
-        api_key = settings.COHERE_API_KEY
-        if not api_key:
-            raise ValueError("COHERE_API_KEY not set in settings")
-        self.client = cohere.Client(api_key)
-    
-    def extract_text_from_pdf(self, file_content: bytes) -> str:
-        """Extract text from PDF file."""
-        try:
-            pdf_file = BytesIO(file_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
-        except Exception as e:
-            raise ValueError(f"Error extracting text from PDF: {str(e)}")
-    
-    def extract_text_from_docx(self, file_content: bytes) -> str:
-        """Extract text from DOCX file."""
-        try:
-            docx_file = BytesIO(file_content)
-            doc = Document(docx_file)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
-        except Exception as e:
-            raise ValueError(f"Error extracting text from DOCX: {str(e)}")
+    def __init__(self, cache=extraction_cache):
+        # Shared per-process client - reuses pooled keep-alive connections
+        if settings.EXTRACTION_OFFLINE_MODE == 'always':
+            self.client = None
+        else:
+            self.client = CohereClientManager.get_client()
+        self.cache = cache
     
     def _normalize_extracted_data(self, data: dict) -> dict:
         """
@@ -97,40 +98,42 @@ class CVExtractor:
         return normalized
     
     def extract_text(self, file_content: bytes, filename: str) -> str:
-        """Extract text from file based on extension."""
-        filename_lower = filename.lower()
-        if filename_lower.endswith('.pdf'):
-            return self.extract_text_from_pdf(file_content)
-        elif filename_lower.endswith('.docx') or filename_lower.endswith('.doc'):
-            return self.extract_text_from_docx(file_content)
-        else:
-            raise ValueError(f"Unsupported file type: {filename}")
+        """
+        Extract text from file based on extension.
+        
+        Parsing runs in the out-of-process parsing pool; pages are streamed
+        and parsing stops once the character, page or CPU budget is reached.
+        """
+        return parsing_pool.extract_text(file_content, filename)
     
-    def extract_cv_data(self, cv_text: str) -> CVExtract:
+    def extract_cv_data(
+        self,
+        cv_text: str,
+        known_fields: Optional[dict] = None,
+        fallback_fields: Optional[dict] = None,
+    ) -> CVExtract:
         """
         Extract structured CV data using Cohere Chat API.
         
         Args:
             cv_text: Raw text extracted from CV file
+            known_fields: Fields already extracted locally; they are left out
+                of the prompt schema and merged into the result
+            fallback_fields: Uncertain local values; still requested from
+                Cohere and only used when its answer is empty
         
         Returns:
             CVExtract object with structured data
         """
-        preamble = """You are an expert at extracting structured information from CVs and resumes. 
+        known_fields = known_fields or {}
+        requested = [(field, description) for field, description in CV_FIELD_SCHEMA if field not in known_fields]
+        schema = ',\n'.join(f'  "{field}": {description}' for field, description in requested)
+        
+        preamble = f"""You are an expert at extracting structured information from CVs and resumes. 
 Extract the following information and return ONLY valid JSON matching this exact schema:
-{
-  "full_name": "string or null",
-  "email": "string or null",
-  "phone": "string or null",
-  "summary": "string or null",
-  "skills": ["array of strings - each skill as a simple string"],
-  "education": ["array of strings - each education entry as a single string like 'Degree - Institution - Year'"],
-  "experience": ["array of strings - each experience as a single string like 'Position - Company - Description'"],
-  "certifications": ["array of strings - each certification as a single string"],
-  "languages": ["array of strings - each language as a simple string"],
-  "gpa": "float or null",
-  "major": "string or null"
-}
+{{
+{schema}
+}}
 
 IMPORTANT: All array fields (skills, education, experience, certifications, languages) must contain ONLY strings, NOT objects or dictionaries.
 Each array item should be a single string value.
@@ -146,32 +149,30 @@ Return ONLY the JSON object matching the schema above."""
         try:
             # Use Chat API instead of Generate API (migrated from deprecated Generate API)
             # Cohere Chat API uses: message (user input), preamble (system instructions)
-            # Try available models - use current models that haven't been deprecated
-            # As of Nov 2025, command-r and command-r-plus were removed
-            # Try newer models first
-            available_models = [
-                'command-r7b-12-2024',  # Latest R7B model (Dec 2024)
-                'command',              # Basic command model (should still be available)
-            ]
-            
+            # Models come from COHERE_MODELS in preference order; the registry skips
+            # models whose circuit breaker is open (removed or repeatedly failing)
             response = None
             last_error = None
             
-            for model in available_models:
+            for model in model_registry.available_models():
                 try:
-                    response = self.client.chat(
+                    # Waits for a slot in the shared rate limit, retries 429/5xx with backoff
+                    response = cohere_rate_limiter.call(
+                        self.client.chat,
                         model=model,
                         message=user_message,
                         preamble=preamble,
                         temperature=0.1,
                         max_tokens=2000,
                     )
+                    model_registry.record_success(model)
                     break  # Success, exit loop
                 except Exception as model_error:
                     last_error = model_error
-                    error_str = str(model_error).lower()
-                    # If model was removed or not found, try next model
-                    if 'removed' in error_str or 'not found' in error_str or '404' in error_str or 'was removed' in error_str:
+                    error_kind = classify_model_error(model_error)
+                    # If model was removed or keeps failing server-side, try next model
+                    if error_kind is not None:
+                        model_registry.record_failure(model, error_kind, model_error)
                         continue
                     else:
                         # Other errors (auth, rate limit, etc.) should be raised
@@ -203,6 +204,10 @@ Return ONLY the JSON object matching the schema above."""
             
             # Normalize data - convert dictionaries/objects to strings for list fields
             extracted_data = self._normalize_extracted_data(extracted_data)
+            for field, value in (fallback_fields or {}).items():
+                if not extracted_data.get(field):
+                    extracted_data[field] = value
+            extracted_data.update(known_fields)
             
             # Validate and return CVExtract object
             cv_extract = CVExtract(**extracted_data)
@@ -215,25 +220,92 @@ Return ONLY the JSON object matching the schema above."""
                 error_msg = f"{error_msg}. Response: {e.response.body}"
             raise ValueError(f"Error extracting CV data with Cohere: {error_msg}")
     
-    def process_cv_file(self, file_content: bytes, filename: str) -> CVExtract:
+    def extract_offline(self, cv_text: str) -> CVExtract:
+        """Best-effort extraction without Cohere; the result is flagged for enrichment."""
+        return CVExtract(**extract_offline(cv_text))
+    
+    def process_cv_file(
+        self,
+        file_content: bytes,
+        filename: str,
+        metrics: Optional[dict] = None,
+        allow_offline: bool = True,
+    ) -> CVExtract:
         """
         Complete CV processing pipeline.
         
+        The extraction cache is consulted by file hash before parsing and by
+        normalized text hash before calling Cohere. Email, phone, GPA and major
+        are parsed locally and left out of the Cohere prompt.
+        
         Args:
             file_content: File content as bytes
             filename: Original filename
+            metrics: Optional dict that receives the seconds spent in the
+                'parse' and 'extract' stages and the prompt token estimates
+                before and after compaction
+            allow_offline: In EXTRACTION_OFFLINE_MODE 'auto', fall back to
+                local extraction when the Cohere call fails
         
         Returns:
             CVExtract object with structured data
         """
-        # Step 1: Extract text
+        if metrics is None:
+            metrics = {}
+        
+        # Step 1: Identical file already extracted?
+        file_hash = hash_file_content(file_content)
+        if self.cache is not None:
+            cached = self.cache.get(LEVEL_FILE, file_hash)
+            if cached is not None:
+                return CVExtract(**cached)
+        
+        # Step 2: Stream text page by page until the prompt budget is filled
+        started = time.monotonic()
         cv_text = self.extract_text(file_content, filename)
+        metrics['parse'] = time.monotonic() - started
         
         if not cv_text or len(cv_text.strip()) < 50:
             raise ValueError("CV text is too short or empty")
         
-        # Step 2: Extract structured data with Cohere
-        cv_data = self.extract_cv_data(cv_text)
+        # Step 3: Same text already extracted from a different file?
+        text_hash = hash_cv_text(cv_text)
+        if self.cache is not None:
+            cached = self.cache.get(LEVEL_TEXT, text_hash)
+            if cached is not None:
+                self.cache.set(LEVEL_FILE, file_hash, cached)
+                return CVExtract(**cached)
+            self.cache.record_miss()
+        
+        # Offline results are not cached, so they get enriched on the next upload
+        if settings.EXTRACTION_OFFLINE_MODE == 'always':
+            return self.extract_offline(cv_text)
+        
+        # Step 4: Parse the cheap fields locally (on the full text, before compaction)
+        known_fields = extract_fast_fields(cv_text) if settings.EXTRACTION_LOCAL_FAST_PATH_ENABLED else {}
+        fallback_fields = extract_fallback_fields(cv_text) if settings.EXTRACTION_LOCAL_FAST_PATH_ENABLED else {}
+        
+        # Step 5: Compact the text (headers/footers, whitespace, token budget)
+        prompt_text = cv_text
+        if settings.EXTRACTION_PROMPT_COMPACTION_ENABLED:
+            prompt_text, compaction_stats = compact_cv_text(cv_text)
+            metrics['tokens_before'] = compaction_stats['tokens_before']
+            metrics['tokens_after'] = compaction_stats['tokens_after']
+        
+        # Step 6: Extract the remaining fields with Cohere
+        started = time.monotonic()
+        try:
+            cv_data = self.extract_cv_data(prompt_text, known_fields=known_fields, fallback_fields=fallback_fields)
+        except ValueError as e:
+            if not allow_offline or settings.EXTRACTION_OFFLINE_MODE != 'auto':
+                raise
+            logger.warning(f'Cohere extraction failed, using offline extraction: {str(e)}')
+            return self.extract_offline(cv_text)
+        metrics['extract'] = time.monotonic() - started
+        
+        if self.cache is not None:
+            cv_dict = cv_data.model_dump()
+            self.cache.set(LEVEL_TEXT, text_hash, cv_dict)
+            self.cache.set(LEVEL_FILE, file_hash, cv_dict)
         
         return cv_data
-
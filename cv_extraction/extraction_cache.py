@@ -0,0 +1,214 @@
+"""
+Persistent cache of CV extraction results.
+
+Results are stored in the ``extraction_cache`` MongoDB collection under two
+keys: the SHA-256 of the uploaded file bytes (checked before any parsing) and
+the SHA-256 of the normalized extracted text (catches the same CV exported to
+a different file). Entries expire after ``EXTRACTION_CACHE_TTL_SECONDS`` via a
+TTL index, and the least recently used entries are evicted once the cache
+holds more than ``EXTRACTION_CACHE_MAX_ENTRIES`` (checked periodically, not on
+every write).
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime
+from typing import Optional, Dict
+
+import pymongo
+from pymongo.errors import PyMongoError
+from django.conf import settings
+
+from .mongodb_utils import MongoDBManager
+from .mongo_indexes import ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+CACHE_COLLECTION = 'extraction_cache'
+
+# Bump when the extraction output format changes so old entries are ignored
+CACHE_KEY_VERSION = 1
+
+LEVEL_FILE = 'file'
+LEVEL_TEXT = 'text'
+
+STATS_ID = 'stats'
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def hash_file_content(file_content: bytes) -> str:
+    """SHA-256 hex digest of the uploaded file bytes."""
+    return hashlib.sha256(file_content).hexdigest()
+
+
+def normalize_cv_text(cv_text: str) -> str:
+    """Normalize extracted text so cosmetic differences hash identically."""
+    text = unicodedata.normalize('NFKC', cv_text)
+    return _WHITESPACE_RE.sub(' ', text).strip().casefold()
+
+
+def hash_cv_text(cv_text: str) -> str:
+    """SHA-256 hex digest of the normalized extracted text."""
+    return hashlib.sha256(normalize_cv_text(cv_text).encode('utf-8')).hexdigest()
+
+
+class ExtractionCache:
+    """Two-level (file hash, text hash) cache of extracted CV data."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes_ensured = False
+        self._next_evict_at = 0.0
+        # Per-process counters; persistent totals live in the stats document
+        self.counters = {'file_hits': 0, 'text_hits': 0, 'misses': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.EXTRACTION_CACHE_ENABLED
+
+    def _collection(self):
+        collection = MongoDBManager.get_collection(CACHE_COLLECTION)
+        if not self._indexes_ensured:
+            self.ensure_indexes()
+        return collection
+
+    def ensure_indexes(self):
+        """Create the TTL index (age eviction) and the LRU index (size eviction)."""
+        ensure_indexes([CACHE_COLLECTION])
+        self._indexes_ensured = True
+
+    @staticmethod
+    def _key(level: str, digest: str) -> str:
+        return f'v{CACHE_KEY_VERSION}:{level}:{digest}'
+
+    def _record(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+        try:
+            MongoDBManager.get_collection(CACHE_COLLECTION).update_one(
+                {'_id': STATS_ID},
+                {'$inc': {counter: 1}},
+                upsert=True,
+            )
+        except PyMongoError as e:
+            logger.debug(f'Could not persist extraction cache counter: {str(e)}')
+
+    def get(self, level: str, digest: str) -> Optional[Dict]:
+        """
+        Look up cached CV data and refresh its LRU timestamp.
+
+        Args:
+            level: LEVEL_FILE or LEVEL_TEXT
+            digest: Hash returned by hash_file_content / hash_cv_text
+
+        Returns:
+            Cached CV data dictionary or None on a miss
+        """
+        if not self.enabled:
+            return None
+        try:
+            entry = self._collection().find_one_and_update(
+                {'_id': self._key(level, digest)},
+                {'$set': {'last_hit_at': datetime.utcnow()}, '$inc': {'hits': 1}},
+                projection={'cv_data': 1},
+            )
+        except PyMongoError as e:
+            # The cache is an optimization - never fail an extraction because of it
+            logger.warning(f'Extraction cache lookup failed: {str(e)}')
+            return None
+        if entry is None:
+            return None
+        self._record(f'{level}_hits')
+        return entry['cv_data']
+
+    def record_miss(self):
+        """Count an extraction that had to call Cohere."""
+        if self.enabled:
+            self._record('misses')
+
+    def set(self, level: str, digest: str, cv_data: Dict):
+        """Store CV data under a hash and evict old entries over the size limit."""
+        if not self.enabled:
+            return
+        now = datetime.utcnow()
+        try:
+            collection = self._collection()
+            collection.update_one(
+                {'_id': self._key(level, digest)},
+                {
+                    '$set': {'cv_data': cv_data, 'last_hit_at': now},
+                    '$setOnInsert': {'level': level, 'created_at': now, 'hits': 0},
+                },
+                upsert=True,
+            )
+            self._evict(collection)
+        except PyMongoError as e:
+            logger.warning(f'Extraction cache store failed: {str(e)}')
+
+    def _evict(self, collection):
+        """
+        Delete least recently used entries beyond EXTRACTION_CACHE_MAX_ENTRIES.
+
+        Runs at most every EXTRACTION_CACHE_EVICT_INTERVAL_SECONDS per process
+        and sizes the cache from collection metadata; expired entries are
+        removed by the TTL index in between.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_evict_at:
+                return
+            self._next_evict_at = now + settings.EXTRACTION_CACHE_EVICT_INTERVAL_SECONDS
+        max_entries = settings.EXTRACTION_CACHE_MAX_ENTRIES
+        entry_filter = {'level': {'$in': [LEVEL_FILE, LEVEL_TEXT]}}
+        # The stats document is the only other document in the collection
+        excess = collection.estimated_document_count() - 1 - max_entries
+        if excess <= 0:
+            return
+        stale_ids = [
+            entry['_id'] for entry in collection.find(
+                entry_filter, {'_id': 1}
+            ).sort('last_hit_at', pymongo.ASCENDING).limit(excess)
+        ]
+        if stale_ids:
+            collection.delete_many({'_id': {'$in': stale_ids}})
+
+    def get_stats(self) -> Dict:
+        """
+        Hit/miss totals across all workers plus this process's counters.
+
+        Every hit is a Cohere call that was saved.
+        """
+        stats = {'file_hits': 0, 'text_hits': 0, 'misses': 0, 'entries': 0}
+        try:
+            collection = MongoDBManager.get_collection(CACHE_COLLECTION)
+            persisted = collection.find_one({'_id': STATS_ID}, max_time_ms=3000) or {}
+            for counter in ('file_hits', 'text_hits', 'misses'):
+                stats[counter] = persisted.get(counter, 0)
+            stats['entries'] = collection.estimated_document_count() - (1 if persisted else 0)
+        except PyMongoError as e:
+            logger.warning(f'Could not load extraction cache stats: {str(e)}')
+        stats['hits'] = stats['file_hits'] + stats['text_hits']
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['cohere_calls_saved'] = stats['hits']
+        with self._lock:
+            stats['process'] = dict(self.counters)
+        return stats
+
+    def clear(self):
+        """Remove all cached entries (counters are kept)."""
+        MongoDBManager.get_collection(CACHE_COLLECTION).delete_many(
+            {'level': {'$in': [LEVEL_FILE, LEVEL_TEXT]}}
+        )
+
+
+extraction_cache = ExtractionCache()
+
+
+def get_extraction_cache_stats() -> Dict:
+    """Hit/miss counters of the extraction cache."""
+    return extraction_cache.get_stats()
@@ -0,0 +1,462 @@
+"""
+MongoDB-backed queue for asynchronous CV extraction jobs.
+
+The upload view enqueues a job holding the uploaded file and returns
+immediately; the ``run_extraction_worker`` management command claims jobs
+under a time-limited lease, runs the Cohere extraction and stores the result.
+A job whose lease expires (e.g. the worker was killed) becomes claimable again
+until it has used up its attempts; the lease is renewed while a job runs.
+"""
+import logging
+import socket
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Optional, Dict
+
+import pymongo
+from bson import ObjectId, Binary
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import ServerSelectionTimeoutError, ConnectionFailure, PyMongoError
+from django.conf import settings
+
+from .mongodb_utils import MongoDBManager, save_cv_profile
+from .mongo_indexes import ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = 'extraction_jobs'
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_SUCCEEDED = 'succeeded'
+STATUS_FAILED = 'failed'
+
+FINISHED_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+
+def get_jobs_collection():
+    """Get the extraction jobs collection."""
+    return MongoDBManager.get_collection(JOBS_COLLECTION)
+
+
+def ensure_job_indexes():
+    """Create the indexes used by the claim query and the status page."""
+    ensure_indexes([JOBS_COLLECTION])
+
+
+def default_worker_id() -> str:
+    """Identify this worker process (host and pid) in claimed jobs."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _parse_job_id(job_id: str) -> Optional[ObjectId]:
+    try:
+        return ObjectId(job_id)
+    except (InvalidId, TypeError):
+        return None
+
+
+def enqueue_extraction_job(user_id: int, file_content: bytes, filename: str) -> str:
+    """
+    Queue a CV file for extraction.
+
+    Args:
+        user_id: Django User ID the extracted profile belongs to
+        file_content: Uploaded file content as bytes
+        filename: Original filename (used to pick the text extractor)
+
+    Returns:
+        Job ID as string
+    """
+    try:
+        now = datetime.utcnow()
+        job = {
+            'user_id': user_id,
+            'filename': filename,
+            'file_content': Binary(file_content),
+            'status': STATUS_QUEUED,
+            'attempts': 0,
+            'max_attempts': settings.EXTRACTION_JOB_MAX_ATTEMPTS,
+            'available_at': now,
+            'lease_expires_at': None,
+            'worker_id': None,
+            'error': None,
+            'result': None,
+            'profile_id': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+        result = get_jobs_collection().insert_one(job)
+        return str(result.inserted_id)
+    except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
+        logger.error(f'MongoDB error in enqueue_extraction_job: {str(e)}')
+        MongoDBManager.reset_connection()
+        raise
+
+
+def record_offline_extraction(user_id: int, file_content: bytes, filename: str, result: Dict) -> str:
+    """
+    Record a profile extracted offline outside the queue (e.g. by import_cvs).
+
+    The job is stored as succeeded with its file, so ``enrich_cv_profiles``
+    can re-queue it for Cohere extraction like any other offline result.
+    Call it after the profile is saved, so the job finishes after the save.
+
+    Returns:
+        Job ID as string
+    """
+    try:
+        now = datetime.utcnow()
+        job = {
+            'user_id': user_id,
+            'filename': filename,
+            'file_content': Binary(file_content),
+            'status': STATUS_SUCCEEDED,
+            'attempts': 0,
+            'max_attempts': settings.EXTRACTION_JOB_MAX_ATTEMPTS,
+            'available_at': now,
+            'lease_expires_at': None,
+            'worker_id': None,
+            'error': None,
+            'result': result,
+            'profile_id': None,
+            'created_at': now,
+            'finished_at': now,
+            'updated_at': now,
+        }
+        outcome = get_jobs_collection().insert_one(job)
+        return str(outcome.inserted_id)
+    except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
+        logger.error(f'MongoDB error in record_offline_extraction: {str(e)}')
+        MongoDBManager.reset_connection()
+        raise
+
+
+def get_extraction_job(job_id: str, user_id: Optional[int] = None) -> Optional[Dict]:
+    """
+    Get an extraction job without its file content.
+
+    Args:
+        job_id: Job ID as string
+        user_id: If given, only return the job when it belongs to this user
+
+    Returns:
+        Job document or None if not found
+    """
+    object_id = _parse_job_id(job_id)
+    if object_id is None:
+        return None
+    query = {'_id': object_id}
+    if user_id is not None:
+        query['user_id'] = user_id
+    try:
+        job = get_jobs_collection().find_one(query, {'file_content': 0}, max_time_ms=3000)
+        if job:
+            job['_id'] = str(job['_id'])
+        return job
+    except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
+        logger.warning(f'MongoDB connection error in get_extraction_job: {str(e)}')
+        MongoDBManager.reset_connection()
+        return None
+
+
+def get_latest_extraction_job(user_id: int) -> Optional[Dict]:
+    """Get the most recently created extraction job for a user."""
+    try:
+        job = get_jobs_collection().find_one(
+            {'user_id': user_id},
+            {'file_content': 0},
+            sort=[('created_at', pymongo.DESCENDING)],
+            max_time_ms=3000,
+        )
+        if job:
+            job['_id'] = str(job['_id'])
+        return job
+    except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
+        logger.warning(f'MongoDB connection error in get_latest_extraction_job: {str(e)}')
+        MongoDBManager.reset_connection()
+        return None
+
+
+def fail_abandoned_jobs() -> int:
+    """
+    Mark jobs as failed whose lease expired on their last attempt.
+
+    Such a job most likely crashed or exhausted the memory of every worker
+    that ran it, so it is not claimed again.
+
+    Returns:
+        Number of jobs marked as failed
+    """
+    now = datetime.utcnow()
+    outcome = get_jobs_collection().update_many(
+        {
+            'status': STATUS_RUNNING,
+            'lease_expires_at': {'$lte': now},
+            '$expr': {'$gte': ['$attempts', '$max_attempts']},
+        },
+        {
+            '$set': {
+                'status': STATUS_FAILED,
+                'error': 'The worker stopped responding on the last attempt',
+                'lease_expires_at': None,
+                'finished_at': now,
+                'updated_at': now,
+            },
+            '$unset': {'file_content': ''},
+        },
+    )
+    if outcome.modified_count:
+        logger.warning(f'Marked {outcome.modified_count} abandoned extraction jobs as failed')
+    return outcome.modified_count
+
+
+def claim_next_job(worker_id: str, lease_seconds: Optional[int] = None) -> Optional[Dict]:
+    """
+    Atomically claim the oldest runnable job.
+
+    A job is runnable when it is queued and its retry delay has passed, or
+    when it is running under a lease that has expired and it has attempts
+    left. Expired jobs without attempts left are marked as failed first.
+
+    Returns:
+        The claimed job document (including file content) or None
+    """
+    if lease_seconds is None:
+        lease_seconds = settings.EXTRACTION_JOB_LEASE_SECONDS
+    fail_abandoned_jobs()
+    now = datetime.utcnow()
+    query = {
+        '$or': [
+            {'status': STATUS_QUEUED, 'available_at': {'$lte': now}},
+            {
+                'status': STATUS_RUNNING,
+                'lease_expires_at': {'$lte': now},
+                '$expr': {'$lt': ['$attempts', '$max_attempts']},
+            },
+        ]
+    }
+    update = {
+        '$set': {
+            'status': STATUS_RUNNING,
+            'worker_id': worker_id,
+            'lease_expires_at': now + timedelta(seconds=lease_seconds),
+            'updated_at': now,
+        },
+        '$inc': {'attempts': 1},
+    }
+    return get_jobs_collection().find_one_and_update(
+        query,
+        update,
+        sort=[('created_at', pymongo.ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def renew_lease(job_id: ObjectId, worker_id: str, lease_seconds: int) -> bool:
+    """
+    Extend the lease of a job this worker is still running.
+
+    Returns:
+        False if the job is no longer held by this worker
+    """
+    now = datetime.utcnow()
+    outcome = get_jobs_collection().update_one(
+        {'_id': job_id, 'status': STATUS_RUNNING, 'worker_id': worker_id},
+        {'$set': {'lease_expires_at': now + timedelta(seconds=lease_seconds), 'updated_at': now}},
+    )
+    return outcome.modified_count > 0
+
+
+@contextmanager
+def _lease_renewal(job_id: ObjectId, worker_id: str, lease_seconds: int):
+    """Renew the job's lease in the background, three times per lease period, while the block runs."""
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(lease_seconds / 3):
+            try:
+                if not renew_lease(job_id, worker_id, lease_seconds):
+                    return
+            except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
+                logger.warning(f'Could not renew the lease of extraction job {job_id}: {str(e)}')
+                MongoDBManager.reset_connection()
+
+    thread = threading.Thread(target=renew, name=f'lease-{job_id}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def complete_job(job_id: ObjectId, worker_id: str, result: Optional[Dict], profile_id: Optional[str]) -> bool:
+    """
+    Mark a claimed job as succeeded and drop its file content.
+
+    The file is kept when the result was extracted offline, so the job can be
+    re-queued for enrichment once Cohere is reachable again. A result of None
+    means the profile changed before an enrichment could be saved: the job
+    keeps its earlier result and profile and only drops the file.
+    """
+    now = datetime.utcnow()
+    update = {
+        '$set': {
+            'status': STATUS_SUCCEEDED,
+            'error': None,
+            'lease_expires_at': None,
+            'finished_at': now,
+            'updated_at': now,
+        },
+    }
+    if result is not None:
+        update['$set'].update(result=result, profile_id=profile_id)
+    if result is None or not result.get('needs_enrichment'):
+        update['$unset'] = {'file_content': ''}
+    outcome = get_jobs_collection().update_one(
+        {'_id': job_id, 'status': STATUS_RUNNING, 'worker_id': worker_id},
+        update,
+    )
+    return outcome.modified_count > 0
+
+
+def fail_job(job: Dict, worker_id: str, error: str) -> bool:
+    """
+    Record a failed attempt for a claimed job.
+
+    The job is re-queued with exponential backoff until it reaches its
+    ``max_attempts``, after which it is marked as failed for good.
+    """
+    now = datetime.utcnow()
+    attempts = job.get('attempts', 1)
+    if attempts < job.get('max_attempts', settings.EXTRACTION_JOB_MAX_ATTEMPTS):
+        delay = settings.EXTRACTION_JOB_RETRY_DELAY_SECONDS * (2 ** (attempts - 1))
+        update = {
+            '$set': {
+                'status': STATUS_QUEUED,
+                'error': error,
+                'available_at': now + timedelta(seconds=delay),
+                'lease_expires_at': None,
+                'worker_id': None,
+                'updated_at': now,
+            }
+        }
+    else:
+        update = {
+            '$set': {
+                'status': STATUS_FAILED,
+                'error': error,
+                'lease_expires_at': None,
+                'finished_at': now,
+                'updated_at': now,
+            },
+            '$unset': {'file_content': ''},
+        }
+    outcome = get_jobs_collection().update_one(
+        {'_id': job['_id'], 'status': STATUS_RUNNING, 'worker_id': worker_id},
+        update,
+    )
+    return outcome.modified_count > 0
+
+
+def process_job(job: Dict, worker_id: str, extractor=None, lease_seconds: Optional[int] = None) -> bool:
+    """
+    Run extraction for a claimed job and save the resulting CV profile.
+
+    The job's lease is renewed while the extraction runs, so slow files are
+    not claimed by a second worker.
+
+    Returns:
+        True if the job succeeded, False if the attempt failed
+    """
+    from .cv_extractor import CVExtractor
+
+    if lease_seconds is None:
+        lease_seconds = settings.EXTRACTION_JOB_LEASE_SECONDS
+    try:
+        if extractor is None:
+            extractor = CVExtractor()
+        # Fall back to offline extraction on the last attempt instead of failing
+        final_attempt = job.get('attempts', 1) >= job.get('max_attempts', settings.EXTRACTION_JOB_MAX_ATTEMPTS)
+        with _lease_renewal(job['_id'], worker_id, lease_seconds):
+            cv_data = extractor.process_cv_file(
+                bytes(job['file_content']), job['filename'], allow_offline=final_attempt
+            )
+            cv_dict = cv_data.model_dump()
+            # Only set on jobs re-queued for enrichment: the enriched result must
+            # not overwrite a profile saved after the offline one
+            profile_id = save_cv_profile(job['user_id'], cv_dict, unchanged_since=job.get('finished_at'))
+    except Exception as e:
+        logger.warning(f'Extraction job {job["_id"]} attempt {job.get("attempts")} failed: {str(e)}')
+        fail_job(job, worker_id, str(e))
+        return False
+
+    if profile_id is None:
+        logger.info(f'Extraction job {job["_id"]}: the profile changed since the offline extraction, enrichment skipped')
+        cv_dict = None
+    if not complete_job(job['_id'], worker_id, cv_dict, profile_id):
+        # Lease expired and another worker took the job over; its result wins
+        logger.warning(f'Extraction job {job["_id"]} lost its lease before completion')
+    return True
+
+
+def requeue_jobs_for_enrichment(limit: Optional[int] = None) -> int:
+    """
+    Re-queue succeeded jobs whose result was extracted offline.
+
+    Only a user's latest job is re-queued; the file of an older offline job
+    is dropped, since enriching it would overwrite the newer profile.
+
+    Args:
+        limit: Maximum number of jobs to re-queue (default: all)
+
+    Returns:
+        Number of jobs re-queued
+    """
+    collection = get_jobs_collection()
+    query = {
+        'status': STATUS_SUCCEEDED,
+        'result.needs_enrichment': True,
+        'file_content': {'$exists': True},
+    }
+    try:
+        cursor = collection.find(query, {'_id': 1, 'user_id': 1}).sort('finished_at', pymongo.ASCENDING)
+        candidates = list(cursor)
+        if not candidates:
+            return 0
+        latest = {
+            group['_id']: group['job_id']
+            for group in collection.aggregate([
+                {'$match': {'user_id': {'$in': list({job['user_id'] for job in candidates})}}},
+                {'$sort': {'created_at': pymongo.DESCENDING}},
+                {'$group': {'_id': '$user_id', 'job_id': {'$first': '$_id'}}},
+            ])
+        }
+        job_ids = [job['_id'] for job in candidates if latest.get(job['user_id']) == job['_id']]
+        superseded = [job['_id'] for job in candidates if latest.get(job['user_id']) != job['_id']]
+        if superseded:
+            collection.update_many({'_id': {'$in': superseded}}, {'$unset': {'file_content': ''}})
+        if limit:
+            job_ids = job_ids[:limit]
+        if not job_ids:
+            return 0
+        now = datetime.utcnow()
+        outcome = collection.update_many(
+            {'_id': {'$in': job_ids}, 'status': STATUS_SUCCEEDED},
+            {'$set': {
+                'status': STATUS_QUEUED,
+                'attempts': 0,
+                'available_at': now,
+                'error': None,
+                'updated_at': now,
+            }},
+        )
+        return outcome.modified_count
+    except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
+        logger.error(f'MongoDB error in requeue_jobs_for_enrichment: {str(e)}')
+        MongoDBManager.reset_connection()
+        raise
@@ -1,8 +1,13 @@
 """
 Forms for CV extraction app.
 """
+import re
+
 from django import forms
 
+from .ranking import DEFAULT_RANKING_WEIGHTS
+from .skill_index import parse_skill_query, skill_index
+
 
 class CVUploadForm(forms.Form):
     """Form for CV file upload."""
@@ -63,9 +68,10 @@ class StudentFilterForm(forms.Form):
     skills = forms.CharField(
         required=False,
         label='Skills (comma-separated)',
+        help_text='Any of the listed skills (spellings such as JS and JavaScript match); prefix + to require a skill, - to exclude it',
         widget=forms.TextInput(attrs={
             'class': 'form-control',
-            'placeholder': 'e.g., Python, JavaScript, Django'
+            'placeholder': 'e.g., Python, JavaScript, +SQL, -PHP'
         })
     )
     search = forms.CharField(
@@ -76,6 +82,78 @@ class StudentFilterForm(forms.Form):
             'placeholder': 'Search by name, email, or summary'
         })
     )
+    rank = forms.BooleanField(
+        required=False,
+        label='Rank all candidates',
+        help_text='Order the matching students by your ranking weights',
+        widget=forms.CheckboxInput(attrs={
+            'class': 'form-check-input'
+        })
+    )
+
+    def ranking_skills(self) -> list:
+        """Canonical ids of the requested (not excluded) skills, for the skill-match score."""
+        any_of, all_of, _ = parse_skill_query(self.cleaned_data.get('skills'))
+        return any_of + all_of
+
+    def ranked_search_text(self) -> str:
+        """Search text to rank with the search engine ('' for none or an email search)."""
+        search = (self.cleaned_data.get('search') or '').strip()
+        return '' if '@' in search else search
+
+    def to_mongo_query(self, text_search: bool = True) -> dict:
+        """
+        Translate the cleaned filters into a cv_profiles query.
+        
+        Skills match any of the comma-separated skills by canonical id (see
+        skill_catalog), and +skill / -skill require or exclude one; they are resolved with the
+        in-process skill index when possible. Search
+        uses the profile text index (name, summary, experience), or matches
+        the email when the search term contains '@'.
+        
+        Args:
+            text_search: Include the text index search; pass False when the
+                search text is ranked by the search engine instead
+        """
+        data = self.cleaned_data
+        query = {}
+        
+        gpa_range = {}
+        if data.get('gpa_min') is not None:
+            gpa_range['$gte'] = data['gpa_min']
+        if data.get('gpa_max') is not None:
+            gpa_range['$lte'] = data['gpa_max']
+        if gpa_range:
+            query['gpa'] = gpa_range
+        
+        major = (data.get('major') or '').strip()
+        if major:
+            query['major'] = {'$regex': re.escape(major), '$options': 'i'}
+        
+        any_of, all_of, none_of = parse_skill_query(data.get('skills'))
+        if any_of or all_of or none_of:
+            user_ids = skill_index.match(any_of, all_of, none_of)
+            if user_ids is not None:
+                query['user_id'] = {'$in': user_ids}
+            else:
+                # Index disabled, unavailable or too many matches for an $in list
+                skills_query = {}
+                if any_of:
+                    skills_query['$in'] = any_of
+                if all_of:
+                    skills_query['$all'] = all_of
+                if none_of:
+                    skills_query['$nin'] = none_of
+                query['skills_normalized'] = skills_query
+        
+        search = (data.get('search') or '').strip()
+        if search:
+            if '@' in search:
+                query['email'] = {'$regex': re.escape(search), '$options': 'i'}
+            elif text_search:
+                query['$text'] = {'$search': search}
+        
+        return query
 
 
 class StudentComparisonForm(forms.Form):
@@ -104,6 +182,71 @@ class StudentComparisonForm(forms.Form):
         return student_ids
 
 
+class RankingWeightsForm(forms.Form):
+    """Form for a company's candidate ranking weights."""
+    gpa = forms.IntegerField(label='GPA', min_value=0, max_value=100)
+    skills = forms.IntegerField(label='Number of skills', min_value=0, max_value=100)
+    experience = forms.IntegerField(label='Experience', min_value=0, max_value=100)
+    certifications = forms.IntegerField(label='Certifications', min_value=0, max_value=100)
+    skill_match = forms.IntegerField(
+        label='Skill match',
+        min_value=0,
+        max_value=100,
+        help_text='Share of the filtered skills a student has',
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.fields.values():
+            field.widget.attrs.update({'class': 'form-control form-control-sm', 'step': '1'})
+
+    @classmethod
+    def for_weights(cls, weights: dict) -> 'RankingWeightsForm':
+        """Unbound form showing the given weights."""
+        return cls(initial={feature: int(round(weights.get(feature, default))) for feature, default in DEFAULT_RANKING_WEIGHTS.items()})
+
+
+class JobDescriptionForm(forms.Form):
+    """Form for matching students to a job description."""
+    description = forms.CharField(
+        label='Job description',
+        max_length=20000,
+        widget=forms.Textarea(attrs={
+            'class': 'form-control',
+            'rows': 10,
+            'placeholder': 'Paste the job description: responsibilities, required skills, experience...'
+        })
+    )
+    major = forms.CharField(
+        required=False,
+        label='Major',
+        widget=forms.TextInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'e.g., Computer Science'
+        })
+    )
+    gpa_min = forms.FloatField(
+        required=False,
+        label='Min GPA',
+        widget=forms.NumberInput(attrs={
+            'class': 'form-control',
+            'step': '0.1',
+            'min': '0',
+            'max': '4.0'
+        })
+    )
+
+    def to_mongo_query(self) -> dict:
+        """The optional major / GPA filters as a cv_profiles query."""
+        query = {}
+        major = (self.cleaned_data.get('major') or '').strip()
+        if major:
+            query['major'] = {'$regex': re.escape(major), '$options': 'i'}
+        if self.cleaned_data.get('gpa_min') is not None:
+            query['gpa'] = {'$gte': self.cleaned_data['gpa_min']}
+        return query
+
+
 class CVProfileEditForm(forms.Form):
     """Form for editing CV profile data."""
     full_name = forms.CharField(
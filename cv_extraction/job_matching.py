@@ -0,0 +1,421 @@
+"""
+Job-description matching with TF-IDF cosine similarity.
+
+``JobMatchIndex`` holds a SciPy CSR matrix with one row per profile and one
+column per term of the profiles' skills, summary and experience (tokenized
+like the search engine; skills count double). Rows store sublinear term
+frequencies and IDF weights are applied when querying, so adding a profile
+never rewrites the other rows. A job description is vectorized the same way
+and compared with every profile in one sparse matrix-vector product.
+
+Profiles saved or deleted since the last compaction live in a small pending
+matrix and mask their old row; past ``_COMPACT_ROWS`` pending rows the two
+matrices are merged. Every build and compaction is saved to
+``JOB_MATCHING_INDEX_DIR`` as uncompressed .npy arrays, which a starting
+process memory-maps and catches up from instead of re-reading every profile.
+"""
+import json
+import logging
+import math
+import os
+import shutil
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from pymongo.errors import PyMongoError
+from django.conf import settings
+
+from .mongodb_utils import HAS_USER_FILTER, MongoDBManager, normalize_skill, search_cv_profiles
+from .profile_index import ProfileIndex
+from .search_engine import field_texts, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Occurrences of a term in each matched field count this many times
+MATCH_FIELD_WEIGHTS = {'skills': 2.0, 'summary': 1.0, 'experience': 1.0}
+# Pending rows merged into the main matrix (and saved) at once
+_COMPACT_ROWS = 1000
+# Snapshot format, bumped when the saved arrays change
+_SNAPSHOT_FORMAT = 1
+_CURRENT_FILE = 'CURRENT'
+# Matched terms reported per profile
+_EXPLAIN_TERMS = 5
+
+
+def _sublinear(counts: Iterable[float]) -> np.ndarray:
+    return 1 + np.log(np.fromiter(counts, dtype=np.float64))
+
+
+class JobMatchIndex(ProfileIndex):
+    """Profiles x terms TF matrix of this process."""
+
+    name = 'job matching index'
+    projection = {
+        'user_id': 1, 'skills': 1, 'skills_normalized': 1, 'summary': 1, 'experience': 1,
+        'updated_at': 1, 'schema_version': 1,
+    }
+
+    def __init__(self):
+        super().__init__()
+        self._vocabulary: Dict[str, int] = {}
+        self._terms: List[str] = []
+        # Number of indexed profiles containing each term
+        self._df = np.zeros(1024, dtype=np.float64)
+        # Compacted rows; masked when their profile changes
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._squared = self._matrix
+        self._row_user_ids = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._rows: Dict[int, int] = {}
+        # user_id -> (columns, sublinear tf) saved since the last compaction
+        self._pending: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._pending_cache = None
+        # Row norms of the main matrix under the current IDF, until a profile changes
+        self._norms = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.JOB_MATCHING_ENABLED
+
+    @property
+    def refresh_seconds(self) -> float:
+        return settings.JOB_MATCHING_REFRESH_SECONDS
+
+    @property
+    def rebuild_seconds(self) -> float:
+        return settings.JOB_MATCHING_REBUILD_SECONDS
+
+    @property
+    def profile_count(self) -> int:
+        return int(self._alive.sum()) + len(self._pending)
+
+    @staticmethod
+    def _profile_terms(profile: Dict) -> Dict[str, float]:
+        counts: Dict[str, float] = {}
+        skills = profile.get('skills_normalized')
+        if skills is None:
+            skills = [normalize_skill(skill) for skill in profile.get('skills') or []]
+        fields = {'skills': skills, 'summary': profile.get('summary'), 'experience': profile.get('experience')}
+        for field, value in fields.items():
+            weight = MATCH_FIELD_WEIGHTS[field]
+            for text in field_texts(value):
+                for term in tokenize(text):
+                    counts[term] = counts.get(term, 0.0) + weight
+        return counts
+
+    def _column(self, term: str) -> int:
+        column = self._vocabulary.get(term)
+        if column is None:
+            column = len(self._terms)
+            self._vocabulary[term] = column
+            self._terms.append(term)
+            if column == len(self._df):
+                self._df = np.concatenate([self._df, np.zeros(len(self._df), dtype=np.float64)])
+        return column
+
+    def _remove_profile(self, user_id: int):
+        pending = self._pending.pop(user_id, None)
+        if pending is not None:
+            self._df[pending[0]] -= 1
+            self._pending_cache = self._norms = None
+        row = self._rows.pop(user_id, None)
+        if row is not None:
+            self._alive[row] = False
+            self._df[self._matrix.indices[self._matrix.indptr[row]:self._matrix.indptr[row + 1]]] -= 1
+            self._norms = None
+
+    def _index_profile(self, profile: Dict):
+        user_id = profile['user_id']
+        self._remove_profile(user_id)
+        counts = self._profile_terms(profile)
+        if not counts:
+            return
+        columns = np.fromiter((self._column(term) for term in counts), dtype=np.int64, count=len(counts))
+        self._df[columns] += 1
+        self._pending[user_id] = (columns, _sublinear(counts.values()))
+        self._pending_cache = self._norms = None
+
+    def _pending_matrix(self) -> Tuple[sparse.csr_matrix, sparse.csr_matrix, np.ndarray]:
+        """Pending rows as (matrix, squared matrix, user ids), cached until they change."""
+        if self._pending_cache is None:
+            rows = list(self._pending.values())
+            lengths = np.fromiter((len(columns) for columns, _ in rows), dtype=np.int64, count=len(rows))
+            indptr = np.concatenate([[0], np.cumsum(lengths)])
+            indices = np.concatenate([columns for columns, _ in rows]) if rows else np.zeros(0, dtype=np.int64)
+            data = np.concatenate([values for _, values in rows]).astype(np.float32) if rows else np.zeros(0, dtype=np.float32)
+            matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(rows), len(self._terms)))
+            squared = sparse.csr_matrix((data * data, indices, indptr), shape=matrix.shape)
+            self._pending_cache = (matrix, squared, np.fromiter(self._pending, dtype=np.int64, count=len(rows)))
+        return self._pending_cache
+
+    def _compact(self):
+        """Merge the pending rows into the main matrix, dropping masked rows."""
+        alive = np.flatnonzero(self._alive)
+        kept = self._matrix[alive]
+        kept = sparse.csr_matrix((kept.data, kept.indices, kept.indptr), shape=(len(alive), len(self._terms)))
+        pending, _, pending_user_ids = self._pending_matrix()
+        matrix = sparse.vstack([kept, pending], format='csr', dtype=np.float32)
+        index_dtype = np.int64 if matrix.nnz >= 2 ** 31 else np.int32
+        matrix.indices = matrix.indices.astype(index_dtype, copy=False)
+        matrix.indptr = matrix.indptr.astype(index_dtype, copy=False)
+        self._set_matrix(matrix, np.concatenate([self._row_user_ids[alive], pending_user_ids]))
+        self._pending = {}
+        self._pending_cache = None
+
+    def _set_matrix(self, matrix: sparse.csr_matrix, user_ids: np.ndarray):
+        self._matrix = matrix
+        self._squared = sparse.csr_matrix((matrix.data * matrix.data, matrix.indices, matrix.indptr), shape=matrix.shape)
+        self._row_user_ids = user_ids
+        self._alive = np.ones(len(user_ids), dtype=bool)
+        self._rows = {user_id: row for row, user_id in enumerate(user_ids.tolist())}
+        self._norms = None
+
+    def _finish_build(self):
+        self._compact()
+
+    def build(self):
+        """Start from the saved snapshot when there is one, else index every profile."""
+        if self._built_at is None and self.load():
+            self.refresh()
+            return
+        super().build()
+        self.save()
+
+    def refresh(self) -> int:
+        count = super().refresh()
+        if len(self._pending) >= _COMPACT_ROWS:
+            with self._lock:
+                self._compact()
+            self.save()
+        return count
+
+    def save(self, directory: Optional[str] = None) -> Optional[str]:
+        """
+        Save the compacted matrix as a new snapshot and point ``CURRENT`` at it.
+
+        Returns:
+            The snapshot path, or None if it could not be written
+        """
+        directory = directory or settings.JOB_MATCHING_INDEX_DIR
+        with self._lock:
+            # The watermark covers the pending rows too, so they are saved with the rest
+            if self._pending or not self._alive.all():
+                self._compact()
+            matrix, user_ids, df = self._matrix, self._row_user_ids, self._df[:len(self._terms)].copy()
+            meta = {
+                'format': _SNAPSHOT_FORMAT,
+                'shape': [matrix.shape[0], len(self._terms)],
+                'terms': list(self._terms),
+                'watermark': self._watermark.isoformat() if self._watermark else None,
+            }
+        snapshot = os.path.join(directory, f'{time.time_ns()}-{os.getpid()}')
+        try:
+            os.makedirs(snapshot)
+            for name, array in (
+                ('data', matrix.data), ('indices', matrix.indices), ('indptr', matrix.indptr),
+                ('user_ids', user_ids), ('df', df),
+            ):
+                np.save(os.path.join(snapshot, f'{name}.npy'), array)
+            with open(os.path.join(snapshot, 'meta.json'), 'w', encoding='utf-8') as meta_file:
+                json.dump(meta, meta_file)
+            pointer = os.path.join(directory, f'{_CURRENT_FILE}.{os.getpid()}.tmp')
+            with open(pointer, 'w', encoding='utf-8') as pointer_file:
+                pointer_file.write(os.path.basename(snapshot))
+            os.replace(pointer, os.path.join(directory, _CURRENT_FILE))
+        except OSError as e:
+            logger.warning(f'Could not save the {self.name} to {directory}: {str(e)}')
+            shutil.rmtree(snapshot, ignore_errors=True)
+            return None
+        # Processes that mapped an older snapshot keep reading it after the unlink;
+        # CURRENT may already point at a newer snapshot of another process
+        keep = {os.path.basename(snapshot), self._current_snapshot(directory)}
+        for entry in os.listdir(directory):
+            path = os.path.join(directory, entry)
+            if os.path.isdir(path) and entry not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+        logger.info(f'Saved {self.name} snapshot with {matrix.shape[0]} profiles to {snapshot}')
+        return snapshot
+
+    @staticmethod
+    def _current_snapshot(directory: str) -> Optional[str]:
+        try:
+            with open(os.path.join(directory, _CURRENT_FILE), encoding='utf-8') as pointer_file:
+                return pointer_file.read().strip()
+        except OSError:
+            return None
+
+    def load(self, directory: Optional[str] = None) -> bool:
+        """
+        Memory-map the current snapshot.
+
+        Returns:
+            True if a valid snapshot was loaded
+        """
+        directory = directory or settings.JOB_MATCHING_INDEX_DIR
+        current = self._current_snapshot(directory)
+        if not current:
+            return False
+        snapshot = os.path.join(directory, current)
+        try:
+            with open(os.path.join(snapshot, 'meta.json'), encoding='utf-8') as meta_file:
+                meta = json.load(meta_file)
+            arrays = {
+                name: np.load(os.path.join(snapshot, f'{name}.npy'), mmap_mode='r')
+                for name in ('data', 'indices', 'indptr', 'user_ids', 'df')
+            }
+            if meta.get('format') != _SNAPSHOT_FORMAT:
+                return False
+            matrix = sparse.csr_matrix(
+                (arrays['data'], arrays['indices'], arrays['indptr']), shape=tuple(meta['shape']), copy=False
+            )
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f'Ignoring unreadable {self.name} snapshot {snapshot}: {str(e)}')
+            return False
+
+        with self._lock:
+            self._terms = meta['terms']
+            self._vocabulary = {term: column for column, term in enumerate(self._terms)}
+            self._df = np.array(arrays['df'], dtype=np.float64)
+            self._set_matrix(matrix, np.array(arrays['user_ids'], dtype=np.int64))
+            self._pending = {}
+            self._pending_cache = None
+            self._watermark = datetime.fromisoformat(meta['watermark']) if meta['watermark'] else None
+            self._built_at = self._refreshed_at = time.monotonic()
+        logger.info(f'Loaded {self.name} snapshot with {matrix.shape[0]} profiles from {snapshot}')
+        return True
+
+    def score(
+        self,
+        text: str,
+        limit: int,
+        user_ids: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[int, float, List[str]]]:
+        """
+        Profiles most similar to a job description, from the current state.
+
+        Args:
+            text: Job description
+            limit: Number of profiles to return
+            user_ids: Only consider these users (default: all indexed profiles)
+
+        Returns:
+            (user_id, cosine similarity, best matching terms) tuples, best first;
+            profiles sharing no term are left out
+        """
+        counts = Counter(tokenize(text))
+        with self._lock:
+            count = self.profile_count
+            if not counts or not count:
+                return []
+            width = len(self._terms)
+            idf = np.log((1 + count) / (1 + self._df[:width])) + 1
+            known = [term for term in counts if term in self._vocabulary]
+            if not known:
+                return []
+            columns = np.array([self._vocabulary[term] for term in known], dtype=np.int64)
+            query = np.zeros(width, dtype=np.float64)
+            query[columns] = _sublinear(counts[term] for term in known) * idf[columns]
+            # Unknown terms only lower every score alike, through the query norm
+            unknown_idf = math.log(1 + count) + 1
+            query_norm = math.sqrt(
+                float(np.dot(query[columns], query[columns]))
+                + sum(((1 + math.log(counts[term])) * unknown_idf) ** 2 for term in counts if term not in self._vocabulary)
+            )
+            weights = query * idf
+            idf_squared = idf * idf
+
+            if self._norms is None:
+                self._norms = np.sqrt(self._squared @ idf_squared[:self._squared.shape[1]])
+            pending, pending_squared, pending_user_ids = self._pending_matrix()
+            parts = []
+            for matrix, norms, row_user_ids, alive in (
+                (self._matrix, self._norms, self._row_user_ids, self._alive),
+                (pending, np.sqrt(pending_squared @ idf_squared[:pending.shape[1]]), pending_user_ids, None),
+            ):
+                if not matrix.shape[0]:
+                    continue
+                dots = matrix @ weights[:matrix.shape[1]]
+                scores = np.divide(dots, norms * query_norm, out=np.zeros_like(dots), where=norms > 0)
+                if alive is not None:
+                    scores[~alive] = 0
+                parts.append((matrix, row_user_ids, scores))
+
+            candidates = []
+            for part, (matrix, row_user_ids, scores) in enumerate(parts):
+                mask = scores > 0
+                if user_ids is not None:
+                    mask &= np.isin(row_user_ids, np.fromiter(user_ids, dtype=np.int64))
+                rows = np.flatnonzero(mask)
+                if len(rows) > limit:
+                    rows = rows[np.argpartition(-scores[rows], limit - 1)[:limit]]
+                candidates.extend((float(scores[row]), int(row_user_ids[row]), part, int(row)) for row in rows)
+            candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+
+            results = []
+            for score, user_id, part, row in candidates[:limit]:
+                matrix = parts[part][0]
+                start, end = matrix.indptr[row], matrix.indptr[row + 1]
+                contributions = matrix.data[start:end] * weights[matrix.indices[start:end]]
+                best = np.argsort(-contributions)[:_EXPLAIN_TERMS]
+                terms = [self._terms[matrix.indices[start + i]] for i in best if contributions[i] > 0]
+                results.append((user_id, score, terms))
+            return results
+
+    def match(self, text: str, limit: int, user_ids: Optional[Iterable[int]] = None) -> Optional[List[Tuple[int, float, List[str]]]]:
+        """``score`` on a fresh index; None if matching is disabled or unavailable."""
+        if not self.enabled:
+            return None
+        try:
+            self.ensure_fresh()
+        except PyMongoError as e:
+            logger.warning(f'Job matching index unavailable: {str(e)}')
+            MongoDBManager.reset_connection()
+            return None
+        return self.score(text, limit, user_ids)
+
+
+job_match_index = JobMatchIndex()
+
+
+def match_job_description(text: str, query: Optional[Dict] = None, limit: Optional[int] = None) -> Optional[List[Dict]]:
+    """
+    Shortlist of the profiles best matching a job description.
+
+    Args:
+        text: Job description
+        query: MongoDB filter restricting the candidates
+        limit: Shortlist size (default: JOB_MATCHING_SHORTLIST_SIZE)
+
+    Returns:
+        'card' profiles, best first, with 'match_score' (0-100) and
+        'match_terms', or None if matching is disabled or unavailable
+    """
+    limit = limit or settings.JOB_MATCHING_SHORTLIST_SIZE
+    user_ids = None
+    if query:
+        user_ids = [
+            profile['user_id']
+            for profile in search_cv_profiles(dict(query, **HAS_USER_FILTER), projection={'user_id': 1}, sort=[])
+        ]
+    # A few extra matches stand in for profiles whose user was deleted
+    matches = job_match_index.match(text, limit + 10, user_ids)
+    if matches is None:
+        return None
+    profiles = {
+        profile['user_id']: profile
+        for profile in search_cv_profiles(
+            {'user_id': {'$in': [user_id for user_id, _, _ in matches]}, **HAS_USER_FILTER}, shape='card'
+        )
+    }
+    shortlist = []
+    for user_id, score, terms in matches:
+        profile = profiles.get(user_id)
+        if profile is not None and len(shortlist) < limit:
+            profile['match_score'] = round(score * 100, 1)
+            profile['match_terms'] = terms
+            shortlist.append(profile)
+    return shortlist
@@ -0,0 +1,223 @@
+"""
+Rule-based CV field extraction (English and Arabic).
+
+``extract_fast_fields`` pulls the fields that deterministic parsing gets right
+(email, labeled or international phone, GPA, major) before the Cohere call, so
+the prompt only asks for the rest. ``extract_fallback_fields`` returns guesses
+that are only used when Cohere finds nothing (an unlabeled local phone
+number). ``extract_offline`` builds a best-effort CVExtract entirely locally
+for when Cohere is slow or unavailable; such profiles are flagged with
+``needs_enrichment`` so they can be re-extracted later.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .prompt_compaction import clean_lines, detect_section
+
+# Arabic-Indic and Extended Arabic-Indic digits, Arabic decimal separator
+_DIGIT_TRANSLATION = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹٫', '01234567890123456789.')
+
+_EMAIL_RE = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+
+_PHONE_RE = re.compile(r'(?:\+|00)?\d[\d \-().]{6,}\d')
+_PHONE_LABEL_RE = re.compile(r'\b(phone|telephone|mobile|tel|cell|whatsapp)\b|هاتف|جوال|موبايل', re.IGNORECASE)
+_YEAR_RANGE_RE = re.compile(r'^(19|20)\d{2}\s*[-–]\s*(19|20)\d{2}$')
+_DATE_RE = re.compile(r'^\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}$')
+_ISO_DATE_RE = re.compile(r'^(19|20)\d{2}[-/.]\d{1,2}[-/.]\d{1,2}$')
+
+_GPA_RE = re.compile(
+    r'(?:\bc?gpa\b|\bgrade point average\b|المعدل(?:\s+التراكمي)?)'
+    r'\s*(?:[:：=\-]|of|is)?\s*(\d(?:\.\d{1,3})?)'
+    r'(?:\s*(?:/|out of|من)\s*(\d(?:\.\d{1,2})?))?',
+    re.IGNORECASE,
+)
+
+_MAJOR_RES = [
+    re.compile(r'\b(?:major|specialization|field of study)\s*[:：\-]\s*([^\n,|]+)', re.IGNORECASE),
+    re.compile(
+        r"\b(?:bachelor(?:'s)?|master(?:'s)?|b\.?\s?sc\.?|m\.?\s?sc\.?|b\.?\s?eng\.?|b\.?s\.?|b\.?a\.?|m\.?s\.?|m\.?a\.?|ph\.?\s?d\.?)"
+        r"\s*(?:degree\s+)?(?:of\s+(?:science|arts|engineering)\s+)?in\s+([^\n,|(–]+)",
+        re.IGNORECASE,
+    ),
+    re.compile(r'(?:التخصص|تخصص)\s*[:：\-]?\s*([^\n,،|]+)'),
+    re.compile(r'(?:بكالوريوس|ماجستير)\s+(?:في\s+)?([^\n,،|\-–]+)'),
+]
+_MAJOR_TAIL_RE = re.compile(r'\s+(?:from|at|with|gpa|graduat\w*|\(|\d{4}|جامعة|من)\b.*$', re.IGNORECASE)
+_MAJOR_MAX_CHARS = 60
+
+_NAME_EXCLUDE_RE = re.compile(r'(curriculum vitae|resume|résumé|\bcv\b|سيرة ذاتية|السيرة الذاتية)', re.IGNORECASE)
+_NAME_WORD_RE = re.compile(r"^[^\W\d_][^\W\d_'.\-]*\.?$", re.UNICODE)
+
+_LIST_SPLIT_RE = re.compile(r'\s*(?:[,;،|•·▪●◦]|\s-\s)\s*')
+_BULLET_PREFIX_RE = re.compile(r'^[\-–—*•·▪●◦>]+\s*')
+
+_SUMMARY_MAX_CHARS = 1000
+_LIST_ITEM_MAX_CHARS = 40
+
+
+def _normalize_digits(text: str) -> str:
+    return text.translate(_DIGIT_TRANSLATION)
+
+
+def extract_email(text: str) -> Optional[str]:
+    match = _EMAIL_RE.search(text)
+    return match.group().rstrip('.') if match else None
+
+
+def _valid_phone(candidate: str) -> bool:
+    candidate = candidate.strip()
+    digits = re.sub(r'\D', '', candidate)
+    if not 7 <= len(digits) <= 15:
+        return False
+    return not (_YEAR_RANGE_RE.match(candidate) or _DATE_RE.match(candidate) or _ISO_DATE_RE.match(candidate))
+
+
+def _find_phone(text: str) -> Tuple[Optional[str], bool]:
+    """
+    Phone number, preferring labeled numbers, then international ones.
+
+    Returns:
+        Tuple of (phone or None, whether it was labeled or international).
+        Unlabeled local numbers must contain separators, so student/civil ID
+        numbers (a bare run of digits) are not taken for phones.
+    """
+    text = _normalize_digits(text)
+    fallback = None
+    for line in text.splitlines():
+        for match in _PHONE_RE.finditer(line):
+            candidate = match.group().strip()
+            if not _valid_phone(candidate):
+                continue
+            if _PHONE_LABEL_RE.search(line) or candidate.startswith(('+', '00')):
+                return candidate, True
+            if fallback is None and len(re.sub(r'\D', '', candidate)) >= 8 and not candidate.isdigit():
+                fallback = candidate
+    return fallback, False
+
+
+def extract_phone(text: str) -> Optional[str]:
+    """Best phone number guess, labeled or not."""
+    return _find_phone(text)[0]
+
+
+def extract_gpa(text: str) -> Optional[float]:
+    """GPA on a 4.0 scale; other scales are ignored rather than converted."""
+    for match in _GPA_RE.finditer(_normalize_digits(text)):
+        value = float(match.group(1))
+        scale = float(match.group(2)) if match.group(2) else None
+        if scale is not None and abs(scale - 4.0) > 0.01:
+            continue
+        if 0.0 < value <= 4.0:
+            return round(value, 2)
+    return None
+
+
+def extract_major(text: str) -> Optional[str]:
+    for pattern in _MAJOR_RES:
+        match = pattern.search(text)
+        if not match:
+            continue
+        major = _MAJOR_TAIL_RE.sub('', match.group(1)).strip(' .:-–')
+        if major and len(major) <= _MAJOR_MAX_CHARS:
+            return major
+    return None
+
+
+def extract_fast_fields(cv_text: str) -> Dict:
+    """
+    Fields that can be parsed deterministically from the CV text.
+
+    Returns:
+        Dictionary with only the fields that were found
+        (subset of email, phone, gpa, major)
+    """
+    extractors = {
+        'email': extract_email,
+        'gpa': extract_gpa,
+        'major': extract_major,
+    }
+    fields = {}
+    for field, extractor in extractors.items():
+        value = extractor(cv_text)
+        if value is not None:
+            fields[field] = value
+    phone, authoritative = _find_phone(cv_text)
+    if authoritative:
+        fields['phone'] = phone
+    return fields
+
+
+def extract_fallback_fields(cv_text: str) -> Dict:
+    """
+    Locally parsed values too uncertain to skip the Cohere field for.
+
+    Returns:
+        Dictionary with only the fields that were found (unlabeled phone)
+    """
+    phone, authoritative = _find_phone(cv_text)
+    return {'phone': phone} if phone is not None and not authoritative else {}
+
+
+def _group_sections(lines: List[str]) -> Dict[str, List[str]]:
+    sections = {'contact': []}
+    current = 'contact'
+    for line in lines:
+        section = detect_section(line)
+        if section is not None:
+            current = section
+            sections.setdefault(current, [])
+        elif line:
+            sections.setdefault(current, []).append(_BULLET_PREFIX_RE.sub('', line))
+    return sections
+
+
+def _guess_name(contact_lines: List[str]) -> Optional[str]:
+    for line in contact_lines[:5]:
+        if _NAME_EXCLUDE_RE.search(line) or '@' in line:
+            continue
+        words = line.split()
+        if 2 <= len(words) <= 5 and all(_NAME_WORD_RE.match(word) for word in words):
+            return line
+    return None
+
+
+def _split_list(lines: List[str]) -> List[str]:
+    items = []
+    for line in lines:
+        # "Programming: Python, Java" -> "Python, Java"
+        if ':' in line and len(line.split(':', 1)[0]) <= 25:
+            line = line.split(':', 1)[1]
+        for item in _LIST_SPLIT_RE.split(line):
+            item = item.strip(' .')
+            if item and len(item) <= _LIST_ITEM_MAX_CHARS and item not in items:
+                items.append(item)
+    return items
+
+
+def extract_offline(cv_text: str) -> Dict:
+    """
+    Best-effort extraction of every CVExtract field without calling Cohere.
+
+    Returns:
+        Dictionary matching the CVExtract schema, with needs_enrichment=True
+    """
+    sections = _group_sections(clean_lines(cv_text))
+    summary = ' '.join(sections.get('summary', []))[:_SUMMARY_MAX_CHARS]
+
+    cv_data = {
+        'full_name': _guess_name(sections.get('contact', [])),
+        'email': None,
+        'phone': None,
+        'summary': summary or None,
+        'skills': _split_list(sections.get('skills', [])),
+        'education': sections.get('education', []),
+        'experience': sections.get('experience', []),
+        'certifications': sections.get('certifications', []),
+        'languages': _split_list(sections.get('languages', [])),
+        'gpa': None,
+        'major': None,
+        'needs_enrichment': True,
+    }
+    cv_data.update(extract_fallback_fields(cv_text))
+    cv_data.update(extract_fast_fields(cv_text))
+    return cv_data
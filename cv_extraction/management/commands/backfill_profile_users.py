@@ -0,0 +1,31 @@
+"""
+Django management command to copy user fields into every CV profile.
+Usage: python manage.py backfill_profile_users [--batch-size N] [--missing-only]
+"""
+from django.core.management.base import BaseCommand
+
+from cv_extraction.mongodb_utils import backfill_profile_users
+
+
+class Command(BaseCommand):
+    help = 'Store username, role, is_active and display name of each user in its CV profile (and mark orphaned profiles)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of profiles updated per bulk write (default: 500)'
+        )
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only fill profiles that have no user fields yet (run on every deploy)'
+        )
+
+    def handle(self, *args, **options):
+        counts = backfill_profile_users(batch_size=options['batch_size'], missing_only=options['missing_only'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {counts["profiles"]} profiles: {counts["updated"]} updated, '
+            f'{counts["orphaned"]} without a user (hidden from listings)'
+        ))
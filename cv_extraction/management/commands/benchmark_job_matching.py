@@ -0,0 +1,115 @@
+"""
+Django management command to measure job-description matching latency on synthetic profiles.
+Usage: python manage.py benchmark_job_matching [--profiles 10000 100000] [--queries 50]
+"""
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from cv_extraction.job_matching import JobMatchIndex
+from cv_extraction.mongodb_utils import CV_PROFILE_SCHEMA_VERSION
+
+
+def _milliseconds(seconds: float) -> str:
+    return f'{seconds * 1000:.1f}ms'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark building, saving, loading and querying the job matching index (no database needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles',
+            type=int,
+            nargs='+',
+            default=[10000, 100000],
+            help='Profile counts to benchmark (default: 10000 100000)'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=50,
+            help='Job descriptions matched per profile count (default: 50)'
+        )
+        parser.add_argument(
+            '--vocabulary',
+            type=int,
+            default=20000,
+            help='Distinct terms in the synthetic profiles (default: 20000)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed'
+        )
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        vocabulary = np.array([f'term{i}' for i in range(options['vocabulary'])])
+        # Term frequencies of real text are roughly Zipf-distributed
+        cumulative = np.cumsum(1 / np.arange(1, len(vocabulary) + 1))
+        cumulative /= cumulative[-1]
+
+        def words(count):
+            return ' '.join(vocabulary[np.searchsorted(cumulative, rng.random(count))])
+
+        def profile(user_id):
+            return {
+                'user_id': user_id,
+                'skills_normalized': words(8).split(),
+                'summary': words(40),
+                'experience': [words(25), words(25)],
+                'schema_version': CV_PROFILE_SCHEMA_VERSION,
+            }
+
+        for profile_count in options['profiles']:
+            profiles = [profile(user_id) for user_id in range(profile_count)]
+            index = JobMatchIndex()
+            started = time.perf_counter()
+            index.build_from(profiles)
+            build_seconds = time.perf_counter() - started
+
+            with tempfile.TemporaryDirectory() as directory:
+                started = time.perf_counter()
+                index.save(directory)
+                save_seconds = time.perf_counter() - started
+                loaded = JobMatchIndex()
+                started = time.perf_counter()
+                loaded.load(directory)
+                load_seconds = time.perf_counter() - started
+
+                descriptions = [words(120) for _ in range(options['queries'])]
+                latencies = []
+                for description in descriptions:
+                    started = time.perf_counter()
+                    loaded.score(description, 20)
+                    latencies.append(time.perf_counter() - started)
+
+                updates = [profile(user_id) for user_id in range(500)]
+                started = time.perf_counter()
+                for update in updates:
+                    loaded.profile_saved(update['user_id'], update)
+                update_seconds = (time.perf_counter() - started) / len(updates)
+                pending_latencies = []
+                for description in descriptions:
+                    started = time.perf_counter()
+                    loaded.score(description, 20)
+                    pending_latencies.append(time.perf_counter() - started)
+                # Saving merges the pending rows first
+                started = time.perf_counter()
+                loaded.save(directory)
+                compact_seconds = time.perf_counter() - started
+
+            self.stdout.write(self.style.SUCCESS(f'{profile_count} profiles'))
+            self.stdout.write(f'   build {build_seconds:.2f}s, save {_milliseconds(save_seconds)}, load (mmap) {_milliseconds(load_seconds)}')
+            self.stdout.write(
+                f'   match p50 {_milliseconds(np.percentile(latencies, 50))}, '
+                f'p95 {_milliseconds(np.percentile(latencies, 95))}'
+            )
+            self.stdout.write(
+                f'   with 500 pending updates: p50 {_milliseconds(np.percentile(pending_latencies, 50))}; '
+                f'update {_milliseconds(update_seconds)} per profile, compaction + save {_milliseconds(compact_seconds)}'
+            )
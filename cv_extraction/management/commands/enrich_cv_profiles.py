@@ -0,0 +1,25 @@
+"""
+Django management command to re-extract CV profiles that were extracted offline.
+Usage: python manage.py enrich_cv_profiles [--limit N]
+"""
+from django.core.management.base import BaseCommand
+
+from cv_extraction.extraction_jobs import requeue_jobs_for_enrichment
+
+
+class Command(BaseCommand):
+    help = 'Re-queue extraction jobs whose profiles were extracted offline (needs_enrichment) for Cohere extraction'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Maximum number of jobs to re-queue (default: all)'
+        )
+
+    def handle(self, *args, **options):
+        count = requeue_jobs_for_enrichment(options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Re-queued {count} extraction jobs for enrichment; run_extraction_worker will process them'
+        ))
@@ -0,0 +1,59 @@
+"""
+Django management command to create the MongoDB indexes and report their usage.
+Usage: python manage.py ensure_mongo_indexes [--collection NAME] [--report]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from cv_extraction.mongo_indexes import INDEX_REGISTRY, ensure_indexes, get_index_report
+
+
+class Command(BaseCommand):
+    help = 'Create missing MongoDB indexes from the index registry and report index sizes and usage'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--collection',
+            action='append',
+            choices=sorted(INDEX_REGISTRY),
+            help='Only process this collection (can be repeated; default: all)'
+        )
+        parser.add_argument(
+            '--report',
+            action='store_true',
+            help='Only report index sizes and $indexStats usage, do not create indexes'
+        )
+
+    def handle(self, *args, **options):
+        collections = options['collection'] or sorted(INDEX_REGISTRY)
+
+        if not options['report']:
+            failed = 0
+            for name, result in ensure_indexes(collections).items():
+                self.stdout.write(
+                    f'{name}: {len(result["created"])} created, {len(result["existing"])} already present'
+                )
+                for index_name in result['created']:
+                    self.stdout.write(self.style.SUCCESS(f'   + {index_name}'))
+                for index_name in result['failed']:
+                    self.stdout.write(self.style.ERROR(f'   ! {index_name} could not be created (see log)'))
+                failed += len(result['failed'])
+            if failed:
+                raise CommandError(f'{failed} indexes could not be created')
+
+        self.stdout.write('\nIndex usage since the last mongod restart:')
+        for name in collections:
+            self.stdout.write(f'{name}:')
+            for index in get_index_report(name):
+                flags = []
+                if index['unused']:
+                    flags.append('UNUSED')
+                if not index['declared']:
+                    flags.append('not in registry')
+                line = (
+                    f'   {index["name"]:<28} {index["size_bytes"] / 1024:>10.1f} KB '
+                    f'{index["accesses"]:>10} accesses'
+                )
+                if flags:
+                    self.stdout.write(self.style.WARNING(f'{line}  [{", ".join(flags)}]'))
+                else:
+                    self.stdout.write(line)
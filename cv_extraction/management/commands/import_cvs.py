@@ -0,0 +1,261 @@
+"""
+Django management command to bulk import CV files.
+Usage: python manage.py import_cvs <dir-or-zip> [--manifest cvs.csv] [--concurrency N]
+"""
+import csv
+import json
+import os
+import time
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from cv_extraction.cv_extractor import CVExtractor
+from cv_extraction.extraction_jobs import record_offline_extraction
+from cv_extraction.mongodb_utils import bulk_save_cv_profiles
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.doc')
+
+
+class Command(BaseCommand):
+    help = 'Import a directory or ZIP of CV files, extracting them concurrently and bulk-saving the profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', type=str, help='Directory or .zip file containing CVs')
+        parser.add_argument(
+            '--manifest',
+            type=str,
+            help='CSV with a "filename" column and one of "user_id", "username" or "email" '
+                 '(default: match the file name to a username or email)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Number of CVs extracted at the same time (default: 4)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of profiles written per bulk upsert (default: 50)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            help='Checkpoint file used to resume an interrupted import (default: <source>.checkpoint)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how files map to users'
+        )
+
+    def handle(self, *args, **options):
+        source = Path(options['source'])
+        if not source.exists():
+            raise CommandError(f'Source not found: {source}')
+
+        checkpoint_path = Path(options['checkpoint'] or f'{source}.checkpoint')
+        done = self._load_checkpoint(checkpoint_path)
+        if done:
+            self.stdout.write(f'Resuming: {len(done)} files already imported according to {checkpoint_path}')
+
+        resolve_user = self._build_user_resolver(options['manifest'])
+
+        self.timings = defaultdict(float)
+        self.counts = defaultdict(int)
+        started = time.monotonic()
+
+        self._archive = zipfile.ZipFile(source) if source.is_file() and zipfile.is_zipfile(source) else None
+        try:
+            self._import(source, checkpoint_path, done, resolve_user, started, options)
+        finally:
+            if self._archive is not None:
+                self._archive.close()
+
+    def _import(self, source, checkpoint_path, done, resolve_user, started, options):
+        """Map files to users, extract them concurrently and write profiles in batches."""
+        entries = []
+        for name in self._list_files(source):
+            if name in done:
+                self.counts['already_imported'] += 1
+                continue
+            user_id = resolve_user(name)
+            if user_id is None:
+                self.counts['unmapped'] += 1
+                self.stderr.write(f'No user found for {name}, skipping')
+                continue
+            entries.append((name, user_id))
+
+        if options['dry_run']:
+            for name, user_id in entries:
+                self.stdout.write(f'{name} -> user {user_id}')
+            self._report(started)
+            return
+
+        # Cohere calls go through the shared rate limiter (COHERE_RATE_LIMIT_PER_MINUTE)
+        extractor = CVExtractor()
+        concurrency = max(1, options['concurrency'])
+        batch_size = max(1, options['batch_size'])
+        batch = []
+
+        with open(checkpoint_path, 'a', encoding='utf-8') as checkpoint, \
+                ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = set()
+            for name, user_id in entries:
+                # Keep a bounded number of files in memory
+                while len(pending) >= concurrency * 2:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    batch.extend(self._collect(finished))
+                    if len(batch) >= batch_size:
+                        self._write_batch(batch, checkpoint)
+                        batch = []
+
+                read_started = time.monotonic()
+                file_content = self._read_file(source, name)
+                self.timings['read'] += time.monotonic() - read_started
+
+                pending.add(executor.submit(self._extract, extractor, name, user_id, file_content))
+
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                batch.extend(self._collect(finished))
+                if len(batch) >= batch_size:
+                    self._write_batch(batch, checkpoint)
+                    batch = []
+
+            if batch:
+                self._write_batch(batch, checkpoint)
+
+        self._report(started)
+
+    def _list_files(self, source: Path):
+        """Yield supported CV file names (relative to the source) in a stable order."""
+        if self._archive is not None:
+            names = [info.filename for info in self._archive.infolist() if not info.is_dir()]
+        else:
+            names = [
+                str(path.relative_to(source)) for path in source.rglob('*') if path.is_file()
+            ]
+        for name in sorted(names):
+            if name.lower().endswith(SUPPORTED_EXTENSIONS) and not os.path.basename(name).startswith('.'):
+                yield name
+
+    def _read_file(self, source: Path, name: str) -> bytes:
+        # Files are read one at a time on the main thread (ZipFile is not thread-safe)
+        if self._archive is not None:
+            return self._archive.read(name)
+        return (source / name).read_bytes()
+
+    def _build_user_resolver(self, manifest_path):
+        """Return a function mapping a file name to a user ID (or None)."""
+        users = list(User.objects.values_list('id', 'username', 'email'))
+        by_id = {user_id for user_id, _, _ in users}
+        by_username = {username.lower(): user_id for user_id, username, _ in users}
+        by_email = {email.lower(): user_id for user_id, _, email in users if email}
+
+        def lookup(user_id=None, username=None, email=None):
+            if user_id:
+                try:
+                    user_id = int(user_id)
+                except ValueError:
+                    return None
+                return user_id if user_id in by_id else None
+            if username:
+                return by_username.get(username.strip().lower())
+            if email:
+                return by_email.get(email.strip().lower())
+            return None
+
+        if manifest_path:
+            mapping = {}
+            with open(manifest_path, newline='', encoding='utf-8') as manifest:
+                for row in csv.DictReader(manifest):
+                    filename = (row.get('filename') or '').strip()
+                    if filename:
+                        mapping[filename] = lookup(row.get('user_id'), row.get('username'), row.get('email'))
+            return lambda name: mapping.get(name, mapping.get(os.path.basename(name)))
+
+        def from_filename(name):
+            stem = Path(name).stem
+            return lookup(username=stem) or lookup(email=stem)
+
+        return from_filename
+
+    def _load_checkpoint(self, checkpoint_path: Path):
+        done = set()
+        if checkpoint_path.exists():
+            with open(checkpoint_path, encoding='utf-8') as checkpoint:
+                for line in checkpoint:
+                    line = line.strip()
+                    if line:
+                        done.add(json.loads(line)['file'])
+        return done
+
+    def _extract(self, extractor, name, user_id, file_content):
+        """Parse and extract one CV (runs in a worker thread)."""
+        metrics = {}
+        try:
+            cv_data = extractor.process_cv_file(file_content, os.path.basename(name), metrics=metrics)
+            return name, user_id, file_content, cv_data.model_dump(), metrics, None
+        except Exception as e:
+            return name, user_id, file_content, None, metrics, str(e)
+
+    def _collect(self, finished):
+        results = []
+        for future in finished:
+            name, user_id, file_content, cv_dict, metrics, error = future.result()
+            for stage in ('parse', 'extract'):
+                self.timings[stage] += metrics.get(stage, 0.0)
+            for key in ('tokens_before', 'tokens_after'):
+                self.counts[key] += metrics.get(key, 0)
+            if error:
+                self.counts['failed'] += 1
+                self.stderr.write(f'Failed to extract {name}: {error}')
+            else:
+                offline = cv_dict.get('needs_enrichment')
+                if offline:
+                    self.counts['offline'] += 1
+                elif 'extract' not in metrics:
+                    self.counts['cache_hits'] += 1
+                # Offline results keep their file for enrich_cv_profiles
+                results.append((name, user_id, cv_dict, file_content if offline else None))
+        return results
+
+    def _write_batch(self, batch, checkpoint):
+        """Bulk upsert a batch of profiles, then record the files as imported."""
+        started = time.monotonic()
+        result = bulk_save_cv_profiles((user_id, cv_dict) for _, user_id, cv_dict, _ in batch)
+        if result['failed']:
+            raise CommandError(f'{result["failed"]} profiles in the batch could not be saved')
+        for name, user_id, cv_dict, file_content in batch:
+            if file_content is not None:
+                record_offline_extraction(user_id, file_content, os.path.basename(name), cv_dict)
+        for name, user_id, _, _ in batch:
+            checkpoint.write(json.dumps({'file': name, 'user_id': user_id}) + '\n')
+        checkpoint.flush()
+        self.timings['write'] += time.monotonic() - started
+        self.counts['imported'] += len(batch)
+        self.stdout.write(f'Imported {self.counts["imported"]} CVs')
+
+    def _report(self, started):
+        elapsed = time.monotonic() - started
+        imported = self.counts['imported']
+        per_minute = imported / (elapsed / 60) if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f'\nImported {imported} CVs in {elapsed:.1f}s ({per_minute:.1f} CVs/min)'
+        ))
+        for key in ('already_imported', 'unmapped', 'failed', 'cache_hits', 'offline'):
+            self.stdout.write(f'   {key.replace("_", " ").capitalize()}: {self.counts[key]}')
+        if self.counts['tokens_before']:
+            self.stdout.write(
+                f'   Prompt tokens (est.): {self.counts["tokens_before"]} -> {self.counts["tokens_after"]} after compaction'
+            )
+        self.stdout.write('   Stage timing (total seconds across workers):')
+        for stage in ('read', 'parse', 'extract', 'write'):
+            self.stdout.write(f'     {stage:<8} {self.timings[stage]:.1f}s')
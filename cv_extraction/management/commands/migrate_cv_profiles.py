@@ -0,0 +1,48 @@
+"""
+Django management command to upgrade stored CV profiles to the current document schema.
+Usage: python manage.py migrate_cv_profiles [--batch-size N] [--dry-run]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from cv_extraction.mongodb_utils import CV_PROFILE_SCHEMA_VERSION, migrate_cv_profiles, rebuild_cv_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Normalize stored CV profiles (int user_id, float gpa, trimmed strings, skills_normalized) '
+        'and set schema_version; safe to interrupt and re-run'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of profiles read and written per chunk (default: 500)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the profiles that are not on the current schema version'
+        )
+
+    def handle(self, *args, **options):
+        counts = migrate_cv_profiles(batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        if options['dry_run']:
+            self.stdout.write(
+                f'{counts["scanned"]} profiles are older than schema version {CV_PROFILE_SCHEMA_VERSION}'
+            )
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Migrated {counts["migrated"]} of {counts["scanned"]} profiles to schema version {CV_PROFILE_SCHEMA_VERSION}'
+        ))
+        if counts['migrated']:
+            # GPAs stored as strings were not counted before
+            rebuild_cv_stats()
+            self.stdout.write('Rebuilt cv_stats')
+        if counts['failed']:
+            raise CommandError(
+                f'{counts["failed"]} profiles could not be migrated (see log); fix them and run the command again'
+            )
@@ -0,0 +1,40 @@
+"""
+Django management command to recompute the cv_stats rollup used by the admin dashboard.
+Usage: python manage.py rebuild_cv_stats [--check]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from cv_extraction.mongodb_utils import check_cv_stats, rebuild_cv_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the cv_stats rollup from all CV profiles and report drift in the incremental counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drift, do not rewrite the rollup (exits with an error if it drifted)'
+        )
+
+    def handle(self, *args, **options):
+        drift = check_cv_stats()
+        if drift:
+            self.stdout.write(self.style.WARNING(f'cv_stats drifted in {len(drift)} counters:'))
+            for line in drift[:50]:
+                self.stdout.write(f'   {line}')
+            if len(drift) > 50:
+                self.stdout.write(f'   ... and {len(drift) - 50} more')
+        else:
+            self.stdout.write('cv_stats matches the profiles')
+
+        if options['check']:
+            if drift:
+                raise CommandError('cv_stats is out of date; run rebuild_cv_stats to fix it')
+            return
+
+        stats = rebuild_cv_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt cv_stats from {stats["count"]} profiles '
+            f'({len(stats["skills"])} skills, {len(stats["majors"])} majors)'
+        ))
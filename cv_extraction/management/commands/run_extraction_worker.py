@@ -0,0 +1,124 @@
+"""
+Django management command to process queued CV extraction jobs.
+Usage: python manage.py run_extraction_worker [--concurrency N] [--once]
+"""
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cv_extraction.cv_extractor import CVExtractor
+from cv_extraction.extraction_jobs import (
+    claim_next_job, process_job, ensure_job_indexes, default_worker_id
+)
+from cv_extraction.mongodb_utils import MongoDBManager
+
+
+class Command(BaseCommand):
+    help = 'Process queued CV extraction jobs with a configurable number of concurrent workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.EXTRACTION_WORKER_CONCURRENCY,
+            help='Number of jobs processed at the same time (default: EXTRACTION_WORKER_CONCURRENCY)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=settings.EXTRACTION_WORKER_POLL_INTERVAL,
+            help='Seconds to wait before polling again when the queue is empty'
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            default=settings.EXTRACTION_JOB_LEASE_SECONDS,
+            help='How long a claimed job is reserved before other workers may retry it'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling forever'
+        )
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        poll_interval = options['poll_interval']
+        lease_seconds = options['lease_seconds']
+        once = options['once']
+
+        ensure_job_indexes()
+
+        self._stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        signal.signal(signal.SIGINT, lambda *_: self._stop.set())
+
+        self._lock = threading.Lock()
+        self._succeeded = 0
+        self._failed = 0
+
+        base_worker_id = default_worker_id()
+        self.stdout.write(
+            f'Extraction worker {base_worker_id} started with concurrency {concurrency}'
+        )
+
+        threads = []
+        for slot in range(concurrency):
+            thread = threading.Thread(
+                target=self._run_slot,
+                args=(f'{base_worker_id}:{slot}', poll_interval, lease_seconds, once),
+                name=f'extraction-worker-{slot}',
+                daemon=True,
+            )
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            # Join with a timeout so signals are still delivered to the main thread
+            while thread.is_alive():
+                thread.join(timeout=1)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Extraction worker stopped: {self._succeeded} succeeded, {self._failed} failed attempts'
+            )
+        )
+
+    def _run_slot(self, worker_id, poll_interval, lease_seconds, once):
+        """Claim and process jobs one at a time until stopped."""
+        extractor = None
+        while not self._stop.is_set():
+            try:
+                job = claim_next_job(worker_id, lease_seconds)
+            except Exception as e:
+                self.stderr.write(f'[{worker_id}] Failed to claim job: {str(e)}')
+                MongoDBManager.reset_connection()
+                self._stop.wait(poll_interval)
+                continue
+
+            if job is None:
+                if once:
+                    return
+                self._stop.wait(poll_interval)
+                continue
+
+            if extractor is None:
+                try:
+                    extractor = CVExtractor()
+                except ValueError as e:
+                    # process_job records the configuration error on the job
+                    self.stderr.write(f'[{worker_id}] Cannot create CV extractor: {str(e)}')
+
+            started = time.monotonic()
+            succeeded = process_job(job, worker_id, extractor, lease_seconds)
+            elapsed = time.monotonic() - started
+            with self._lock:
+                if succeeded:
+                    self._succeeded += 1
+                else:
+                    self._failed += 1
+            status = 'succeeded' if succeeded else 'failed'
+            self.stdout.write(f'[{worker_id}] Job {job["_id"]} {status} in {elapsed:.1f}s')
@@ -0,0 +1,187 @@
+"""
+Cohere model registry with a per-model circuit breaker.
+
+A model that answers with 404 / "was removed" is taken out of rotation for
+``COHERE_MODEL_REMOVED_COOLDOWN_SECONDS``; a model that fails with
+``COHERE_MODEL_FAILURE_THRESHOLD`` consecutive 5xx errors is taken out for
+``COHERE_MODEL_FAILURE_COOLDOWN_SECONDS``. Breaker state is stored in the
+``cohere_model_state`` MongoDB collection so every worker skips a retired
+model after the first one has discovered it.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from django.conf import settings
+
+from .mongodb_utils import MongoDBManager
+
+logger = logging.getLogger(__name__)
+
+MODEL_STATE_COLLECTION = 'cohere_model_state'
+
+ERROR_REMOVED = 'removed'
+ERROR_SERVER = 'server'
+
+
+def classify_model_error(error: Exception) -> Optional[str]:
+    """
+    Classify a failed chat call.
+
+    Returns:
+        ERROR_REMOVED if the model no longer exists, ERROR_SERVER for 5xx
+        responses, or None for errors that are not the model's fault
+        (auth, rate limits, bad requests)
+    """
+    status_code = getattr(error, 'status_code', None)
+    if status_code == 404:
+        return ERROR_REMOVED
+    if isinstance(status_code, int) and status_code >= 500:
+        return ERROR_SERVER
+
+    error_str = str(error).lower()
+    if 'removed' in error_str or 'not found' in error_str or '404' in error_str:
+        return ERROR_REMOVED
+    if status_code is None and any(code in error_str for code in ('500', '502', '503', '504')):
+        return ERROR_SERVER
+    return None
+
+
+class ModelRegistry:
+    """Ordered list of Cohere chat models with shared circuit breaker state."""
+
+    def __init__(self, models: Optional[List[str]] = None):
+        self._models = models
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict] = {}
+        self._loaded_at = 0.0
+
+    @property
+    def models(self) -> List[str]:
+        return self._models if self._models is not None else settings.COHERE_MODELS
+
+    def _collection(self):
+        return MongoDBManager.get_collection(MODEL_STATE_COLLECTION)
+
+    def _refresh(self, force: bool = False):
+        """Reload breaker state from MongoDB at most every few seconds."""
+        if not force and time.monotonic() - self._loaded_at < settings.COHERE_MODEL_STATE_REFRESH_SECONDS:
+            return
+        try:
+            documents = self._collection().find({'_id': {'$in': self.models}}, max_time_ms=3000)
+            state = {document['_id']: document for document in documents}
+        except PyMongoError as e:
+            # Keep the in-process view; it still protects this worker
+            logger.warning(f'Could not load Cohere model state: {str(e)}')
+            state = None
+        with self._lock:
+            if state is not None:
+                self._state = state
+            self._loaded_at = time.monotonic()
+
+    def is_available(self, model: str, now: Optional[datetime] = None) -> bool:
+        now = now or datetime.utcnow()
+        unavailable_until = self._state.get(model, {}).get('unavailable_until')
+        return unavailable_until is None or unavailable_until <= now
+
+    def available_models(self) -> List[str]:
+        """
+        Models to try, in preference order, skipping those with an open breaker.
+
+        If every breaker is open all models are returned so a recovered model
+        can still be found instead of failing without a request.
+        """
+        self._refresh()
+        now = datetime.utcnow()
+        healthy = [model for model in self.models if self.is_available(model, now)]
+        return healthy or list(self.models)
+
+    def _save(self, model: str, update: Dict) -> Dict:
+        """Apply a $set/$inc update to the shared state and return the new state."""
+        try:
+            document = self._collection().find_one_and_update(
+                {'_id': model},
+                update,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except PyMongoError as e:
+            logger.warning(f'Could not save Cohere model state for {model}: {str(e)}')
+            # Apply the update locally so this worker is still protected
+            document = dict(self._state.get(model, {'_id': model}))
+            document.update(update.get('$set', {}))
+            for field, amount in update.get('$inc', {}).items():
+                document[field] = document.get(field, 0) + amount
+        with self._lock:
+            self._state[model] = document
+        return document
+
+    def record_success(self, model: str):
+        """
+        Close the breaker of a model that answered successfully.
+
+        The reset is conditional on the shared state rather than this
+        worker's cached copy, so failures recorded by other workers since the
+        last refresh are cleared too; a healthy model matches nothing and is
+        not written.
+        """
+        healthy = {'consecutive_failures': 0, 'unavailable_until': None, 'updated_at': datetime.utcnow()}
+        try:
+            self._collection().update_one(
+                {
+                    '_id': model,
+                    '$or': [
+                        {'consecutive_failures': {'$gt': 0}},
+                        {'unavailable_until': {'$ne': None}},
+                    ],
+                },
+                {'$set': healthy},
+            )
+        except PyMongoError as e:
+            logger.warning(f'Could not save Cohere model state for {model}: {str(e)}')
+        with self._lock:
+            if model in self._state:
+                self._state[model] = {**self._state[model], **healthy}
+
+    def record_failure(self, model: str, error_kind: str, error: Exception):
+        """Count a failure and open the breaker when the model should be skipped."""
+        now = datetime.utcnow()
+        if error_kind == ERROR_REMOVED:
+            cooldown = settings.COHERE_MODEL_REMOVED_COOLDOWN_SECONDS
+            self._save(model, {
+                '$set': {
+                    'unavailable_until': now + timedelta(seconds=cooldown),
+                    'last_error': str(error)[:500],
+                    'updated_at': now,
+                },
+                '$inc': {'consecutive_failures': 1},
+            })
+            logger.warning(f'Cohere model {model} unavailable, skipping it for {cooldown}s')
+            return
+
+        document = self._save(model, {
+            '$set': {'last_error': str(error)[:500], 'updated_at': now},
+            '$inc': {'consecutive_failures': 1},
+        })
+        failures = document.get('consecutive_failures', 0)
+        if failures >= settings.COHERE_MODEL_FAILURE_THRESHOLD:
+            cooldown = settings.COHERE_MODEL_FAILURE_COOLDOWN_SECONDS
+            self._save(model, {'$set': {
+                'unavailable_until': now + timedelta(seconds=cooldown),
+                'consecutive_failures': 0,
+            }})
+            logger.warning(f'Cohere model {model} failed {failures} times, skipping it for {cooldown}s')
+
+    def reset(self):
+        """Close every breaker (e.g. after changing COHERE_MODELS)."""
+        self._collection().delete_many({'_id': {'$in': self.models}})
+        with self._lock:
+            self._state = {}
+            self._loaded_at = 0.0
+
+
+model_registry = ModelRegistry()
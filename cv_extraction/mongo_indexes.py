@@ -0,0 +1,144 @@
+"""
+Declarative MongoDB index registry.
+
+Every index the application relies on is listed in ``INDEX_REGISTRY`` by
+collection. ``ensure_indexes`` creates the ones that are missing (it is safe
+to run repeatedly), ``python manage.py ensure_mongo_indexes`` runs it from the
+command line, and ``MONGODB_ENSURE_INDEXES_ON_STARTUP`` runs it in a
+background thread when the app starts. ``get_index_report`` combines
+``$indexStats`` with the collection's index sizes to spot unused indexes.
+"""
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+from django.conf import settings
+
+from .mongodb_utils import MongoDBManager
+
+logger = logging.getLogger(__name__)
+
+INDEX_REGISTRY: Dict[str, List[IndexModel]] = {
+    'cv_profiles': [
+        IndexModel([('user_id', ASCENDING)], name='user_id_unique', unique=True),
+        IndexModel([('gpa', ASCENDING)], name='gpa'),
+        IndexModel([('major', ASCENDING)], name='major'),
+        # Multikey: one entry per skill in the array
+        IndexModel([('skills', ASCENDING)], name='skills'),
+        IndexModel([('skills_normalized', ASCENDING)], name='skills_normalized'),
+        IndexModel([('updated_at', DESCENDING)], name='updated_at'),
+        IndexModel(
+            [('full_name', TEXT), ('summary', TEXT), ('experience', TEXT)],
+            name='profile_text',
+            weights={'full_name': 10, 'summary': 5, 'experience': 1},
+            # No stemming: profiles mix Arabic and English
+            default_language='none',
+        ),
+    ],
+    'extraction_jobs': [
+        IndexModel([('status', ASCENDING), ('available_at', ASCENDING)], name='status_available_at'),
+        IndexModel([('status', ASCENDING), ('lease_expires_at', ASCENDING)], name='status_lease_expires_at'),
+        IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING)], name='user_id_created_at'),
+    ],
+    'extraction_cache': [
+        IndexModel(
+            [('created_at', ASCENDING)],
+            name='created_at_ttl',
+            expireAfterSeconds=settings.EXTRACTION_CACHE_TTL_SECONDS,
+        ),
+        IndexModel([('level', ASCENDING), ('last_hit_at', ASCENDING)], name='level_last_hit_at'),
+    ],
+}
+
+
+def ensure_indexes(collections: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Create the registered indexes that do not exist yet.
+
+    Indexes are created one at a time, so one failure (e.g. duplicate
+    user_ids blocking the unique index) does not stop the others.
+
+    Args:
+        collections: Collection names to process (default: all registered)
+
+    Returns:
+        Per collection, the names of the 'created', 'existing' and 'failed' indexes
+    """
+    names = list(collections) if collections is not None else list(INDEX_REGISTRY)
+    results = {}
+    for name in names:
+        collection = MongoDBManager.get_collection(name)
+        result = {'created': [], 'existing': [], 'failed': []}
+        try:
+            existing = set(collection.index_information())
+        except PyMongoError as e:
+            logger.error(f'Could not list indexes of {name}: {str(e)}')
+            MongoDBManager.reset_connection()
+            raise
+        for index in INDEX_REGISTRY.get(name, []):
+            index_name = index.document['name']
+            if index_name in existing:
+                result['existing'].append(index_name)
+                continue
+            try:
+                collection.create_indexes([index])
+                result['created'].append(index_name)
+                logger.info(f'Created index {index_name} on {name}')
+            except OperationFailure as e:
+                result['failed'].append(index_name)
+                logger.error(f'Could not create index {index_name} on {name}: {str(e)}')
+        results[name] = result
+    return results
+
+
+def ensure_indexes_in_background() -> threading.Thread:
+    """Run ``ensure_indexes`` in a daemon thread so startup is not delayed."""
+    def run():
+        try:
+            ensure_indexes()
+        except PyMongoError as e:
+            logger.warning(f'Background index build failed: {str(e)}')
+
+    thread = threading.Thread(target=run, name='ensure-mongo-indexes', daemon=True)
+    thread.start()
+    return thread
+
+
+def get_index_report(collection_name: str) -> List[Dict]:
+    """
+    Size and usage of every index on a collection.
+
+    Usage counters come from ``$indexStats`` and reset when mongod restarts;
+    an index with no accesses since then is reported as unused.
+
+    Returns:
+        One dict per index with name, key, size_bytes, accesses, since,
+        declared (listed in INDEX_REGISTRY) and unused
+    """
+    collection = MongoDBManager.get_collection(collection_name)
+    declared = {index.document['name'] for index in INDEX_REGISTRY.get(collection_name, [])}
+    try:
+        usage = {stats['name']: stats for stats in collection.aggregate([{'$indexStats': {}}])}
+        sizes = MongoDBManager.get_database().command('collStats', collection_name).get('indexSizes', {})
+        indexes = collection.index_information()
+    except PyMongoError as e:
+        logger.error(f'Could not load index stats of {collection_name}: {str(e)}')
+        MongoDBManager.reset_connection()
+        raise
+
+    report = []
+    for name, info in indexes.items():
+        accesses = usage.get(name, {}).get('accesses', {})
+        ops = accesses.get('ops', 0)
+        report.append({
+            'name': name,
+            'key': info.get('key'),
+            'size_bytes': sizes.get(name, 0),
+            'accesses': ops,
+            'since': accesses.get('since'),
+            'declared': name in declared or name == '_id_',
+            'unused': ops == 0 and name != '_id_',
+        })
+    return sorted(report, key=lambda index: index['name'])
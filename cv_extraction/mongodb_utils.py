@@ -2,15 +2,97 @@
 MongoDB connection and utility functions.
 """
 import pymongo
-from pymongo import MongoClient
-from pymongo.errors import ServerSelectionTimeoutError, ConnectionFailure, PyMongoError
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import (
+    ServerSelectionTimeoutError, ConnectionFailure, PyMongoError, BulkWriteError, OperationFailure,
+    DuplicateKeyError
+)
+from bson import ObjectId
+from bson.errors import InvalidId
 from django.conf import settings
-from typing import Optional, Dict, List
+from django.core import signing
+from django.core.cache import caches
+from django.dispatch import Signal
+from typing import Optional, Dict, List, Iterable, Tuple
 from datetime import datetime
 import logging
+import re
+import threading
+import time
+
+from .skill_catalog import canonical_skill
 
 logger = logging.getLogger(__name__)
 
+CV_PROFILES_COLLECTION = 'cv_profiles'
+
+# Version of the stored profile document; older documents are upgraded by
+# ``migrate_cv_profiles`` or lazily when read. Version 2: int user_id, float gpa,
+# trimmed strings, skills_normalized always present. Version 3: skills_normalized
+# holds canonical skill ids (bump again when SKILL_ALIASES changes). Version 4:
+# multi-word skills are matched word by word ("product management" stays apart).
+CV_PROFILE_SCHEMA_VERSION = 4
+_TRIMMED_FIELDS = ('full_name', 'email', 'phone', 'summary', 'major')
+_GPA_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+# Sent after this process wrote a profile (user_id, document: the stored fields)
+# or deleted one (user_id); used to update the in-process indexes
+profile_saved = Signal()
+profile_deleted = Signal()
+
+# Rollup of profile statistics kept up to date by the save/delete functions
+CV_STATS_COLLECTION = 'cv_stats'
+CV_STATS_ID = 'profiles'
+# Profile fields the rollup is computed from
+_STATS_FIELDS = {'skills': 1, 'major': 1, 'gpa': 1}
+
+# MongoDB error code for a $text query without a text index
+_INDEX_NOT_FOUND = 27
+_retried_text_index = threading.Event()
+
+# Fields fetched for each way a profile is displayed ("full" = whole document)
+PROFILE_SHAPES = {
+    # Listing cards: name, contact, major, GPA, skills and a summary snippet
+    'card': {
+        'user_id': 1, 'user': 1, 'full_name': 1, 'email': 1, 'major': 1, 'gpa': 1,
+        'skills': 1, 'summary': 1, 'updated_at': 1, 'schema_version': 1,
+    },
+    # Side-by-side comparison and its scoring (list lengths)
+    'compare': {
+        'user_id': 1, 'user': 1, 'full_name': 1, 'email': 1, 'major': 1, 'gpa': 1,
+        'skills': 1, 'experience': 1, 'education': 1, 'certifications': 1, 'schema_version': 1,
+    },
+    # Search results: card fields plus every searched field, for the snippets
+    'search': {
+        'user_id': 1, 'user': 1, 'full_name': 1, 'email': 1, 'major': 1, 'gpa': 1,
+        'skills': 1, 'summary': 1, 'experience': 1, 'education': 1, 'certifications': 1,
+        'languages': 1, 'schema_version': 1,
+    },
+    'full': None,
+}
+
+# GPA histogram buckets: lower boundary -> label, plus the open-ended top bucket
+GPA_BUCKETS = [
+    (float('-inf'), '0-2.0'),
+    (2.0, '2.0-2.5'),
+    (2.5, '2.5-3.0'),
+    (3.0, '3.0-3.5'),
+]
+GPA_TOP_BOUNDARY = 3.5
+GPA_TOP_BUCKET = '3.5-4.0'
+
+# Profiles whose Django user exists (``user`` is set to null when the user is deleted)
+HAS_USER_FILTER = {'user': {'$type': 'object'}}
+# User model fields copied into the profile's ``user`` subdocument
+USER_SYNC_FIELDS = ('username', 'role', 'is_active', 'first_name', 'last_name')
+
+# Bump when the cached profile shape changes so old entries are ignored
+PROFILE_CACHE_KEY_VERSION = 1
+
+PAGE_NEXT = 'next'
+PAGE_PREVIOUS = 'prev'
+PAGE_TOKEN_SALT = 'cv_extraction.profiles.page'
+
 
 def normalize_mongodb_uri(uri: str) -> str:
     """
@@ -130,11 +212,11 @@ class MongoDBManager:
         return cls._db
     
     @classmethod
-    def get_cv_collection(cls):
-        """Get CV collection."""
+    def get_collection(cls, name: str):
+        """Get a collection from the application database by name."""
         try:
             db = cls.get_database()
-            return db['cv_profiles']
+            return db[name]
         except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
             logger.error(f'MongoDB collection access failed: {str(e)}')
             # Reset connection on failure
@@ -142,6 +224,11 @@ class MongoDBManager:
             cls._db = None
             raise
     
+    @classmethod
+    def get_cv_collection(cls):
+        """Get CV collection."""
+        return cls.get_collection(CV_PROFILES_COLLECTION)
+    
     @classmethod
     def close_connection(cls):
         """Close MongoDB connection."""
@@ -159,76 +246,407 @@ class MongoDBManager:
         cls.close_connection()
 
 
-def save_cv_profile(user_id: int, cv_data: Dict) -> str:
+def normalize_skill(skill: str) -> str:
+    """Canonical id of a skill used for filtering ("JS", "java script" -> "javascript")."""
+    return canonical_skill(skill)
+
+
+def build_cv_profile_document(user_id: int, cv_data: Dict) -> Dict:
+    """Build the cv_profiles document for a user from CVExtract-shaped data."""
+    document = {
+        'user_id': user_id,
+        'full_name': cv_data.get('full_name', ''),
+        'email': cv_data.get('email', ''),
+        'phone': cv_data.get('phone', ''),
+        'summary': cv_data.get('summary', ''),
+        'skills': cv_data.get('skills', []),
+        'skills_normalized': [normalize_skill(skill) for skill in cv_data.get('skills') or []],
+        'education': cv_data.get('education', []),
+        'experience': cv_data.get('experience', []),
+        'certifications': cv_data.get('certifications', []),
+        'languages': cv_data.get('languages', []),
+        'gpa': cv_data.get('gpa'),
+        'major': cv_data.get('major', ''),
+        'needs_enrichment': bool(cv_data.get('needs_enrichment', False)),
+        'schema_version': CV_PROFILE_SCHEMA_VERSION,
+        'created_at': datetime.utcnow(),
+        'updated_at': datetime.utcnow(),
+    }
+    document.update(normalize_cv_profile_fields(document))
+    return document
+
+
+def _normalize_gpa(gpa) -> Optional[float]:
+    if gpa is None or isinstance(gpa, bool):
+        return None
+    if isinstance(gpa, (int, float)):
+        return float(gpa)
+    # Strings such as "3.6" or "3.6/4"
+    match = _GPA_NUMBER.search(str(gpa))
+    return float(match.group()) if match else None
+
+
+def normalize_cv_profile_fields(profile: Dict) -> Dict:
+    """
+    Normalized values of the fields of a (possibly projected) profile that need changing.
+    
+    Only fields present in ``profile`` are considered: ``user_id`` stored as a
+    string becomes an int, ``gpa`` a float, strings are trimmed and
+    ``skills_normalized`` is recomputed from the trimmed skills.
+    
+    Returns:
+        Dict of field -> normalized value (empty when nothing changes)
+    """
+    changes = {}
+    user_id = profile.get('user_id')
+    if isinstance(user_id, str) and user_id.strip().isdigit():
+        changes['user_id'] = int(user_id)
+    for field in _TRIMMED_FIELDS:
+        value = profile.get(field)
+        if value is None and field in profile:
+            changes[field] = ''
+        elif isinstance(value, str) and value != value.strip():
+            changes[field] = value.strip()
+    if 'gpa' in profile:
+        gpa = _normalize_gpa(profile['gpa'])
+        if gpa != profile['gpa'] or type(gpa) is not type(profile['gpa']):
+            changes['gpa'] = gpa
+    if 'skills' in profile:
+        skills = [str(skill).strip() for skill in profile['skills'] or [] if str(skill).strip()]
+        if skills != profile['skills']:
+            changes['skills'] = skills
+        skills_normalized = [normalize_skill(skill) for skill in skills]
+        if skills_normalized != profile.get('skills_normalized'):
+            changes['skills_normalized'] = skills_normalized
+    return changes
+
+
+def upgrade_cv_profile(profile: Dict) -> Dict:
+    """
+    Bring a profile read from MongoDB up to the current schema in place.
+    
+    Returns:
+        The fields that changed (empty if the profile was already current)
+    """
+    if profile.get('schema_version') == CV_PROFILE_SCHEMA_VERSION:
+        return {}
+    changes = normalize_cv_profile_fields(profile)
+    profile.update(changes)
+    return changes
+
+
+def build_user_fields(user) -> Dict:
+    """The Django user's fields stored in its profile, so listings need no SQL join."""
+    return {
+        'username': user.username,
+        'role': user.role,
+        'is_active': user.is_active,
+        'display_name': user.get_full_name() or user.username,
+    }
+
+
+def get_user_fields(user_ids: Iterable[int]) -> Dict[int, Dict]:
+    """``build_user_fields`` for many users with one SQL query (deleted users are absent)."""
+    from django.contrib.auth import get_user_model
+
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    return {user.id: build_user_fields(user) for user in get_user_model().objects.filter(id__in=user_ids)}
+
+
+def _profile_upsert(user_id: int, cv_data: Dict, user_fields: Optional[Dict] = None) -> Dict:
+    """Update document that replaces a user's profile fields, keeping created_at on updates."""
+    document = build_cv_profile_document(user_id, cv_data)
+    document['user'] = user_fields
+    created_at = document.pop('created_at')
+    return {'$set': document, '$setOnInsert': {'created_at': created_at}}
+
+
+def _log_ssl_hint(error_msg: str):
+    # If it's an SSL error, provide more helpful message
+    if 'SSL' in error_msg or 'TLS' in error_msg or 'handshake' in error_msg.lower():
+        logger.error('SSL/TLS handshake failed. This may be due to:')
+        logger.error('1. Python 3.13 SSL compatibility issues')
+        logger.error('2. Network/firewall blocking SSL connections')
+        logger.error('3. MongoDB Atlas SSL configuration')
+
+
+def save_cv_profile(user_id: int, cv_data: Dict, unchanged_since: Optional[datetime] = None) -> Optional[str]:
     """
     Save CV profile to MongoDB.
     
+    A single atomic upsert: the profile is created or replaced in one
+    round-trip, so concurrent saves for the same user cannot race. The
+    previous version is returned by the same call and used to update the
+    cv_stats rollup.
+    
     Args:
         user_id: Django User ID
         cv_data: Dictionary containing CV data matching CVExtract schema
+        unchanged_since: If given, only replace an existing profile that was
+            not updated after this time (never inserts)
     
     Returns:
-        MongoDB document ID as string
+        MongoDB document ID as string, or None if ``unchanged_since`` was
+        given and the profile changed after it (or no longer exists)
     """
     try:
         collection = MongoDBManager.get_cv_collection()
-        
-        document = {
-            'user_id': user_id,
-            'full_name': cv_data.get('full_name', ''),
-            'email': cv_data.get('email', ''),
-            'phone': cv_data.get('phone', ''),
-            'summary': cv_data.get('summary', ''),
-            'skills': cv_data.get('skills', []),
-            'education': cv_data.get('education', []),
-            'experience': cv_data.get('experience', []),
-            'certifications': cv_data.get('certifications', []),
-            'languages': cv_data.get('languages', []),
-            'gpa': cv_data.get('gpa'),
-            'major': cv_data.get('major', ''),
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow(),
-        }
-        
-        # Check if profile already exists for this user
-        existing = collection.find_one({'user_id': user_id}, max_time_ms=3000)
-        if existing:
-            document['updated_at'] = datetime.utcnow()
-            collection.update_one(
-                {'user_id': user_id},
-                {'$set': document},
-                max_time_ms=3000
-            )
-            return str(existing['_id'])
-        else:
-            result = collection.insert_one(document)
-            return str(result.inserted_id)
+        update = _profile_upsert(user_id, cv_data, get_user_fields([user_id]).get(user_id))
+        # Chosen here so the id is known even though the old document is returned
+        new_id = ObjectId()
+        update['$setOnInsert']['_id'] = new_id
+        # Not yet migrated profiles may store user_id as a string; the update sets it as an int
+        query = {'user_id': {'$in': [user_id, str(user_id)]}}
+        if unchanged_since is not None:
+            query['updated_at'] = {'$lte': unchanged_since}
+        previous = collection.find_one_and_update(
+            query,
+            update,
+            projection=dict(_STATS_FIELDS, _id=1),
+            upsert=unchanged_since is None,
+            return_document=ReturnDocument.BEFORE,
+            max_time_ms=3000,
+        )
+        if previous is None and unchanged_since is not None:
+            return None
+        profile_cache.invalidate([user_id])
+        _apply_stats_delta(_stats_delta(previous, update['$set']))
+        profile_saved.send(sender=None, user_id=user_id, document=update['$set'])
+        return str(previous['_id'] if previous else new_id)
     except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
         error_msg = str(e)
         logger.error(f'MongoDB error in save_cv_profile: {error_msg}')
         # Reset connection on any MongoDB error
         MongoDBManager.reset_connection()
-        # If it's an SSL error, provide more helpful message
-        if 'SSL' in error_msg or 'TLS' in error_msg or 'handshake' in error_msg.lower():
-            logger.error('SSL/TLS handshake failed. This may be due to:')
-            logger.error('1. Python 3.13 SSL compatibility issues')
-            logger.error('2. Network/firewall blocking SSL connections')
-            logger.error('3. MongoDB Atlas SSL configuration')
+        _log_ssl_hint(error_msg)
         raise
     except Exception as e:
         logger.error(f'Unexpected error in save_cv_profile: {str(e)}')
         raise
 
 
+def bulk_save_cv_profiles(profiles: Iterable[Tuple[int, Dict]], batch_size: int = 500) -> Dict[str, int]:
+    """
+    Save many CV profiles with unordered bulk upserts.
+    
+    Args:
+        profiles: (user_id, cv_data) pairs; a later pair for the same user
+            within a batch wins
+        batch_size: Number of upserts sent per bulk_write call
+    
+    Returns:
+        Counts of 'inserted', 'updated' and 'failed' profiles
+    """
+    counts = {'inserted': 0, 'updated': 0, 'failed': 0}
+    collection = MongoDBManager.get_cv_collection()
+
+    def flush(batch):
+        try:
+            # Previous versions for the cv_stats delta (not atomic with the write;
+            # rebuild_cv_stats corrects any drift from concurrent saves)
+            user_ids = [user_id for user_id, _ in batch]
+            previous = {
+                int(doc['user_id']): doc
+                for doc in collection.find(
+                    {'user_id': {'$in': user_ids + [str(user_id) for user_id in user_ids]}},
+                    dict(_STATS_FIELDS, user_id=1),
+                )
+            }
+            # Also match profiles still storing user_id as a string; the update sets it as an int
+            operations = [
+                UpdateOne({'user_id': {'$in': [user_id, str(user_id)]}}, update, upsert=True)
+                for user_id, update in batch
+            ]
+            failed = set()
+            try:
+                details = collection.bulk_write(operations, ordered=False).bulk_api_result
+            except BulkWriteError as e:
+                # Unordered: the other operations of the batch were still applied
+                details = e.details
+                failed = {error['index'] for error in details.get('writeErrors', [])}
+                counts['failed'] += len(failed)
+                logger.error(f'Bulk save of CV profiles had {len(failed)} errors')
+            finally:
+                profile_cache.invalidate(user_id for user_id, _ in batch)
+        except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
+            logger.error(f'MongoDB error in bulk_save_cv_profiles: {str(e)}')
+            MongoDBManager.reset_connection()
+            _log_ssl_hint(str(e))
+            raise
+        counts['inserted'] += details.get('nUpserted', 0)
+        counts['updated'] += details.get('nMatched', 0)
+
+        delta = {}
+        for index, (user_id, update) in enumerate(batch):
+            if index in failed:
+                continue
+            for field, amount in _stats_delta(previous.get(user_id), update['$set']).items():
+                delta[field] = delta.get(field, 0) + amount
+            previous[user_id] = update['$set']
+            profile_saved.send(sender=None, user_id=user_id, document=update['$set'])
+        _apply_stats_delta(delta)
+
+    def upserts(pending):
+        users = get_user_fields(user_id for user_id, _ in pending)
+        return [(user_id, _profile_upsert(user_id, cv_data, users.get(user_id))) for user_id, cv_data in pending]
+
+    pending = []
+    for user_id, cv_data in profiles:
+        pending.append((user_id, cv_data))
+        if len(pending) >= batch_size:
+            flush(upserts(pending))
+            pending = []
+    if pending:
+        flush(upserts(pending))
+    return counts
+
+
+class ProfileCache:
+    """
+    Read-through cache of single profiles on top of Django's cache framework.
+    
+    Every user has a version number stored in the cache, and the profile is
+    cached under a key that includes it. Writes invalidate by replacing the
+    version, so a reader that loaded the old document while a write happened
+    stores it under a key nobody reads any more. Entries expire after
+    ``PROFILE_CACHE_TTL_SECONDS``; with the local-memory backend the
+    invalidation only reaches the process that wrote, so deployments with
+    several processes should configure a shared cache backend.
+    """
+
+    # Cached for users without a profile (a cache miss returns None)
+    NO_PROFILE = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'hit_seconds': 0.0, 'miss_seconds': 0.0}
+
+    @property
+    def enabled(self) -> bool:
+        return settings.PROFILE_CACHE_ENABLED
+
+    @property
+    def cache(self):
+        return caches[settings.PROFILE_CACHE_ALIAS]
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f'cv_profile:v{PROFILE_CACHE_KEY_VERSION}:{user_id}'
+
+    @staticmethod
+    def _version_key(user_id: int) -> str:
+        return f'cv_profile_version:{user_id}'
+
+    def _version(self, user_id: int) -> int:
+        version_key = self._version_key(user_id)
+        version = self.cache.get(version_key)
+        if version is None:
+            # Never reuse a number after the version key was evicted
+            self.cache.add(version_key, time.time_ns(), timeout=None)
+            version = self.cache.get(version_key)
+        return version
+
+    def _record(self, hit: bool, seconds: float):
+        with self._lock:
+            self.counters['hits' if hit else 'misses'] += 1
+            self.counters['hit_seconds' if hit else 'miss_seconds'] += seconds
+
+    def get(self, user_id: int, loader) -> Optional[Dict]:
+        """
+        Cached profile of a user, loaded with ``loader(user_id)`` on a miss.
+        
+        The loader returns the profile, None if the user has no profile, or
+        raises; nothing is cached when it raises.
+        """
+        if not self.enabled:
+            return loader(user_id)
+        started = time.perf_counter()
+        try:
+            version = self._version(user_id)
+            profile = self.cache.get(self._key(user_id), version=version)
+        except Exception as e:
+            # The cache is an optimization - fall back to MongoDB
+            logger.warning(f'Profile cache lookup failed: {str(e)}')
+            return loader(user_id)
+        if profile is not None:
+            self._record(True, time.perf_counter() - started)
+            return profile or None
+
+        profile = loader(user_id)
+        try:
+            self.cache.set(
+                self._key(user_id),
+                profile if profile is not None else self.NO_PROFILE,
+                timeout=settings.PROFILE_CACHE_TTL_SECONDS,
+                version=version,
+            )
+        except Exception as e:
+            logger.warning(f'Profile cache store failed: {str(e)}')
+        self._record(False, time.perf_counter() - started)
+        return profile
+
+    def invalidate(self, user_ids: Iterable[int]):
+        """Drop the cached profiles of these users (call after every write)."""
+        if not self.enabled:
+            return
+        version = time.time_ns()
+        try:
+            self.cache.set_many({self._version_key(user_id): version for user_id in user_ids}, timeout=None)
+        except Exception as e:
+            logger.warning(f'Profile cache invalidation failed, entries expire after the TTL: {str(e)}')
+
+    def get_stats(self) -> Dict:
+        """Hit ratio and average lookup latency of this process."""
+        with self._lock:
+            stats = dict(self.counters)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['avg_hit_ms'] = round(stats['hit_seconds'] * 1000 / stats['hits'], 2) if stats['hits'] else 0.0
+        stats['avg_miss_ms'] = round(stats['miss_seconds'] * 1000 / stats['misses'], 2) if stats['misses'] else 0.0
+        return stats
+
+
+profile_cache = ProfileCache()
+
+
+def get_profile_cache_stats() -> Dict:
+    """Hit/miss counters and latencies of the profile cache."""
+    return profile_cache.get_stats()
+
+
+def _load_cv_profile(user_id: int) -> Optional[Dict]:
+    collection = MongoDBManager.get_cv_collection()
+    # Use shorter timeout to prevent worker timeout; not yet migrated profiles may store user_id as a string
+    profile = collection.find_one({'user_id': {'$in': [user_id, str(user_id)]}}, max_time_ms=3000)
+    if profile:
+        _upgrade_stored_profile(collection, profile)
+        profile['_id'] = str(profile['_id'])
+    return profile
+
+
+def _upgrade_stored_profile(collection, profile: Dict):
+    """Upgrade an old full profile on read and write the upgrade back."""
+    old_version = profile.get('schema_version')
+    if old_version == CV_PROFILE_SCHEMA_VERSION:
+        return
+    changes = upgrade_cv_profile(profile)
+    profile['schema_version'] = CV_PROFILE_SCHEMA_VERSION
+    try:
+        # Guarded by the old version so a concurrent save is never overwritten
+        collection.update_one(
+            {'_id': profile['_id'], 'schema_version': old_version},
+            {'$set': dict(changes, schema_version=CV_PROFILE_SCHEMA_VERSION)},
+        )
+    except DuplicateKeyError:
+        logger.warning(f'Profile {profile["_id"]} duplicates user {profile["user_id"]}, run migrate_cv_profiles')
+
+
 def get_cv_profile(user_id: int) -> Optional[Dict]:
-    """Get CV profile for a user."""
+    """Get CV profile for a user (read through the profile cache)."""
     try:
-        collection = MongoDBManager.get_cv_collection()
-        # Use shorter timeout to prevent worker timeout
-        profile = collection.find_one({'user_id': user_id}, max_time_ms=3000)  # 3 second timeout
-        if profile:
-            profile['_id'] = str(profile['_id'])
-        return profile
+        return profile_cache.get(user_id, _load_cv_profile)
     except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
         # Log error but don't crash - return None if MongoDB is unavailable
         logger.warning(f'MongoDB connection error in get_cv_profile: {str(e)}')
@@ -239,54 +657,569 @@ def get_cv_profile(user_id: int) -> Optional[Dict]:
         return None
 
 
-def get_all_cv_profiles() -> List[Dict]:
-    """Get all CV profiles."""
+def search_cv_profiles(
+    query: Dict,
+    projection: Optional[Dict] = None,
+    sort: Optional[List] = None,
+    skip: int = 0,
+    limit: int = 0,
+    shape: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Search CV profiles with filters.
+    
+    Args:
+        query: MongoDB query dictionary
+        projection: Fields to return (default: all)
+        shape: Named projection from PROFILE_SHAPES, used when no
+            projection is given
+        sort: List of (field, direction) pairs; text searches are sorted by
+            relevance when not given
+        skip: Number of matching profiles to skip
+        limit: Maximum number of profiles to return (0 for no limit)
+    
+    Returns:
+        List of matching profiles
+    """
+    if projection is None and shape is not None:
+        projection = get_profile_projection(shape)
+    if sort is None and '$text' in query:
+        projection = dict(projection or {}, score={'$meta': 'textScore'})
+        sort = [('score', {'$meta': 'textScore'})]
     try:
         collection = MongoDBManager.get_cv_collection()
-        profiles = list(collection.find(max_time_ms=3000))
+        cursor = collection.find(query, projection, max_time_ms=3000)
+        if sort:
+            cursor = cursor.sort(sort)
+        profiles = list(cursor.skip(skip).limit(limit))
         for profile in profiles:
             profile['_id'] = str(profile['_id'])
+            upgrade_cv_profile(profile)
         return profiles
+    except OperationFailure as e:
+        if e.code == _INDEX_NOT_FOUND and '$text' in query and not _retried_text_index.is_set():
+            # Text search needs the text index - build the missing indexes once and retry
+            logger.warning('Text index missing on cv_profiles, creating the registered indexes')
+            _retried_text_index.set()
+            from .mongo_indexes import ensure_indexes
+            ensure_indexes([CV_PROFILES_COLLECTION])
+            return search_cv_profiles(query, projection, sort, skip, limit)
+        logger.warning(f'MongoDB error in search_cv_profiles: {str(e)}')
+        return []
     except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
-        logger.warning(f'MongoDB connection error in get_all_cv_profiles: {str(e)}')
+        logger.warning(f'MongoDB connection error in search_cv_profiles: {str(e)}')
         MongoDBManager.reset_connection()
         return []
     except Exception as e:
-        logger.error(f'Unexpected error in get_all_cv_profiles: {str(e)}')
+        logger.error(f'Unexpected error in search_cv_profiles: {str(e)}')
         return []
 
 
-def search_cv_profiles(query: Dict) -> List[Dict]:
+def get_profile_projection(shape: str) -> Optional[Dict]:
+    """Projection for a named profile shape ('card', 'compare', 'search' or 'full')."""
+    try:
+        projection = PROFILE_SHAPES[shape]
+    except KeyError:
+        raise ValueError(f"Unknown profile shape: {shape}")
+    return dict(projection) if projection is not None else None
+
+
+def get_cv_profile_user_ids() -> set:
+    """IDs of all users that have a CV profile (distinct, no documents fetched)."""
+    try:
+        collection = MongoDBManager.get_cv_collection()
+        return set(collection.distinct('user_id'))
+    except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
+        logger.warning(f'MongoDB connection error in get_cv_profile_user_ids: {str(e)}')
+        MongoDBManager.reset_connection()
+        return set()
+
+
+def encode_page_token(profile: Dict, direction: str) -> str:
+    """Opaque, signed cursor pointing at a profile's position in the listing order."""
+    updated_at = profile.get('updated_at')
+    return signing.dumps(
+        {
+            'u': updated_at.isoformat() if updated_at else None,
+            'i': str(profile['_id']),
+            'd': direction,
+        },
+        salt=PAGE_TOKEN_SALT,
+        compress=True,
+    )
+
+
+def decode_page_token(token: str) -> Optional[Dict]:
+    """Decode a page token; returns None for missing, tampered or malformed tokens."""
+    if not token:
+        return None
+    try:
+        data = signing.loads(token, salt=PAGE_TOKEN_SALT)
+        return {
+            'updated_at': datetime.fromisoformat(data['u']) if data['u'] else None,
+            '_id': ObjectId(data['i']),
+            'direction': PAGE_PREVIOUS if data['d'] == PAGE_PREVIOUS else PAGE_NEXT,
+        }
+    except (signing.BadSignature, KeyError, TypeError, ValueError, InvalidId):
+        return None
+
+
+def encode_offset_token(offset: int, salt: str) -> str:
+    """Signed page token for listings ordered in memory (search, ranking)."""
+    return signing.dumps({'o': offset}, salt=salt)
+
+
+def decode_offset_token(token: Optional[str], salt: str) -> int:
+    """Offset of an ``encode_offset_token`` token; 0 for missing or tampered tokens."""
+    if not token:
+        return 0
+    try:
+        return max(0, int(signing.loads(token, salt=salt)['o']))
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return 0
+
+
+def _keyset_filter(cursor: Dict, after: bool) -> Dict:
+    """Profiles after (or before) the cursor in (updated_at desc, _id desc) order."""
+    op = '$lt' if after else '$gt'
+    updated_at = cursor['updated_at']
+    if updated_at is None:
+        # Profiles without updated_at sort last and are ordered by _id only
+        same_time = {'updated_at': None, '_id': {op: cursor['_id']}}
+        return same_time if after else {'$or': [{'updated_at': {'$ne': None}}, same_time]}
+    conditions = [
+        {'updated_at': {op: updated_at}},
+        {'updated_at': updated_at, '_id': {op: cursor['_id']}},
+    ]
+    if after:
+        conditions.append({'updated_at': None})
+    return {'$or': conditions}
+
+
+def paginate_cv_profiles(
+    query: Optional[Dict] = None,
+    page_token: Optional[str] = None,
+    page_size: Optional[int] = None,
+    projection: Optional[Dict] = None,
+    shape: Optional[str] = None,
+) -> Dict:
     """
-    Search CV profiles with filters.
+    One page of profiles using keyset pagination on (updated_at, _id).
+    
+    Pages are stable while profiles are added or edited, and fetching a
+    later page costs the same as the first one (no skip).
     
     Args:
-        query: MongoDB query dictionary
+        query: MongoDB filter
+        page_token: Token from a previous page's next_token/prev_token
+        page_size: Profiles per page, capped at PROFILE_PAGE_SIZE_MAX
+            (default: PROFILE_PAGE_SIZE)
+        projection: Fields to return (default: all)
+        shape: Named projection from PROFILE_SHAPES, used when no
+            projection is given
     
     Returns:
-        List of matching profiles
+        Dict with 'profiles', 'next_token', 'prev_token' and 'page_size'
     """
+    if projection is None and shape is not None:
+        projection = get_profile_projection(shape)
+    page_size = min(max(1, page_size or settings.PROFILE_PAGE_SIZE), settings.PROFILE_PAGE_SIZE_MAX)
+    query = query or {}
+    cursor = decode_page_token(page_token)
+    backwards = cursor is not None and cursor['direction'] == PAGE_PREVIOUS
+    
+    if cursor is not None:
+        keyset = _keyset_filter(cursor, after=not backwards)
+        query = {'$and': [query, keyset]} if query else keyset
+    direction = pymongo.ASCENDING if backwards else pymongo.DESCENDING
+    sort = [('updated_at', direction), ('_id', direction)]
+    if projection is not None:
+        projection = dict(projection, updated_at=1)
+    
+    # One extra profile tells whether there is a page beyond this one
+    profiles = search_cv_profiles(query, projection=projection, sort=sort, limit=page_size + 1)
+    has_more = len(profiles) > page_size
+    profiles = profiles[:page_size]
+    if backwards:
+        profiles.reverse()
+    
+    next_token = prev_token = None
+    if profiles:
+        if has_more or backwards:
+            next_token = encode_page_token(profiles[-1], PAGE_NEXT)
+        if (has_more and backwards) or (cursor is not None and not backwards):
+            prev_token = encode_page_token(profiles[0], PAGE_PREVIOUS)
+    return {
+        'profiles': profiles,
+        'next_token': next_token,
+        'prev_token': prev_token,
+        'page_size': page_size,
+    }
+
+
+def count_cv_profiles(query: Optional[Dict] = None) -> int:
+    """Count the CV profiles matching a query (all profiles when empty)."""
     try:
         collection = MongoDBManager.get_cv_collection()
-        profiles = list(collection.find(query, max_time_ms=3000))
-        for profile in profiles:
-            profile['_id'] = str(profile['_id'])
-        return profiles
+        if not query:
+            return collection.estimated_document_count(maxTimeMS=3000)
+        return collection.count_documents(query, maxTimeMS=3000)
     except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
-        logger.warning(f'MongoDB connection error in search_cv_profiles: {str(e)}')
+        logger.warning(f'MongoDB connection error in count_cv_profiles: {str(e)}')
         MongoDBManager.reset_connection()
-        return []
-    except Exception as e:
-        logger.error(f'Unexpected error in search_cv_profiles: {str(e)}')
-        return []
+        return 0
+
+
+def gpa_bucket(gpa: float) -> str:
+    """Label of the GPA histogram bucket a GPA falls in."""
+    if gpa >= GPA_TOP_BOUNDARY:
+        return GPA_TOP_BUCKET
+    for boundary, label in reversed(GPA_BUCKETS):
+        if gpa >= boundary:
+            return label
+    return GPA_BUCKETS[0][1]
+
+
+def _empty_gpa_bins() -> Dict[str, int]:
+    bins = {label: 0 for _, label in GPA_BUCKETS}
+    bins[GPA_TOP_BUCKET] = 0
+    return bins
+
+
+def _stats_key(name: str) -> str:
+    """Skill, major or GPA bin name as a field name ('.' and a leading '$' are not allowed in keys)."""
+    key = str(name).replace('.', '\uff0e')
+    return '\uff04' + key[1:] if key.startswith('$') else key
+
+
+def _stats_name(key: str) -> str:
+    name = key.replace('\uff0e', '.')
+    return '$' + name[1:] if name.startswith('\uff04') else name
+
+
+def _stats_contribution(profile: Optional[Dict]) -> Dict[str, float]:
+    """What one profile adds to the cv_stats counters, as dotted $inc fields."""
+    if not profile:
+        return {}
+    contribution = {'count': 1}
+    for skill in profile.get('skills') or []:
+        if skill:
+            field = f'skills.{_stats_key(skill)}'
+            contribution[field] = contribution.get(field, 0) + 1
+    if profile.get('major'):
+        contribution[f'majors.{_stats_key(profile["major"])}'] = 1
+    gpa = profile.get('gpa')
+    if isinstance(gpa, (int, float)) and not isinstance(gpa, bool):
+        contribution[f'gpa_bins.{_stats_key(gpa_bucket(gpa))}'] = 1
+        contribution['gpa_sum'] = gpa
+        contribution['gpa_count'] = 1
+    return contribution
+
+
+def _stats_delta(old: Optional[Dict], new: Optional[Dict]) -> Dict[str, float]:
+    """$inc deltas that replace ``old``'s contribution to cv_stats with ``new``'s."""
+    delta = _stats_contribution(new)
+    for field, amount in _stats_contribution(old).items():
+        delta[field] = delta.get(field, 0) - amount
+    return {field: amount for field, amount in delta.items() if amount}
+
+
+def _apply_stats_delta(delta: Dict[str, float]):
+    """
+    Apply $inc deltas to the cv_stats rollup.
+    
+    Nothing is written while the rollup does not exist: the first read builds
+    it from the profiles. Failures are only logged, since the profile itself
+    was saved; ``rebuild_cv_stats`` repairs the drift.
+    """
+    if not delta:
+        return
+    try:
+        MongoDBManager.get_collection(CV_STATS_COLLECTION).update_one(
+            {'_id': CV_STATS_ID},
+            {'$inc': delta, '$set': {'updated_at': datetime.utcnow()}},
+        )
+    except PyMongoError as e:
+        logger.warning(f'Could not update cv_stats, run rebuild_cv_stats: {str(e)}')
+
+
+def compute_cv_stats() -> Dict:
+    """
+    Recompute the cv_stats rollup from every profile with one $facet aggregation.
+    
+    Returns:
+        Dict with 'count', 'skills' and 'majors' (name -> count),
+        'gpa_bins' (label -> count), 'gpa_sum' and 'gpa_count'
+    """
+    has_gpa = {'$match': {'gpa': {'$type': 'number'}}}
+    pipeline = [{'$facet': {
+        'total': [{'$count': 'count'}],
+        'skills': [
+            {'$unwind': '$skills'},
+            {'$match': {'skills': {'$nin': [None, '']}}},
+            {'$group': {'_id': '$skills', 'count': {'$sum': 1}}},
+        ],
+        'majors': [
+            {'$match': {'major': {'$nin': [None, '']}}},
+            {'$group': {'_id': '$major', 'count': {'$sum': 1}}},
+        ],
+        'gpa': [has_gpa, {'$group': {'_id': None, 'sum': {'$sum': '$gpa'}, 'count': {'$sum': 1}}}],
+        'gpa_bins': [
+            has_gpa,
+            {'$bucket': {
+                'groupBy': '$gpa',
+                'boundaries': [boundary for boundary, _ in GPA_BUCKETS] + [GPA_TOP_BOUNDARY],
+                'default': GPA_TOP_BUCKET,
+                'output': {'count': {'$sum': 1}},
+            }},
+        ],
+    }}]
+    collection = MongoDBManager.get_cv_collection()
+    result = next(collection.aggregate(pipeline))
+
+    labels = dict(GPA_BUCKETS)
+    gpa_bins = _empty_gpa_bins()
+    for bucket in result['gpa_bins']:
+        gpa_bins[labels.get(bucket['_id'], GPA_TOP_BUCKET)] += bucket['count']
+    gpa = result['gpa'][0] if result['gpa'] else {'sum': 0, 'count': 0}
+    return {
+        'count': result['total'][0]['count'] if result['total'] else 0,
+        'skills': {str(item['_id']): item['count'] for item in result['skills']},
+        'majors': {str(item['_id']): item['count'] for item in result['majors']},
+        'gpa_bins': gpa_bins,
+        'gpa_sum': gpa['sum'],
+        'gpa_count': gpa['count'],
+    }
+
+
+def _encode_stats(stats: Dict) -> Dict:
+    document = dict(stats)
+    for field in ('skills', 'majors', 'gpa_bins'):
+        document[field] = {_stats_key(name): count for name, count in stats[field].items()}
+    return document
+
+
+def _decode_stats(document: Dict) -> Dict:
+    """Rollup document as plain stats, dropping counters that went down to zero."""
+    stats = {
+        'count': document.get('count', 0),
+        'gpa_sum': document.get('gpa_sum', 0),
+        'gpa_count': document.get('gpa_count', 0),
+        'updated_at': document.get('updated_at'),
+    }
+    for field in ('skills', 'majors'):
+        stats[field] = {_stats_name(key): count for key, count in (document.get(field) or {}).items() if count > 0}
+    gpa_bins = _empty_gpa_bins()
+    gpa_bins.update({_stats_name(key): count for key, count in (document.get('gpa_bins') or {}).items()})
+    stats['gpa_bins'] = gpa_bins
+    return stats
+
+
+def rebuild_cv_stats() -> Dict:
+    """Recompute the cv_stats rollup and store it, replacing the incremental counters."""
+    stats = compute_cv_stats()
+    MongoDBManager.get_collection(CV_STATS_COLLECTION).replace_one(
+        {'_id': CV_STATS_ID},
+        dict(_encode_stats(stats), updated_at=datetime.utcnow()),
+        upsert=True,
+    )
+    return stats
+
+
+def get_cv_stats() -> Optional[Dict]:
+    """
+    The cv_stats rollup, built from the profiles on first use.
+    
+    Returns:
+        Same shape as ``compute_cv_stats`` plus 'updated_at', or None if
+        MongoDB is unavailable
+    """
+    try:
+        document = MongoDBManager.get_collection(CV_STATS_COLLECTION).find_one(
+            {'_id': CV_STATS_ID}, max_time_ms=3000
+        )
+        if document is None:
+            logger.info('cv_stats rollup missing, building it from the profiles')
+            rebuild_cv_stats()
+            document = MongoDBManager.get_collection(CV_STATS_COLLECTION).find_one({'_id': CV_STATS_ID})
+        return _decode_stats(document)
+    except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
+        logger.warning(f'MongoDB connection error in get_cv_stats: {str(e)}')
+        MongoDBManager.reset_connection()
+        return None
+
+
+def check_cv_stats() -> List[str]:
+    """
+    Compare the stored rollup with a fresh ``compute_cv_stats``.
+    
+    Returns:
+        One line per counter that differs (empty when the rollup is accurate)
+    """
+    document = MongoDBManager.get_collection(CV_STATS_COLLECTION).find_one({'_id': CV_STATS_ID})
+    if document is None:
+        return ['rollup does not exist']
+    stored = _decode_stats(document)
+    actual = compute_cv_stats()
+
+    drift = []
+    for field in ('count', 'gpa_count'):
+        if stored[field] != actual[field]:
+            drift.append(f'{field}: stored {stored[field]}, actual {actual[field]}')
+    if abs(stored['gpa_sum'] - actual['gpa_sum']) > 1e-6:
+        drift.append(f'gpa_sum: stored {stored["gpa_sum"]:.4f}, actual {actual["gpa_sum"]:.4f}')
+    for field in ('skills', 'majors', 'gpa_bins'):
+        for name in sorted(set(stored[field]) | set(actual[field])):
+            stored_count = stored[field].get(name, 0)
+            actual_count = actual[field].get(name, 0)
+            if stored_count != actual_count:
+                drift.append(f'{field}[{name}]: stored {stored_count}, actual {actual_count}')
+    return drift
+
+
+def get_profile_analytics(top: int = 10) -> Dict:
+    """
+    Profile statistics for the admin dashboard, read from the cv_stats rollup.
+    
+    Returns:
+        Dict with 'total_profiles', 'top_skills' and 'top_majors' (lists of
+        (name, count)), 'avg_gpa' and 'gpa_bins' (label -> count)
+    """
+    stats = get_cv_stats()
+    if stats is None:
+        return {'total_profiles': 0, 'top_skills': [], 'top_majors': [], 'avg_gpa': 0, 'gpa_bins': _empty_gpa_bins()}
+
+    def most_common(counts):
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:top]
+
+    return {
+        'total_profiles': stats['count'],
+        'top_skills': most_common(stats['skills']),
+        'top_majors': most_common(stats['majors']),
+        'avg_gpa': stats['gpa_sum'] / stats['gpa_count'] if stats['gpa_count'] else 0,
+        'gpa_bins': stats['gpa_bins'],
+    }
+
+
+def migrate_cv_profiles(batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Upgrade every stored profile to ``CV_PROFILE_SCHEMA_VERSION`` with bulk writes.
+    
+    Profiles are processed in _id order in chunks of ``batch_size``. Upgraded
+    profiles no longer match the query, so an interrupted run simply resumes
+    with the remaining ones when started again. Each update is guarded by the
+    profile's old version and never overwrites a concurrent save.
+    
+    Args:
+        batch_size: Number of profiles read and written per chunk
+        dry_run: Only count the profiles that would change
+    
+    Returns:
+        Counts of 'scanned', 'migrated' and 'failed' profiles
+    """
+    counts = {'scanned': 0, 'migrated': 0, 'failed': 0}
+    collection = MongoDBManager.get_cv_collection()
+    outdated = {'schema_version': {'$ne': CV_PROFILE_SCHEMA_VERSION}}
+    last_id = None
+    while True:
+        query = dict(outdated, _id={'$gt': last_id}) if last_id is not None else outdated
+        batch = list(collection.find(query).sort('_id', pymongo.ASCENDING).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]['_id']
+        counts['scanned'] += len(batch)
+        if dry_run:
+            counts['migrated'] += len(batch)
+            continue
+
+        operations = [
+            UpdateOne(
+                {'_id': profile['_id'], 'schema_version': profile.get('schema_version')},
+                {'$set': dict(normalize_cv_profile_fields(profile), schema_version=CV_PROFILE_SCHEMA_VERSION)},
+            )
+            for profile in batch
+        ]
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            counts['migrated'] += result.modified_count
+        except BulkWriteError as e:
+            # e.g. "5" and 5 both stored for a user: the unique user_id index rejects one
+            errors = e.details.get('writeErrors', [])
+            counts['migrated'] += e.details.get('nModified', 0)
+            counts['failed'] += len(errors)
+            for error in errors[:10]:
+                logger.error(f'Could not migrate profile {batch[error["index"]]["_id"]}: {error.get("errmsg")}')
+        # Cache keys are the same for "5" and 5
+        profile_cache.invalidate(profile.get('user_id') for profile in batch)
+    return counts
+
+
+def sync_profile_user(user_id: int, user_fields: Optional[Dict]) -> bool:
+    """
+    Update the user fields stored in a user's profile.
+    
+    Args:
+        user_id: Django User ID
+        user_fields: ``build_user_fields`` of the user, or None if it was deleted
+    
+    Returns:
+        True if a profile was updated
+    """
+    try:
+        collection = MongoDBManager.get_cv_collection()
+        result = collection.update_one({'user_id': user_id}, {'$set': {'user': user_fields}})
+        profile_cache.invalidate([user_id])
+        return result.modified_count > 0
+    except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
+        logger.warning(f'MongoDB connection error in sync_profile_user, run backfill_profile_users: {str(e)}')
+        MongoDBManager.reset_connection()
+        return False
+
+
+def backfill_profile_users(batch_size: int = 500, missing_only: bool = False) -> Dict[str, int]:
+    """
+    Store the current user fields in every profile.
+    
+    Profiles whose user no longer exists get ``user: null`` and drop out of
+    the listings. User ids still stored as strings (see ``migrate_cv_profiles``)
+    are matched as ints.
+    
+    Args:
+        batch_size: Number of profiles updated per bulk write
+        missing_only: Only fill profiles saved before the ``user`` subdocument
+            existed (cheap enough to run on every deploy)
+    
+    Returns:
+        Counts of 'profiles' processed, 'updated' documents and 'orphaned' profiles
+    """
+    counts = {'profiles': 0, 'updated': 0, 'orphaned': 0}
+    collection = MongoDBManager.get_cv_collection()
+    user_ids = collection.distinct('user_id', {'user': {'$exists': False}} if missing_only else None)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        keys = {user_id: int(user_id) if isinstance(user_id, str) and user_id.isdigit() else user_id for user_id in batch}
+        users = get_user_fields(set(keys.values()))
+        operations = [
+            UpdateOne({'user_id': user_id}, {'$set': {'user': users.get(keys[user_id])}}) for user_id in batch
+        ]
+        result = collection.bulk_write(operations, ordered=False)
+        profile_cache.invalidate(batch)
+        counts['profiles'] += len(batch)
+        counts['updated'] += result.modified_count
+        counts['orphaned'] += sum(1 for user_id in batch if keys[user_id] not in users)
+    return counts
 
 
 def delete_cv_profile(user_id: int) -> bool:
     """Delete CV profile for a user."""
     try:
         collection = MongoDBManager.get_cv_collection()
-        result = collection.delete_one({'user_id': user_id})
-        return result.deleted_count > 0
+        deleted = collection.find_one_and_delete({'user_id': user_id}, projection=_STATS_FIELDS)
+        profile_cache.invalidate([user_id])
+        _apply_stats_delta(_stats_delta(deleted, None))
+        if deleted is not None:
+            profile_deleted.send(sender=None, user_id=user_id)
+        return deleted is not None
     except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
         logger.warning(f'MongoDB connection error in delete_cv_profile: {str(e)}')
         MongoDBManager.reset_connection()
@@ -298,11 +1231,16 @@ def delete_cv_profile(user_id: int) -> bool:
 
 def delete_cv_profile_by_id(profile_id: str) -> bool:
     """Delete CV profile by MongoDB ID."""
-    from bson import ObjectId
     try:
         collection = MongoDBManager.get_cv_collection()
-        result = collection.delete_one({'_id': ObjectId(profile_id)})
-        return result.deleted_count > 0
+        deleted = collection.find_one_and_delete(
+            {'_id': ObjectId(profile_id)}, projection=dict(_STATS_FIELDS, user_id=1)
+        )
+        if deleted is not None:
+            profile_cache.invalidate([deleted['user_id']])
+            profile_deleted.send(sender=None, user_id=deleted['user_id'])
+        _apply_stats_delta(_stats_delta(deleted, None))
+        return deleted is not None
     except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
         logger.warning(f'MongoDB connection error in delete_cv_profile_by_id: {str(e)}')
         MongoDBManager.reset_connection()
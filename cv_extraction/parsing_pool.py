@@ -0,0 +1,234 @@
+"""
+Out-of-process PDF/DOCX parsing.
+
+PyPDF2 is pure-Python CPU work; run inside a web or extraction worker it holds
+the GIL and stalls every other request on that process. Documents are parsed
+in a ``ProcessPoolExecutor`` instead. Child processes are recycled after
+``EXTRACTION_PARSE_POOL_MAX_TASKS_PER_CHILD`` documents to cap memory growth.
+A parse that exceeds ``EXTRACTION_PARSE_TIMEOUT_SECONDS`` is interrupted by a
+timer inside its child, so only that task fails; a child that does not stop
+gets its pool retired (new parses go to a fresh pool, the old one is killed
+once its other parses have finished). PDFs longer than
+``EXTRACTION_PARSE_SPLIT_MIN_PAGES`` have their remaining pages parsed in
+parallel ranges that share the document's CPU budget.
+"""
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from django.conf import settings
+
+from . import text_extraction
+
+logger = logging.getLogger(__name__)
+
+# How long past the document deadline the parent waits for a child whose own
+# timer did not stop the parse (e.g. stuck in C code)
+_HARD_TIMEOUT_GRACE_SECONDS = 5
+
+
+class ParsingPool:
+    """Singleton process pool used to parse uploaded CV files."""
+    _executor: Optional[ProcessPoolExecutor] = None
+    _pid: Optional[int] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_executor(cls) -> ProcessPoolExecutor:
+        """Get the process pool for this process, creating it on first use."""
+        pid = os.getpid()
+        if cls._executor is None or cls._pid != pid:
+            with cls._lock:
+                if cls._executor is None or cls._pid != pid:
+                    # A pool inherited through fork() belongs to the parent
+                    cls._executor = ProcessPoolExecutor(
+                        max_workers=settings.EXTRACTION_PARSE_POOL_SIZE,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        max_tasks_per_child=settings.EXTRACTION_PARSE_POOL_MAX_TASKS_PER_CHILD,
+                    )
+                    cls._pid = pid
+        return cls._executor
+
+    @classmethod
+    def terminate(cls, executor: Optional[ProcessPoolExecutor] = None):
+        """
+        Kill the pool's child processes right away (used for a broken pool).
+
+        Other parses running in the same pool fail with BrokenProcessPool
+        and are retried by ``_run`` on a fresh pool.
+        """
+        with cls._lock:
+            if executor is not None and executor is not cls._executor:
+                return  # Already replaced by another thread
+            executor = cls._executor
+            cls._executor = None
+            cls._pid = None
+        if executor is not None:
+            cls._kill(executor)
+
+    @classmethod
+    def retire(cls, executor: ProcessPoolExecutor, stuck_future):
+        """
+        Stop using a pool with a runaway parse and kill it once its other parses are done.
+
+        New parses go to a fresh pool right away; the other documents in the
+        old pool finish normally instead of being killed and retried.
+        """
+        with cls._lock:
+            if executor is not cls._executor:
+                return  # Already replaced by another thread
+            cls._executor = None
+            cls._pid = None
+
+        def drain():
+            others = [
+                work_item.future for work_item in list(getattr(executor, '_pending_work_items', {}).values())
+                if work_item.future is not stuck_future
+            ]
+            wait(others, timeout=settings.EXTRACTION_PARSE_TIMEOUT_SECONDS)
+            cls._kill(executor)
+
+        threading.Thread(target=drain, name='parsing-pool-drain', daemon=True).start()
+
+    @staticmethod
+    def _kill(executor: ProcessPoolExecutor):
+        for process in list(getattr(executor, '_processes', {}).values()):
+            try:
+                process.terminate()
+            except Exception:
+                pass
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def shutdown(cls):
+        """Shut the pool down cleanly (called at interpreter exit)."""
+        with cls._lock:
+            executor = cls._executor
+            cls._executor = None
+            cls._pid = None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(ParsingPool.shutdown)
+
+
+def _submit(fn, *args, deadline: float):
+    """
+    Submit to the pool, rebuilding it once if a previous kill broke it.
+
+    The child stops the parse itself when the document deadline passes.
+    """
+    timeout = deadline - time.monotonic()
+    executor = ParsingPool.get_executor()
+    try:
+        return executor, executor.submit(text_extraction.call_with_timeout, timeout, fn, *args)
+    except (BrokenProcessPool, RuntimeError):
+        ParsingPool.terminate(executor)
+        executor = ParsingPool.get_executor()
+        return executor, executor.submit(text_extraction.call_with_timeout, timeout, fn, *args)
+
+
+def _result(executor, future, deadline: float):
+    """Wait for a parse, retiring the pool if the child overruns the deadline."""
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()) + _HARD_TIMEOUT_GRACE_SECONDS)
+    except FutureTimeoutError:
+        logger.warning('A parse did not stop at its deadline, retiring the parsing pool')
+        ParsingPool.retire(executor, future)
+        raise ValueError(
+            f"Parsing the CV took longer than {settings.EXTRACTION_PARSE_TIMEOUT_SECONDS}s and was stopped"
+        )
+
+
+def _run(fn, *args, deadline: float):
+    executor, future = _submit(fn, *args, deadline=deadline)
+    try:
+        return _result(executor, future, deadline)
+    except BrokenProcessPool:
+        # A child crashed (e.g. out of memory) - retry once on a new pool
+        logger.warning('Parsing pool broke during a parse, retrying')
+        ParsingPool.terminate(executor)
+        executor, future = _submit(fn, *args, deadline=deadline)
+        return _result(executor, future, deadline)
+
+
+def _extract_pdf(file_content: bytes, deadline: float) -> str:
+    max_chars = settings.EXTRACTION_MAX_TEXT_CHARS
+    max_pages = settings.EXTRACTION_MAX_PDF_PAGES
+    cpu_seconds = settings.EXTRACTION_PARSE_CPU_SECONDS
+    pages_per_task = max(1, settings.EXTRACTION_PARSE_PAGES_PER_TASK)
+
+    # Every range task re-reads the whole file, so shorter documents are parsed
+    # in one task; the first range also tells us how many pages there are
+    first_end = min(max(pages_per_task, settings.EXTRACTION_PARSE_SPLIT_MIN_PAGES), max_pages)
+    text, total_pages, cpu_spent = _run(
+        text_extraction.extract_pdf_range, file_content, 0, first_end, max_chars, cpu_seconds,
+        deadline=deadline,
+    )
+    parts = [text]
+    last_page = min(total_pages, max_pages)
+    cpu_left = cpu_seconds - cpu_spent
+
+    if last_page > first_end and len(text) < max_chars and cpu_left > 0:
+        # Remaining page ranges are parsed in parallel and joined in order,
+        # splitting what is left of the document's CPU budget between them
+        ranges = [
+            (start_page, min(start_page + pages_per_task, last_page))
+            for start_page in range(first_end, last_page, pages_per_task)
+        ]
+        range_cpu_seconds = cpu_left / len(ranges)
+        submitted = [
+            _submit(
+                text_extraction.extract_pdf_range, file_content, start_page, end_page, max_chars, range_cpu_seconds,
+                deadline=deadline,
+            )
+            for start_page, end_page in ranges
+        ]
+        for (start_page, end_page), (executor, future) in zip(ranges, submitted):
+            try:
+                range_text, _, _ = _result(executor, future, deadline)
+            except BrokenProcessPool:
+                ParsingPool.terminate(executor)
+                range_text, _, _ = _run(
+                    text_extraction.extract_pdf_range, file_content, start_page, end_page, max_chars,
+                    range_cpu_seconds, deadline=deadline,
+                )
+            parts.append(range_text)
+            if sum(len(part) for part in parts) >= max_chars:
+                for _, pending in submitted:
+                    pending.cancel()
+                break
+
+    return text_extraction.PAGE_BREAK.join(parts)[:max_chars]
+
+
+def extract_text(file_content: bytes, filename: str) -> str:
+    """
+    Extract text from a file in the parsing pool.
+
+    Falls back to parsing in this process when EXTRACTION_PARSE_POOL_ENABLED
+    is False.
+    """
+    if not settings.EXTRACTION_PARSE_POOL_ENABLED:
+        return text_extraction.extract_text(file_content, filename)
+
+    text_extraction.check_file_size(file_content)
+    deadline = time.monotonic() + settings.EXTRACTION_PARSE_TIMEOUT_SECONDS
+    filename_lower = filename.lower()
+    if filename_lower.endswith('.pdf'):
+        return _extract_pdf(file_content, deadline)
+    elif filename_lower.endswith('.docx') or filename_lower.endswith('.doc'):
+        return _run(
+            text_extraction.extract_docx_text, file_content,
+            settings.EXTRACTION_MAX_TEXT_CHARS, settings.EXTRACTION_PARSE_CPU_SECONDS,
+            deadline=deadline,
+        )
+    else:
+        raise ValueError(f"Unsupported file type: {filename}")
@@ -0,0 +1,146 @@
+"""
+Base class for the in-process indexes over ``cv_profiles``.
+
+An index is built on first use, refreshed by polling for profiles whose
+``updated_at`` is past the last one seen, and rebuilt from scratch
+periodically so profiles deleted by other processes disappear. Profiles saved
+or deleted in this process are applied immediately through the
+``profile_saved`` / ``profile_deleted`` signals (see signals.py).
+"""
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Dict, Iterable, Optional
+
+from .mongodb_utils import MongoDBManager, upgrade_cv_profile
+
+logger = logging.getLogger(__name__)
+
+# Re-read profiles saved this long before the watermark, in case the clocks
+# of the processes writing profiles differ slightly
+_WATERMARK_OVERLAP = timedelta(seconds=5)
+
+
+class ProfileIndex(ABC):
+    """
+    Lazily built, incrementally refreshed index of this process.
+
+    Subclasses set ``projection`` and implement the abstract settings
+    properties, ``_index_profile`` (add or replace one profile) and
+    ``_remove_profile``; ``_finish_build`` runs once after a full build. Both
+    are called with ``_lock`` held or on an index that is not shared yet.
+    """
+
+    name = 'profile index'
+    projection: Dict = {}
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._building = False
+        self._watermark = None
+        self._built_at = None
+        self._refreshed_at = None
+
+    @property
+    @abstractmethod
+    def enabled(self) -> bool:
+        """Whether the index is used instead of querying MongoDB."""
+
+    @property
+    @abstractmethod
+    def refresh_seconds(self) -> float:
+        """Seconds between polls for profiles saved by other processes."""
+
+    @property
+    @abstractmethod
+    def rebuild_seconds(self) -> float:
+        """Seconds between full rebuilds."""
+
+    @abstractmethod
+    def _index_profile(self, profile: Dict):
+        """Add or replace one profile."""
+
+    @abstractmethod
+    def _remove_profile(self, user_id: int):
+        """Drop one profile if it is indexed."""
+
+    def _finish_build(self):
+        pass
+
+    def _apply(self, profile: Dict) -> bool:
+        upgrade_cv_profile(profile)
+        if not isinstance(profile.get('user_id'), int):
+            return False
+        self._index_profile(profile)
+        updated_at = profile.get('updated_at')
+        if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+            self._watermark = updated_at
+        return True
+
+    def build(self):
+        """Index every profile from scratch and swap the result in."""
+        self.build_from(MongoDBManager.get_cv_collection().find({}, self.projection).batch_size(2000))
+
+    def build_from(self, profiles: Iterable[Dict]):
+        """Index the given profiles from scratch and swap the result in."""
+        started = time.monotonic()
+        fresh = type(self)()
+        fresh._building = True
+        for profile in profiles:
+            fresh._apply(profile)
+        fresh._finish_build()
+        fresh._building = False
+
+        with self._lock:
+            for attribute, value in vars(fresh).items():
+                if attribute not in ('_lock', '_refresh_lock'):
+                    setattr(self, attribute, value)
+            self._built_at = self._refreshed_at = time.monotonic()
+        logger.info(f'Built {self.name} in {time.monotonic() - started:.2f}s')
+
+    def refresh(self) -> int:
+        """
+        Re-index the profiles saved since the watermark.
+
+        Returns:
+            Number of profiles re-indexed
+        """
+        query = {'updated_at': {'$gte': self._watermark - _WATERMARK_OVERLAP}} if self._watermark else {}
+        profiles = list(MongoDBManager.get_cv_collection().find(query, self.projection))
+        with self._lock:
+            count = sum(1 for profile in profiles if self._apply(profile))
+            self._refreshed_at = time.monotonic()
+        return count
+
+    def ensure_fresh(self):
+        """Build the index on first use, then rebuild or refresh it when due."""
+        now = time.monotonic()
+        if self._built_at is not None and now - self._refreshed_at < self.refresh_seconds:
+            return
+        # One thread updates the index; the others keep querying the current state
+        if not self._refresh_lock.acquire(blocking=self._built_at is None):
+            return
+        try:
+            if self._built_at is None or now - self._built_at >= self.rebuild_seconds:
+                self.build()
+            elif now - self._refreshed_at >= self.refresh_seconds:
+                self.refresh()
+        finally:
+            self._refresh_lock.release()
+
+    def profile_saved(self, user_id: int, document: Optional[Dict]):
+        """Apply a profile written by this process (ignored until the index is built)."""
+        if self._built_at is None or document is None:
+            return
+        with self._lock:
+            self._apply(dict(document, user_id=user_id))
+
+    def profile_deleted(self, user_id: int):
+        """Drop a profile deleted by this process."""
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove_profile(user_id)
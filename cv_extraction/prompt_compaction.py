@@ -0,0 +1,239 @@
+"""
+Prompt compaction for extracted CV text.
+
+Runs between text extraction and the Cohere call: collapses whitespace,
+removes lines repeated at the top or bottom of pages (headers/footers), strips page numbers
+and PDF artifacts, and trims the text to ``EXTRACTION_PROMPT_TOKEN_BUDGET``
+while keeping the sections the extraction schema needs.
+"""
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+from .text_extraction import PAGE_BREAK
+
+logger = logging.getLogger(__name__)
+
+# Rough tokenizer-independent estimate: words and punctuation marks
+_TOKEN_RE = re.compile(r'\w+|[^\w\s]', re.UNICODE)
+
+_INLINE_WHITESPACE_RE = re.compile(r'[ \t\u00a0\u200b\u200e\u200f]+')
+_CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+_CID_ARTIFACT_RE = re.compile(r'\(cid:\d+\)')
+
+_ARTIFACT_LINE_RES = [
+    re.compile(r'^(page|p\.|صفحة)\s*\d{1,3}\s*((of|/|من)\s*\d{1,3})?$', re.IGNORECASE),
+    re.compile(r'^[-–—]\s*\d{1,3}\s*[-–—]$'),
+    re.compile(r'^[\W_]+$', re.UNICODE),  # Lines made only of bullets, rules or punctuation
+]
+
+# Lines this short found among the first or last lines of several pages are
+# treated as headers/footers
+_REPEATED_LINE_MAX_CHARS = 80
+_REPEATED_LINE_MIN_PAGES = 2
+_PAGE_EDGE_LINES = 2
+
+# Bare page numbers ("3", "3/5") are only dropped at page edges, where they
+# cannot be a score or a count from the CV body
+_BARE_PAGE_NUMBER_RE = re.compile(r'^(\d{1,3})(\s*(of|/|من)\s*(\d{1,3}))?$', re.IGNORECASE)
+
+# Section headings recognized in CV text (English and Arabic)
+SECTION_HEADINGS = [
+    ('summary', re.compile(r'^(professional\s+)?(summary|profile|objective|about me|نبذة|الملخص|الهدف)', re.IGNORECASE)),
+    ('education', re.compile(r'^(education|academic|qualifications|التعليم|المؤهلات)', re.IGNORECASE)),
+    ('experience', re.compile(r'^(work\s+|professional\s+)?(experience|employment|work history|internships?|الخبرات?|الخبرة)', re.IGNORECASE)),
+    ('skills', re.compile(r'^(technical\s+)?(skills|competencies|technologies|المهارات)', re.IGNORECASE)),
+    ('certifications', re.compile(r'^(certifications?|certificates?|licenses|courses|الشهادات|الدورات)', re.IGNORECASE)),
+    ('languages', re.compile(r'^(languages|اللغات)', re.IGNORECASE)),
+    ('projects', re.compile(r'^(projects|المشاريع)', re.IGNORECASE)),
+    ('activities', re.compile(r'^(awards|honors|achievements|activities|volunteer|الأنشطة|الجوائز)', re.IGNORECASE)),
+    ('other', re.compile(r'^(references|hobbies|interests|declaration|personal details|المراجع|الهوايات)', re.IGNORECASE)),
+]
+
+# Lowest number = keep first when trimming to the budget
+_SECTION_PRIORITIES = {
+    'summary': 1,
+    'education': 1,
+    'experience': 1,
+    'skills': 1,
+    'certifications': 2,
+    'languages': 2,
+    'projects': 3,
+    'activities': 4,
+    'other': 5,
+}
+_HEADING_MAX_CHARS = 40
+_CONTACT_PRIORITY = 0  # Text before the first heading: name, email, phone
+_CORE_PRIORITY = 1  # Sections at or above this priority are never trimmed
+
+_stats_lock = threading.Lock()
+_stats = {'documents': 0, 'tokens_before': 0, 'tokens_after': 0}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of prompt tokens in a text."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def _page_edges(pages: List[List[str]]) -> List[Set[int]]:
+    """Indexes of the first and last non-blank lines of each page."""
+    edges = []
+    for lines in pages:
+        content = [index for index, line in enumerate(lines) if line]
+        edges.append(set(content[:_PAGE_EDGE_LINES] + content[-_PAGE_EDGE_LINES:]))
+    return edges
+
+
+def _is_page_number(line: str, page_count: int) -> bool:
+    """Whether a line is a bare page number ("3", "3/5") of a multi-page text."""
+    match = _BARE_PAGE_NUMBER_RE.match(line)
+    if not match or page_count < 2:
+        return False
+    total = match.group(4)
+    return 1 <= int(match.group(1)) <= page_count and (total is None or int(total) == page_count)
+
+
+def clean_lines(text: str) -> List[str]:
+    """
+    Normalize whitespace, drop artifacts and collapse runs of blank lines.
+
+    Page headers and footers are removed when the text has page breaks
+    (PAGE_BREAK between PDF pages): short lines at the top or bottom of at
+    least ``_REPEATED_LINE_MIN_PAGES`` pages are kept only where they first
+    appear. Lines repeated in the body of the CV are content and are kept.
+    """
+    text = _CID_ARTIFACT_RE.sub('', text)
+    pages = []
+    for page in text.split(PAGE_BREAK):
+        lines = [_INLINE_WHITESPACE_RE.sub(' ', line).strip() for line in _CONTROL_CHARS_RE.sub('', page).splitlines()]
+        pages.append([
+            line for line in lines
+            if not (line and any(pattern.match(line) for pattern in _ARTIFACT_LINE_RES))
+        ])
+    edges = _page_edges(pages)
+
+    edge_pages = Counter(
+        line
+        for lines, page_edges in zip(pages, edges)
+        for line in {lines[index] for index in page_edges}
+        if len(line) <= _REPEATED_LINE_MAX_CHARS
+    )
+    repeated = {line for line, count in edge_pages.items() if count >= _REPEATED_LINE_MIN_PAGES}
+
+    cleaned = []
+    seen = set()
+    for lines, page_edges in zip(pages, edges):
+        for index, line in enumerate(lines):
+            if not line:
+                if cleaned and cleaned[-1]:
+                    cleaned.append('')
+                continue
+            # Keep the first occurrence - it may be the candidate's name
+            if line in repeated and line in seen and index in page_edges:
+                continue
+            if index in page_edges and _is_page_number(line, len(pages)):
+                continue
+            seen.add(line)
+            cleaned.append(line)
+    while cleaned and not cleaned[-1]:
+        cleaned.pop()
+    return cleaned
+
+
+def detect_section(line: str) -> Optional[str]:
+    """Name of the CV section a heading line starts, or None for content lines."""
+    if not line or len(line) > _HEADING_MAX_CHARS:
+        return None
+    heading = line.rstrip(':').strip()
+    for name, pattern in SECTION_HEADINGS:
+        if pattern.match(heading):
+            return name
+    return None
+
+
+def _split_sections(lines: List[str]) -> List[Tuple[int, List[str]]]:
+    """Group lines into (priority, lines) sections at recognized headings."""
+    sections = [(_CONTACT_PRIORITY, [])]
+    for line in lines:
+        section = detect_section(line)
+        if section is not None:
+            sections.append((_SECTION_PRIORITIES[section], [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(priority, section) for priority, section in sections if section]
+
+
+def _fit_to_budget(sections: List[Tuple[int, List[str]]], token_budget: int) -> List[List[str]]:
+    """
+    Trim lines from the end of the least important sections until the budget fits.
+
+    The contact block and the core sections (summary, education, experience,
+    skills) are never trimmed, so a CV whose core alone exceeds the budget is
+    kept whole; its length is still bounded by EXTRACTION_MAX_TEXT_CHARS.
+    """
+    kept = [list(section) for _, section in sections]
+    priorities = [priority for priority, _ in sections]
+    tokens = [estimate_tokens('\n'.join(section)) for section in kept]
+
+    for priority in sorted({p for p in priorities if p > _CORE_PRIORITY}, reverse=True):
+        # Longest section of this priority first
+        while sum(tokens) > token_budget:
+            candidates = [i for i, p in enumerate(priorities) if p == priority and kept[i]]
+            if not candidates:
+                break
+            index = max(candidates, key=lambda i: tokens[i])
+            kept[index].pop()
+            tokens[index] = estimate_tokens('\n'.join(kept[index]))
+    return kept
+
+
+def compact_cv_text(cv_text: str, token_budget: Optional[int] = None) -> Tuple[str, Dict]:
+    """
+    Compact CV text before it is pasted into the extraction prompt.
+
+    Args:
+        cv_text: Raw text extracted from the CV file
+        token_budget: Maximum estimated tokens (default: EXTRACTION_PROMPT_TOKEN_BUDGET)
+
+    Returns:
+        Tuple of (compacted text, stats dict with token/char estimates before and after)
+    """
+    if token_budget is None:
+        token_budget = settings.EXTRACTION_PROMPT_TOKEN_BUDGET
+
+    lines = clean_lines(cv_text)
+    sections = _split_sections(lines)
+    if estimate_tokens('\n'.join(lines)) > token_budget:
+        kept = _fit_to_budget(sections, token_budget)
+    else:
+        kept = [section for _, section in sections]
+    compacted = '\n'.join(line for section in kept for line in section).strip()
+
+    stats = {
+        'tokens_before': estimate_tokens(cv_text),
+        'tokens_after': estimate_tokens(compacted),
+        'chars_before': len(cv_text),
+        'chars_after': len(compacted),
+    }
+    with _stats_lock:
+        _stats['documents'] += 1
+        _stats['tokens_before'] += stats['tokens_before']
+        _stats['tokens_after'] += stats['tokens_after']
+    logger.info(
+        f"Prompt compaction: ~{stats['tokens_before']} -> ~{stats['tokens_after']} tokens "
+        f"({stats['chars_before']} -> {stats['chars_after']} chars)"
+    )
+    return compacted, stats
+
+
+def get_compaction_stats() -> Dict:
+    """Token estimates before/after compaction summed over this process."""
+    with _stats_lock:
+        stats = dict(_stats)
+    before = stats['tokens_before']
+    stats['reduction'] = round(1 - stats['tokens_after'] / before, 3) if before else 0.0
+    return stats
@@ -0,0 +1,341 @@
+"""
+Vectorized candidate ranking.
+
+``RankingIndex`` keeps one NumPy column per scoring feature (GPA and the
+number of skills, experience entries and certifications) for every profile,
+plus the rows of each canonical skill for the skill-match term. ``rank``
+scores every candidate in one pass with ``weighted_scores`` - the formula of
+the comparison page, with weights set per company - and selects the top ``k``
+with ``argpartition``, so ranking all profiles costs a few array operations
+instead of a Python loop.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from pymongo.errors import ServerSelectionTimeoutError, ConnectionFailure, PyMongoError
+from django.conf import settings
+
+from .mongodb_utils import (
+    HAS_USER_FILTER, MongoDBManager, decode_offset_token, encode_offset_token, normalize_skill,
+    search_cv_profiles,
+)
+from .profile_index import ProfileIndex
+
+logger = logging.getLogger(__name__)
+
+RANKING_WEIGHTS_COLLECTION = 'ranking_weights'
+RANKING_TOKEN_SALT = 'cv_extraction.ranking.page'
+
+# Scoring features and their default weights (points out of 100 without a skill
+# match term); skill_match only counts when the company asks for skills
+RANKING_FEATURES = ('gpa', 'skills', 'experience', 'certifications', 'skill_match')
+DEFAULT_RANKING_WEIGHTS = {'gpa': 40, 'skills': 30, 'experience': 20, 'certifications': 10, 'skill_match': 25}
+
+# A count at or above its cap earns the feature's full weight
+GPA_SCALE = 4.0
+SKILLS_CAP = 20
+EXPERIENCE_CAP = 10
+CERTIFICATIONS_CAP = 5
+
+_INITIAL_CAPACITY = 1024
+
+
+def weighted_scores(
+    gpa: np.ndarray,
+    skills_count: np.ndarray,
+    experience_count: np.ndarray,
+    certifications_count: np.ndarray,
+    weights: Dict[str, float],
+    skill_match: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Candidate scores for feature columns of equal length.
+
+    Args:
+        gpa, skills_count, experience_count, certifications_count: Feature columns
+        weights: Weight per feature in RANKING_FEATURES
+        skill_match: Fraction of the requested skills each candidate has, if any
+
+    Returns:
+        Score per candidate
+    """
+    scores = (
+        weights['gpa'] * (gpa / GPA_SCALE)
+        + weights['skills'] * np.minimum(skills_count / SKILLS_CAP, 1)
+        + weights['experience'] * np.minimum(experience_count / EXPERIENCE_CAP, 1)
+        + weights['certifications'] * np.minimum(certifications_count / CERTIFICATIONS_CAP, 1)
+    )
+    if skill_match is not None:
+        scores += weights['skill_match'] * skill_match
+    return scores
+
+
+def _gpa(profile: Dict) -> float:
+    gpa = profile.get('gpa')
+    return float(gpa) if isinstance(gpa, (int, float)) and not isinstance(gpa, bool) else 0.0
+
+
+def score_profiles(profiles: Sequence[Dict], weights: Dict[str, float], skills: Iterable[str] = ()) -> np.ndarray:
+    """``weighted_scores`` of a few loaded profiles (e.g. the ones being compared)."""
+    skills = set(skills)
+    skill_match = None
+    if skills:
+        skill_match = np.array(
+            [len(skills & set(profile.get('skills_normalized') or ())) / len(skills) for profile in profiles],
+            dtype=np.float64,
+        )
+    return weighted_scores(
+        np.array([_gpa(profile) for profile in profiles], dtype=np.float64),
+        np.array([len(profile.get('skills') or []) for profile in profiles], dtype=np.float64),
+        np.array([len(profile.get('experience') or []) for profile in profiles], dtype=np.float64),
+        np.array([len(profile.get('certifications') or []) for profile in profiles], dtype=np.float64),
+        weights,
+        skill_match,
+    )
+
+
+class RankingIndex(ProfileIndex):
+    """Columnar scoring features of every profile in this process."""
+
+    name = 'ranking index'
+    projection = {
+        'user_id': 1, 'user': 1, 'gpa': 1, 'skills': 1, 'skills_normalized': 1, 'experience': 1,
+        'certifications': 1, 'updated_at': 1, 'schema_version': 1,
+    }
+
+    def __init__(self):
+        super().__init__()
+        self._size = 0
+        self._ordinals: Dict[int, int] = {}
+        self._user_ids = np.zeros(_INITIAL_CAPACITY, dtype=np.int64)
+        self._gpa = np.zeros(_INITIAL_CAPACITY, dtype=np.float64)
+        self._skills_count = np.zeros(_INITIAL_CAPACITY, dtype=np.float64)
+        self._experience_count = np.zeros(_INITIAL_CAPACITY, dtype=np.float64)
+        self._certifications_count = np.zeros(_INITIAL_CAPACITY, dtype=np.float64)
+        # Rows of profiles that exist and belong to an existing user
+        self._listed = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+        self._skill_rows: Dict[str, set] = {}
+        self._skills_of: List[frozenset] = []
+
+    @property
+    def enabled(self) -> bool:
+        return settings.RANKING_ENABLED
+
+    @property
+    def refresh_seconds(self) -> float:
+        return settings.RANKING_INDEX_REFRESH_SECONDS
+
+    @property
+    def rebuild_seconds(self) -> float:
+        return settings.RANKING_INDEX_REBUILD_SECONDS
+
+    def _grow(self):
+        capacity = len(self._user_ids) * 2
+        for attribute in ('_user_ids', '_gpa', '_skills_count', '_experience_count', '_certifications_count', '_listed'):
+            column = getattr(self, attribute)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, attribute, grown)
+
+    def _set_skills(self, row: int, skills: frozenset):
+        old_skills = self._skills_of[row]
+        for skill in old_skills - skills:
+            rows = self._skill_rows[skill]
+            rows.discard(row)
+            if not rows:
+                del self._skill_rows[skill]
+        for skill in skills - old_skills:
+            self._skill_rows.setdefault(skill, set()).add(row)
+        self._skills_of[row] = skills
+
+    def _index_profile(self, profile: Dict):
+        user_id = profile['user_id']
+        row = self._ordinals.get(user_id)
+        if row is None:
+            if self._size == len(self._user_ids):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._ordinals[user_id] = row
+            self._user_ids[row] = user_id
+            self._skills_of.append(frozenset())
+        skills = profile.get('skills_normalized')
+        if skills is None:
+            skills = [normalize_skill(skill) for skill in profile.get('skills') or []]
+        self._gpa[row] = _gpa(profile)
+        self._skills_count[row] = len(profile.get('skills') or [])
+        self._experience_count[row] = len(profile.get('experience') or [])
+        self._certifications_count[row] = len(profile.get('certifications') or [])
+        self._listed[row] = isinstance(profile.get('user'), dict)
+        self._set_skills(row, frozenset(skill for skill in skills if skill))
+
+    def _remove_profile(self, user_id: int):
+        row = self._ordinals.get(user_id)
+        if row is not None:
+            self._listed[row] = False
+            self._set_skills(row, frozenset())
+
+    def rank(
+        self,
+        weights: Dict[str, float],
+        skills: Sequence[str] = (),
+        user_ids: Optional[Iterable[int]] = None,
+        limit: int = 10,
+    ) -> Optional[Dict]:
+        """
+        Best candidates by weighted score.
+
+        Args:
+            weights: Weight per feature in RANKING_FEATURES
+            skills: Canonical skill ids for the skill-match term
+            user_ids: Only rank these users (default: every listed profile)
+            limit: Number of candidates to return
+
+        Returns:
+            {'ranked': [(user_id, score), ...] best first, 'total_count': candidates
+            ranked}, or None if ranking is disabled or unavailable
+        """
+        if not self.enabled:
+            return None
+        try:
+            self.ensure_fresh()
+        except PyMongoError as e:
+            logger.warning(f'Ranking index unavailable: {str(e)}')
+            MongoDBManager.reset_connection()
+            return None
+        skills = list(dict.fromkeys(skills))
+
+        with self._lock:
+            size = self._size
+            candidates = self._listed[:size].copy()
+            if user_ids is not None:
+                candidates &= np.isin(self._user_ids[:size], np.fromiter(user_ids, dtype=np.int64))
+            skill_match = None
+            if skills:
+                skill_match = np.zeros(size, dtype=np.float64)
+                for skill in skills:
+                    rows = self._skill_rows.get(skill)
+                    if rows:
+                        skill_match[np.fromiter(rows, dtype=np.intp, count=len(rows))] += 1
+                skill_match /= len(skills)
+            scores = weighted_scores(
+                self._gpa[:size], self._skills_count[:size], self._experience_count[:size],
+                self._certifications_count[:size], weights, skill_match,
+            )
+            user_id_column = self._user_ids[:size].copy()
+
+        rows = np.flatnonzero(candidates)
+        total_count = len(rows)
+        limit = min(limit, total_count)
+        if limit <= 0:
+            return {'ranked': [], 'total_count': total_count}
+        candidate_scores = scores[rows]
+        if limit < total_count:
+            best = np.argpartition(-candidate_scores, limit - 1)[:limit]
+        else:
+            best = np.arange(total_count)
+        # Best first; ties by user id so pages are stable
+        order = np.lexsort((user_id_column[rows[best]], -candidate_scores[best]))
+        best = best[order]
+        return {
+            'ranked': list(zip(user_id_column[rows[best]].tolist(), candidate_scores[best].tolist())),
+            'total_count': total_count,
+        }
+
+
+ranking_index = RankingIndex()
+
+
+def rank_profiles(
+    weights: Dict[str, float],
+    query: Optional[Dict] = None,
+    skills: Sequence[str] = (),
+    page_token: Optional[str] = None,
+    page_size: Optional[int] = None,
+    shape: str = 'card',
+) -> Optional[Dict]:
+    """
+    One page of all candidates ordered by weighted score.
+
+    Args:
+        weights: Weight per feature in RANKING_FEATURES
+        query: MongoDB filter restricting the candidates (default: all listed profiles)
+        skills: Canonical skill ids for the skill-match term
+        page_token: Token from a previous page's next_token/prev_token
+        page_size: Profiles per page, capped at PROFILE_PAGE_SIZE_MAX
+        shape: Named projection from PROFILE_SHAPES for the returned profiles
+
+    Returns:
+        Same keys as ``paginate_cv_profiles`` plus 'total_count'; each profile
+        has 'rank_score'. None if ranking is disabled or unavailable.
+    """
+    page_size = min(max(1, page_size or settings.PROFILE_PAGE_SIZE), settings.PROFILE_PAGE_SIZE_MAX)
+    offset = decode_offset_token(page_token, RANKING_TOKEN_SALT)
+    user_ids = None
+    if query:
+        # The filters are evaluated by MongoDB; only the matching ids are read
+        user_ids = [
+            profile['user_id']
+            for profile in search_cv_profiles(dict(query, **HAS_USER_FILTER), projection={'user_id': 1}, sort=[])
+        ]
+    result = ranking_index.rank(weights, skills, user_ids, limit=offset + page_size)
+    if result is None:
+        return None
+
+    scores = dict(result['ranked'][offset:])
+    profiles = {
+        profile['user_id']: profile
+        for profile in search_cv_profiles({'user_id': {'$in': list(scores)}, **HAS_USER_FILTER}, shape=shape)
+    }
+    page_profiles = []
+    for user_id, score in scores.items():
+        profile = profiles.get(user_id)
+        if profile is not None:
+            profile['rank_score'] = round(score, 1)
+            page_profiles.append(profile)
+
+    total_count = result['total_count']
+    return {
+        'profiles': page_profiles,
+        'next_token': encode_offset_token(offset + page_size, RANKING_TOKEN_SALT) if offset + page_size < total_count else None,
+        'prev_token': encode_offset_token(max(0, offset - page_size), RANKING_TOKEN_SALT) if offset else None,
+        'page_size': page_size,
+        'total_count': total_count,
+    }
+
+
+def get_ranking_weights(company_id: int) -> Dict[str, float]:
+    """A company's ranking weights (DEFAULT_RANKING_WEIGHTS until it saves its own)."""
+    weights = dict(DEFAULT_RANKING_WEIGHTS)
+    try:
+        document = MongoDBManager.get_collection(RANKING_WEIGHTS_COLLECTION).find_one({'_id': company_id})
+    except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
+        logger.warning(f'MongoDB connection error in get_ranking_weights: {str(e)}')
+        MongoDBManager.reset_connection()
+        return weights
+    if document:
+        weights.update({
+            feature: float(value) for feature, value in (document.get('weights') or {}).items()
+            if feature in RANKING_FEATURES
+        })
+    return weights
+
+
+def save_ranking_weights(company_id: int, weights: Dict[str, float]) -> bool:
+    """Store a company's ranking weights; returns False if MongoDB is unavailable."""
+    try:
+        MongoDBManager.get_collection(RANKING_WEIGHTS_COLLECTION).update_one(
+            {'_id': company_id},
+            {'$set': {
+                'weights': {feature: float(weights[feature]) for feature in RANKING_FEATURES},
+                'updated_at': datetime.utcnow(),
+            }},
+            upsert=True,
+        )
+        return True
+    except (ServerSelectionTimeoutError, ConnectionFailure, PyMongoError) as e:
+        logger.warning(f'MongoDB connection error in save_ranking_weights: {str(e)}')
+        MongoDBManager.reset_connection()
+        return False
@@ -0,0 +1,287 @@
+"""
+Shared rate limiting for Cohere chat calls.
+
+Every gunicorn and extraction worker draws from one token bucket stored in
+the ``cohere_rate_limit`` MongoDB collection, refilled at
+``COHERE_RATE_LIMIT_PER_MINUTE`` with bursts of up to
+``COHERE_RATE_LIMIT_BURST``. A caller waits for a token for at most
+``COHERE_RATE_LIMIT_MAX_WAIT_SECONDS``; calls still answered with 429 or 5xx
+are retried with exponential backoff and full jitter. Time spent waiting is
+counted in process memory and added to a shared stats document every
+``COHERE_RATE_LIMIT_STATS_FLUSH_SECONDS``.
+"""
+import atexit
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from django.conf import settings
+
+from .mongodb_utils import MongoDBManager
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_COLLECTION = 'cohere_rate_limit'
+BUCKET_ID = 'cohere'
+STATS_ID = 'cohere:stats'
+
+# Log waits longer than this so bursts show up in the worker logs
+_SLOW_WAIT_SECONDS = 1.0
+
+# Upper bound of the random pause after losing a bucket update to another worker
+_CONTENTION_BACKOFF_SECONDS = 0.05
+
+_STAT_FIELDS = ('acquired', 'waited', 'wait_seconds', 'timeouts', 'retries')
+
+
+class RateLimitTimeout(Exception):
+    """No Cohere request slot became free within the maximum wait."""
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """True for 429 (rate limited) and 5xx responses."""
+    status_code = getattr(error, 'status_code', None)
+    if isinstance(status_code, int):
+        return status_code == 429 or status_code >= 500
+    error_str = str(error).lower()
+    return 'too many requests' in error_str or any(
+        code in error_str for code in ('429', '500', '502', '503', '504')
+    )
+
+
+class TokenBucketRateLimiter:
+    """
+    Token bucket shared by every process through MongoDB.
+
+    Takes are applied with optimistic concurrency on a ``version`` field, so
+    two workers can never spend the same token. If MongoDB is unreachable the
+    limiter falls back to an in-process bucket with the same rate.
+    """
+
+    def __init__(self, bucket_id: str = BUCKET_ID):
+        self.bucket_id = bucket_id
+        self._lock = threading.Lock()
+        self._local = None
+        self._stats = {'acquired': 0, 'waited': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0,
+                       'timeouts': 0, 'retries': 0}
+        # Not yet added to the shared stats document
+        self._unflushed = self._empty_unflushed()
+        self._next_flush_at = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Tokens added per second."""
+        return settings.COHERE_RATE_LIMIT_PER_MINUTE / 60.0
+
+    @property
+    def capacity(self) -> float:
+        return float(max(1, settings.COHERE_RATE_LIMIT_BURST))
+
+    def _collection(self):
+        return MongoDBManager.get_collection(RATE_LIMIT_COLLECTION)
+
+    def _refill(self, tokens: float, refilled_at: datetime, now: datetime) -> float:
+        elapsed = max(0.0, (now - refilled_at).total_seconds())
+        return min(self.capacity, tokens + elapsed * self.rate)
+
+    def _try_take_shared(self) -> Optional[float]:
+        """
+        Try to take a token from the shared bucket.
+
+        Returns:
+            0.0 if a token was taken, the seconds until the next token
+            otherwise, or None if another worker changed the bucket first
+        """
+        collection = self._collection()
+        now = datetime.utcnow()
+        bucket = collection.find_one({'_id': self.bucket_id})
+        if bucket is None:
+            try:
+                collection.insert_one({
+                    '_id': self.bucket_id,
+                    'tokens': self.capacity - 1,
+                    'refilled_at': now,
+                    'version': 0,
+                })
+                return 0.0
+            except DuplicateKeyError:
+                return None
+
+        tokens = self._refill(bucket['tokens'], bucket['refilled_at'], now)
+        if tokens < 1:
+            return (1 - tokens) / self.rate
+        outcome = collection.update_one(
+            {'_id': self.bucket_id, 'version': bucket['version']},
+            {'$set': {'tokens': tokens - 1, 'refilled_at': now}, '$inc': {'version': 1}},
+        )
+        return 0.0 if outcome.modified_count else None
+
+    def _try_take_local(self) -> float:
+        """Same as ``_try_take_shared`` on an in-process bucket."""
+        with self._lock:
+            now = datetime.utcnow()
+            if self._local is None:
+                self._local = {'tokens': self.capacity, 'refilled_at': now}
+            tokens = self._refill(self._local['tokens'], self._local['refilled_at'], now)
+            self._local['refilled_at'] = now
+            if tokens < 1:
+                self._local['tokens'] = tokens
+                return (1 - tokens) / self.rate
+            self._local['tokens'] = tokens - 1
+            return 0.0
+
+    def acquire(self, max_wait: Optional[float] = None) -> float:
+        """
+        Block until a request slot is free.
+
+        Args:
+            max_wait: Maximum seconds to wait (default: COHERE_RATE_LIMIT_MAX_WAIT_SECONDS)
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitTimeout: If no slot became free within ``max_wait``
+        """
+        if self.rate <= 0:
+            return 0.0
+        if max_wait is None:
+            max_wait = settings.COHERE_RATE_LIMIT_MAX_WAIT_SECONDS
+
+        started = time.monotonic()
+        while True:
+            try:
+                wait_for = self._try_take_shared()
+            except PyMongoError as e:
+                logger.warning(f'Shared rate limiter unavailable, limiting this process only: {str(e)}')
+                wait_for = self._try_take_local()
+
+            waited = time.monotonic() - started
+            if wait_for == 0.0:
+                self._record_wait(waited)
+                return waited
+            if wait_for is None:
+                # Lost a race with another worker: pause briefly before re-reading the bucket
+                wait_for = random.uniform(0, _CONTENTION_BACKOFF_SECONDS)
+            if waited + wait_for > max_wait:
+                self._record_timeout(waited)
+                raise RateLimitTimeout(
+                    f'Cohere rate limit: no request slot free within {max_wait:g}s'
+                )
+            # Sleep a little extra at random so waiting workers do not all wake together
+            time.sleep(wait_for + random.uniform(0, min(wait_for, 0.25)))
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call ``fn`` once a slot is free, retrying 429 and 5xx responses.
+
+        Retries wait ``COHERE_RETRY_BASE_DELAY_SECONDS * 2 ** attempt`` (capped
+        at ``COHERE_RETRY_MAX_DELAY_SECONDS``) scaled by a random factor, and
+        every retry takes a new token from the bucket.
+        """
+        max_retries = settings.COHERE_MAX_RETRIES
+        for attempt in range(max_retries + 1):
+            self.acquire()
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= max_retries or not is_retryable_error(e):
+                    raise
+                delay = min(
+                    settings.COHERE_RETRY_MAX_DELAY_SECONDS,
+                    settings.COHERE_RETRY_BASE_DELAY_SECONDS * (2 ** attempt),
+                )
+                delay = random.uniform(0, delay)
+                logger.warning(f'Cohere call failed ({str(e)[:100]}), retrying in {delay:.1f}s')
+                self._record_retry()
+                time.sleep(delay)
+
+    @staticmethod
+    def _empty_unflushed() -> Dict:
+        return dict({field: 0 for field in _STAT_FIELDS}, max_wait_seconds=0.0)
+
+    def _record(self, inc: Dict, wait_seconds: float = 0.0):
+        with self._lock:
+            for field, amount in inc.items():
+                self._stats[field] += amount
+                self._unflushed[field] += amount
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], wait_seconds)
+            self._unflushed['max_wait_seconds'] = max(self._unflushed['max_wait_seconds'], wait_seconds)
+            due = time.monotonic() >= self._next_flush_at
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Add the stats recorded since the last flush to the shared stats document."""
+        with self._lock:
+            pending, self._unflushed = self._unflushed, self._empty_unflushed()
+            self._next_flush_at = time.monotonic() + settings.COHERE_RATE_LIMIT_STATS_FLUSH_SECONDS
+        inc = {field: pending[field] for field in _STAT_FIELDS if pending[field]}
+        if not inc:
+            return
+        try:
+            self._collection().update_one(
+                {'_id': STATS_ID},
+                {'$inc': inc, '$max': {'max_wait_seconds': pending['max_wait_seconds']}},
+                upsert=True,
+            )
+        except PyMongoError as e:
+            logger.warning(f'Could not record rate limiter stats: {str(e)}')
+            # Keep them for the next flush
+            with self._lock:
+                for field, amount in inc.items():
+                    self._unflushed[field] += amount
+                self._unflushed['max_wait_seconds'] = max(
+                    self._unflushed['max_wait_seconds'], pending['max_wait_seconds']
+                )
+
+    def _record_wait(self, waited: float):
+        if waited >= _SLOW_WAIT_SECONDS:
+            logger.info(f'Waited {waited:.1f}s for a Cohere request slot')
+        self._record({'acquired': 1, 'waited': 1 if waited > 0.001 else 0, 'wait_seconds': waited}, waited)
+
+    def _record_timeout(self, waited: float):
+        logger.warning(f'Gave up waiting for a Cohere request slot after {waited:.1f}s')
+        self._record({'timeouts': 1, 'wait_seconds': waited}, waited)
+
+    def _record_retry(self):
+        self._record({'retries': 1})
+
+    def get_stats(self) -> Dict:
+        """Wait-time metrics across all workers, plus this process's own counters."""
+        self.flush_stats()
+        with self._lock:
+            process_stats = dict(self._stats)
+        stats = {'acquired': 0, 'waited': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0,
+                 'timeouts': 0, 'retries': 0}
+        try:
+            document = self._collection().find_one({'_id': STATS_ID}, max_time_ms=3000) or {}
+            stats.update({field: document[field] for field in stats if field in document})
+        except PyMongoError as e:
+            logger.warning(f'Could not load rate limiter stats: {str(e)}')
+            stats.update(process_stats)
+        acquired = stats['acquired']
+        stats['avg_wait_seconds'] = round(stats['wait_seconds'] / acquired, 3) if acquired else 0.0
+        stats['wait_seconds'] = round(stats['wait_seconds'], 1)
+        stats['max_wait_seconds'] = round(stats['max_wait_seconds'], 1)
+        stats['process'] = process_stats
+        return stats
+
+    def reset(self):
+        """Refill the bucket and clear the stats (e.g. after changing the rate)."""
+        self._collection().delete_many({'_id': {'$in': [self.bucket_id, STATS_ID]}})
+        with self._lock:
+            self._local = None
+            self._unflushed = self._empty_unflushed()
+
+
+cohere_rate_limiter = TokenBucketRateLimiter()
+atexit.register(cohere_rate_limiter.flush_stats)
+
+
+def get_rate_limit_stats() -> Dict:
+    return cohere_rate_limiter.get_stats()
@@ -18,4 +18,6 @@ class CVExtract(BaseModel):
     languages: List[str] = []
     gpa: Optional[float] = None
     major: Optional[str] = None
+    # Set when the profile was extracted offline and should be re-extracted with Cohere
+    needs_enrichment: bool = False
 
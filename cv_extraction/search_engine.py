@@ -0,0 +1,311 @@
+"""
+BM25 full-text search over CV profiles.
+
+``tokenize`` handles English and Arabic text: Arabic diacritics and tatweel
+are removed, alef/yaa/taa marbuta variants unified and the definite article
+stripped; English words are lowercased and lightly de-pluralized. The
+in-process ``SearchIndex`` maps every term to the profiles containing it with
+a boost-weighted term frequency (each occurrence counts ``FIELD_BOOSTS[field]``
+times, as in BM25F), ranks with BM25 and keeps the best ``k`` in a heap.
+``search_profiles`` resolves the other MongoDB filters to the matching user
+ids first, so only those profiles are ranked, and pages through the results
+by rank, with a highlighted snippet per profile.
+"""
+import heapq
+import logging
+import math
+import re
+from functools import lru_cache
+from operator import itemgetter
+from typing import Collection, Dict, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+from django.conf import settings
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .mongodb_utils import MongoDBManager, decode_offset_token, encode_offset_token, search_cv_profiles
+from .profile_index import ProfileIndex
+
+logger = logging.getLogger(__name__)
+
+# Weight of one occurrence of a term in each searched field
+FIELD_BOOSTS = {
+    'full_name': 3.0,
+    'skills': 2.5,
+    'major': 2.0,
+    'summary': 1.5,
+    'certifications': 1.2,
+    'experience': 1.0,
+    'education': 1.0,
+    'languages': 0.5,
+    'email': 0.5,
+}
+# Fields tried in order for the result snippet
+_SNIPPET_FIELDS = ('summary', 'experience', 'education', 'certifications', 'skills', 'major', 'full_name')
+_SNIPPET_WIDTH = 160
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SEARCH_TOKEN_SALT = 'cv_extraction.search.page'
+
+# Words, including Arabic diacritics so they do not split a word
+_TOKEN = re.compile(r'[\w\u0610-\u061a\u064b-\u065f\u0670\u0640]+')
+_ARABIC_MARKS = re.compile(r'[\u0610-\u061a\u064b-\u065f\u0670\u0640]')
+_ARABIC_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+})
+_ARABIC_WORD = re.compile(r'^[\u0600-\u06ff]')
+# Article with attached conjunctions/prepositions, longest first
+_ARABIC_PREFIXES = ('وال', 'بال', 'كال', 'فال', 'لل', 'ال')
+# Stop words after normalization
+_STOPWORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'into', 'is', 'it',
+    'of', 'on', 'or', 'the', 'to', 'with', 'was', 'were', 'will',
+    'في', 'من', 'علي', 'الي', 'عن', 'مع', 'او', 'و', 'ثم', 'هذا', 'هذه', 'التي', 'الذي',
+})
+
+
+@lru_cache(maxsize=65536)
+def _stem(word: str) -> str:
+    if _ARABIC_WORD.match(word):
+        for prefix in _ARABIC_PREFIXES:
+            if word.startswith(prefix) and len(word) - len(prefix) >= 2:
+                return word[len(prefix):]
+        return word
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('sses', 'xes', 'ches', 'shes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def _normalize(text: str) -> str:
+    return _ARABIC_MARKS.sub('', text).translate(_ARABIC_LETTERS).casefold()
+
+
+def _term(word: str) -> Optional[str]:
+    """Index term for one word, or None for stop words."""
+    word = _normalize(word)
+    if not word or word in _STOPWORDS:
+        return None
+    return _stem(word)
+
+
+def tokenize(text: str) -> List[str]:
+    """Index terms of a text, in order."""
+    return [_stem(word) for word in _TOKEN.findall(_normalize(str(text or ''))) if word not in _STOPWORDS]
+
+
+def field_texts(value) -> List[str]:
+    """The text(s) of a profile field, which is a string or a list of strings."""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value if item]
+    return [str(value)]
+
+
+def highlight_snippet(profile: Dict, text: str, width: int = _SNIPPET_WIDTH) -> str:
+    """
+    Excerpt of the first field that contains a query term, with the terms in <mark>.
+
+    Returns:
+        Safe HTML (the profile text is escaped)
+    """
+    terms = set(tokenize(text))
+    for field in _SNIPPET_FIELDS:
+        for value in field_texts(profile.get(field)):
+            matches = [match for match in _TOKEN.finditer(value) if _term(match.group()) in terms]
+            if not matches:
+                continue
+            start = max(0, matches[0].start() - width // 3)
+            end = min(len(value), start + width)
+            parts = ['…' if start else '']
+            position = start
+            for match in matches:
+                if match.end() > end:
+                    break
+                parts.append(escape(value[position:match.start()]))
+                parts.append(f'<mark>{escape(match.group())}</mark>')
+                position = match.end()
+            parts.append(escape(value[position:end]))
+            parts.append('…' if end < len(value) else '')
+            return mark_safe(''.join(parts))
+    return ''
+
+
+class SearchIndex(ProfileIndex):
+    """Term -> (user_id -> weighted term frequency) index of this process."""
+
+    name = 'search index'
+    projection = dict({field: 1 for field in FIELD_BOOSTS}, user_id=1, updated_at=1, schema_version=1)
+
+    def __init__(self):
+        super().__init__()
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._doc_lengths: Dict[int, float] = {}
+        self._total_length = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SEARCH_ENGINE_ENABLED
+
+    @property
+    def refresh_seconds(self) -> float:
+        return settings.SEARCH_INDEX_REFRESH_SECONDS
+
+    @property
+    def rebuild_seconds(self) -> float:
+        return settings.SEARCH_INDEX_REBUILD_SECONDS
+
+    def _remove_profile(self, user_id: int):
+        for term in self._doc_terms.pop(user_id, ()):
+            postings = self._postings[term]
+            del postings[user_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(user_id, 0.0)
+
+    def _index_profile(self, profile: Dict):
+        user_id = profile['user_id']
+        self._remove_profile(user_id)
+        weights: Dict[str, float] = {}
+        length = 0.0
+        for field, boost in FIELD_BOOSTS.items():
+            for value in field_texts(profile.get(field)):
+                for term in tokenize(value):
+                    weights[term] = weights.get(term, 0.0) + boost
+                    length += boost
+        if not weights:
+            return
+        for term, weight in weights.items():
+            self._postings.setdefault(term, {})[user_id] = weight
+        self._doc_terms[user_id] = tuple(weights)
+        self._doc_lengths[user_id] = length
+        self._total_length += length
+
+    def search(
+        self, text: str, limit: int, candidates: Optional[Collection[int]] = None
+    ) -> Optional[List[Tuple[int, float]]]:
+        """
+        Best matching profiles for a query.
+
+        Args:
+            text: Search text
+            limit: Maximum number of profiles returned
+            candidates: If given, only these user ids are ranked
+
+        Returns:
+            Up to ``limit`` (user_id, score) pairs, best first, or None if the
+            search engine is disabled or unavailable
+        """
+        if not self.enabled:
+            return None
+        try:
+            self.ensure_fresh()
+        except PyMongoError as e:
+            logger.warning(f'Search index unavailable, using the MongoDB text index: {str(e)}')
+            MongoDBManager.reset_connection()
+            return None
+        terms = set(tokenize(text))
+        with self._lock:
+            count = len(self._doc_lengths)
+            if not terms or not count:
+                return []
+            average_length = self._total_length / count
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for user_id, frequency in postings.items():
+                    if candidates is not None and user_id not in candidates:
+                        continue
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[user_id] / average_length)
+                    scores[user_id] = scores.get(user_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+
+
+search_index = SearchIndex()
+
+
+def search_profiles(
+    text: str,
+    query: Optional[Dict] = None,
+    page_token: Optional[str] = None,
+    page_size: Optional[int] = None,
+    shape: str = 'search',
+) -> Optional[Dict]:
+    """
+    One page of profiles matching ``text``, ordered by BM25 relevance.
+
+    ``query`` (the other filters) is resolved to the matching user ids in one
+    MongoDB query, then the best ``SEARCH_MAX_RESULTS`` of those profiles are
+    ranked in memory.
+
+    Args:
+        text: Search text
+        query: Additional MongoDB filter
+        page_token: Token from a previous page's next_token/prev_token
+        page_size: Profiles per page, capped at PROFILE_PAGE_SIZE_MAX
+        shape: Named projection from PROFILE_SHAPES for the returned profiles
+
+    Returns:
+        Same keys as ``paginate_cv_profiles`` plus 'total_count' and
+        'total_capped' (True when more than ``SEARCH_MAX_RESULTS`` profiles may
+        match); each profile has 'search_score' and 'search_snippet'. None if
+        the search engine is disabled or unavailable.
+    """
+    if not search_index.enabled:
+        return None
+    candidates = None
+    if query:
+        try:
+            cursor = MongoDBManager.get_cv_collection().find(query, {'_id': 0, 'user_id': 1}, max_time_ms=3000)
+            candidates = {profile['user_id'] for profile in cursor}
+        except PyMongoError as e:
+            logger.warning(f'Could not apply the search filters, using the MongoDB text index: {str(e)}')
+            MongoDBManager.reset_connection()
+            return None
+    ranked = search_index.search(text, settings.SEARCH_MAX_RESULTS, candidates)
+    if ranked is None:
+        return None
+    page_size = min(max(1, page_size or settings.PROFILE_PAGE_SIZE), settings.PROFILE_PAGE_SIZE_MAX)
+    offset = decode_offset_token(page_token, SEARCH_TOKEN_SALT)
+    scores = dict(ranked)
+
+    if candidates is None:
+        # Drop profiles deleted since the index was refreshed
+        existing = {
+            profile['user_id']
+            for profile in search_cv_profiles({'user_id': {'$in': list(scores)}}, projection={'user_id': 1})
+        }
+        ordered = [user_id for user_id, _ in ranked if user_id in existing]
+    else:
+        ordered = [user_id for user_id, _ in ranked]
+    page_ids = ordered[offset:offset + page_size]
+
+    profiles = {profile['user_id']: profile for profile in search_cv_profiles({'user_id': {'$in': page_ids}}, shape=shape)}
+    page_profiles = []
+    for user_id in page_ids:
+        profile = profiles.get(user_id)
+        if profile is not None:
+            profile['search_score'] = round(scores[user_id], 3)
+            profile['search_snippet'] = highlight_snippet(profile, text)
+            page_profiles.append(profile)
+
+    return {
+        'profiles': page_profiles,
+        'next_token': encode_offset_token(offset + page_size, SEARCH_TOKEN_SALT) if offset + page_size < len(ordered) else None,
+        'prev_token': encode_offset_token(max(0, offset - page_size), SEARCH_TOKEN_SALT) if offset else None,
+        'page_size': page_size,
+        'total_count': len(ordered),
+        'total_capped': len(ranked) >= settings.SEARCH_MAX_RESULTS,
+    }
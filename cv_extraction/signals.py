@@ -0,0 +1,43 @@
+"""
+Keep the user fields stored in cv_profiles in sync with the Django users, and
+the in-process profile indexes in sync with the profiles saved here.
+"""
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .mongodb_utils import (
+    USER_SYNC_FIELDS, build_user_fields, profile_deleted, profile_saved, sync_profile_user,
+)
+from .job_matching import job_match_index
+from .ranking import ranking_index
+from .search_engine import search_index
+from .skill_index import skill_index
+
+PROFILE_INDEXES = (skill_index, search_index, ranking_index, job_match_index)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def sync_profile_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    # A new user has no profile yet, and saves such as the last_login update on
+    # every sign-in do not touch the stored fields
+    if created or (update_fields is not None and not set(update_fields) & set(USER_SYNC_FIELDS)):
+        return
+    sync_profile_user(instance.id, build_user_fields(instance))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def sync_profile_on_user_delete(sender, instance, **kwargs):
+    sync_profile_user(instance.id, None)
+
+
+@receiver(profile_saved)
+def index_saved_profile(sender, user_id, document, **kwargs):
+    for index in PROFILE_INDEXES:
+        index.profile_saved(user_id, document)
+
+
+@receiver(profile_deleted)
+def unindex_deleted_profile(sender, user_id, **kwargs):
+    for index in PROFILE_INDEXES:
+        index.profile_deleted(user_id)
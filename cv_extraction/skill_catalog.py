@@ -0,0 +1,265 @@
+"""
+Canonical skill ids.
+
+Skills extracted from CVs are free-form ("JS", "Javascript", "java script",
+"React.js"). ``canonical_skill`` maps each spelling to one id: an exact lookup
+in ``SKILL_ALIASES`` ignoring case, spaces and punctuation, then a fuzzy
+lookup for misspellings, where catalog entries sharing character trigrams
+with the skill are scored by edit distance, word by word for multi-word
+skills. Skills matching nothing keep their case- and whitespace-insensitive
+form as id; known near misses are pinned in ``cv_extraction/tests.py``.
+
+Profiles store the ids in ``skills_normalized`` when they are saved, so
+filtering is an equality lookup on an indexed field. After changing
+``SKILL_ALIASES``, bump ``CV_PROFILE_SCHEMA_VERSION`` so stored profiles are
+re-canonicalized (lazily, or with ``migrate_cv_profiles``).
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Optional, Set, Tuple
+
+# Canonical id -> other spellings. Ids are the lowercase display names.
+SKILL_ALIASES: Dict[str, Tuple[str, ...]] = {
+    # Languages
+    'python': ('python3', 'python 3', 'py'),
+    'javascript': ('js', 'ecmascript', 'es6', 'vanilla js'),
+    'typescript': ('ts',),
+    'java': ('core java', 'java se'),
+    'c': ('c language', 'c programming'),
+    'c++': ('cpp', 'cplusplus', 'c plus plus'),
+    'c#': ('csharp', 'c sharp'),
+    'go': ('golang',),
+    'rust': (),
+    'kotlin': (),
+    'swift': (),
+    'dart': (),
+    'php': ('php7', 'php8'),
+    'ruby': (),
+    'r': ('r programming', 'r language'),
+    'scala': (),
+    'matlab': (),
+    'bash': ('shell scripting', 'shell', 'bash scripting'),
+    # Web
+    'html': ('html5',),
+    'css': ('css3',),
+    'sass': ('scss',),
+    'tailwind css': ('tailwind', 'tailwindcss'),
+    'bootstrap': (),
+    'react': ('reactjs', 'react js'),
+    'react native': (),
+    'angular': ('angularjs', 'angular js'),
+    'vue': ('vuejs', 'vue js'),
+    'next.js': ('next',),
+    'node.js': ('node', 'node js'),
+    'express': ('expressjs', 'express js'),
+    'jquery': (),
+    'django': (),
+    'django rest framework': ('drf',),
+    'flask': (),
+    'fastapi': ('fast api',),
+    'spring boot': (),
+    'spring': ('spring framework',),
+    'laravel': (),
+    '.net': ('dotnet', 'dot net'),
+    'asp.net': ('asp.net core', 'asp net core'),
+    'ruby on rails': ('rails', 'ror'),
+    'flutter': (),
+    'rest api': ('rest', 'restful', 'restful api', 'restful apis', 'rest apis'),
+    'graphql': (),
+    # Data
+    'sql': ('structured query language',),
+    'mysql': (),
+    'postgresql': ('postgres', 'psql'),
+    'sql server': ('mssql', 'microsoft sql server', 'ms sql server'),
+    'sqlite': ('sqlite3',),
+    'oracle database': ('oracle db', 'oracle sql', 'pl/sql', 'plsql'),
+    'mongodb': ('mongo',),
+    'redis': (),
+    'firebase': (),
+    'nosql': (),
+    'pandas': (),
+    'numpy': (),
+    'scikit-learn': ('sklearn',),
+    'tensorflow': (),
+    'keras': (),
+    'pytorch': ('torch',),
+    'opencv': ('open cv',),
+    'machine learning': ('ml',),
+    'deep learning': ('dl',),
+    'artificial intelligence': ('ai',),
+    'natural language processing': ('nlp',),
+    'computer vision': (),
+    'data analysis': ('data analytics',),
+    'data analyst': ('data analysts',),
+    'data science': (),
+    'data visualization': ('data visualisation',),
+    'power bi': ('powerbi', 'microsoft power bi'),
+    'tableau': (),
+    # Tools and platforms
+    'git': (),
+    'github': (),
+    'gitlab': (),
+    'docker': (),
+    'kubernetes': ('k8s',),
+    'linux': (),
+    'aws': ('amazon web services',),
+    'microsoft azure': ('azure',),
+    'google cloud': ('gcp', 'google cloud platform'),
+    'ci/cd': ('continuous integration',),
+    'jira': (),
+    'figma': (),
+    'ui/ux': ('ux/ui', 'ui/ux design', 'ux/ui design'),
+    'adobe photoshop': ('photoshop',),
+    'adobe illustrator': ('illustrator',),
+    'autocad': ('auto cad',),
+    'microsoft office': ('ms office', 'office 365', 'microsoft 365'),
+    'microsoft excel': ('excel', 'ms excel'),
+    'microsoft word': ('word', 'ms word'),
+    'microsoft powerpoint': ('powerpoint', 'ms powerpoint'),
+    # Other
+    'object-oriented programming': ('oop', 'object oriented programming'),
+    'data structures': ('data structure',),
+    'algorithms': ('algorithm',),
+    'project management': (),
+    'product management': (),
+    'agile': ('agile methodology', 'agile methodologies'),
+    'scrum': (),
+    'communication': ('communication skills',),
+    'teamwork': ('team work', 'team player'),
+    'problem solving': ('problem-solving', 'problem solving skills'),
+    'leadership': ('leadership skills',),
+    'time management': (),
+}
+
+# Shortest key (skill or catalog entry) matched by edit distance; shorter ones
+# only match exactly ("scalar" is not a misspelling of "scala")
+_FUZZY_MIN_LENGTH = 6
+# Words of multi-word skills are compared one by one: shorter words must match
+# exactly and longer ones allow one edit ("product" is not "project")
+_FUZZY_WORD_MIN_LENGTH = 4
+# Candidates must share this fraction of the skill's trigrams (a transposition
+# such as "pyhton" already breaks three of them)
+_FUZZY_MIN_OVERLAP = 0.25
+
+_NON_KEY = re.compile(r'[^\w+#]')
+
+
+def _key(skill: str) -> str:
+    """Lookup form of a skill: case-folded, without spaces and punctuation except + and #."""
+    return _NON_KEY.sub('', str(skill).casefold())
+
+
+def _trigrams(key: str) -> Set[str]:
+    padded = f'^{key}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _words(skill: str) -> Tuple[str, ...]:
+    return tuple(word for word in (_key(word) for word in str(skill).split()) if word)
+
+
+def _edit_limit(key: str) -> int:
+    return 1 if len(key) < 10 else 2
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance counting adjacent transpositions as one edit; ``limit + 1`` once it exceeds ``limit``."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+
+class SkillCatalog:
+    """Alias lookup plus a trigram index over the alias keys for fuzzy matching."""
+
+    def __init__(self, aliases: Dict[str, Tuple[str, ...]]):
+        self._ids: Dict[str, str] = {}
+        self._words: Dict[str, Tuple[str, ...]] = {}
+        for skill_id, spellings in aliases.items():
+            for spelling in (skill_id,) + tuple(spellings):
+                self._ids.setdefault(_key(spelling), skill_id)
+                self._words.setdefault(_key(spelling), _words(spelling))
+        self._trigram_index: Dict[str, Set[str]] = {}
+        for key in self._ids:
+            if len(key) >= _FUZZY_MIN_LENGTH:
+                for trigram in _trigrams(key):
+                    self._trigram_index.setdefault(trigram, set()).add(key)
+
+    def _distance(self, key: str, words: Tuple[str, ...], candidate: str) -> Optional[int]:
+        """
+        Edits from a skill to a catalog key, or None if they are too far apart.
+
+        Skills with the same number of words as the catalog entry are compared
+        word by word, so one wrong word is not hidden in a long key; otherwise
+        the keys are compared whole ("machinelearning"), with one edit for
+        multi-word entries.
+        """
+        candidate_words = self._words[candidate]
+        if len(words) > 1 and len(words) == len(candidate_words):
+            total = 0
+            for word, candidate_word in zip(words, candidate_words):
+                limit = _edit_limit(word) if len(word) >= _FUZZY_WORD_MIN_LENGTH else 0
+                distance = _edit_distance(word, candidate_word, limit)
+                if distance > limit:
+                    return None
+                total += distance
+            return total
+        limit = 1 if len(words) > 1 or len(candidate_words) > 1 else _edit_limit(key)
+        distance = _edit_distance(key, candidate, limit)
+        return distance if distance <= limit else None
+
+    def _fuzzy_id(self, key: str, words: Tuple[str, ...]) -> Optional[str]:
+        trigrams = _trigrams(key)
+        shared: Dict[str, int] = {}
+        for trigram in trigrams:
+            for candidate in self._trigram_index.get(trigram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        best_ids, best_distance = set(), None
+        for candidate, count in shared.items():
+            if count < _FUZZY_MIN_OVERLAP * len(trigrams):
+                continue
+            distance = self._distance(key, words, candidate)
+            if distance is None:
+                continue
+            if best_distance is None or distance < best_distance:
+                best_ids, best_distance = {self._ids[candidate]}, distance
+            elif distance == best_distance:
+                best_ids.add(self._ids[candidate])
+        # Ambiguous misspellings are left alone
+        return best_ids.pop() if len(best_ids) == 1 else None
+
+    def canonical_id(self, skill: str) -> str:
+        """
+        Canonical id of a skill.
+
+        Returns:
+            The catalog id of the skill or its closest misspelling, else the
+            skill lowercased with collapsed whitespace ('' for a blank skill)
+        """
+        key = _key(skill)
+        skill_id = self._ids.get(key)
+        if skill_id is None and len(key) >= _FUZZY_MIN_LENGTH:
+            skill_id = self._fuzzy_id(key, _words(skill))
+        if skill_id is None:
+            skill_id = ' '.join(str(skill).split()).casefold()
+        return skill_id
+
+
+skill_catalog = SkillCatalog(SKILL_ALIASES)
+
+
+@lru_cache(maxsize=65536)
+def canonical_skill(skill: str) -> str:
+    """Cached ``skill_catalog.canonical_id``."""
+    return skill_catalog.canonical_id(skill)
+
@@ -0,0 +1,210 @@
+"""
+In-process inverted index of profile skills.
+
+Every profile gets a small integer ordinal, and every normalized skill maps to
+the ordinals of the profiles that list it. Posting lists are kept as sets
+while they are sparse and as bitmaps (Python ints, one bit per ordinal) once
+they cover at least 1/32 of the profiles, so AND/OR/NOT queries are a few
+big-integer operations. Building and refreshing are handled by
+``ProfileIndex``; callers use the returned ids inside a MongoDB query, so ids
+of profiles deleted by another process since the last rebuild match nothing.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+from django.conf import settings
+
+from .mongodb_utils import MongoDBManager, normalize_skill
+from .profile_index import ProfileIndex
+
+logger = logging.getLogger(__name__)
+
+# A posting list becomes a bitmap once it holds 1/_DENSE_RATIO of all ordinals
+_DENSE_RATIO = 32
+
+
+def parse_skill_query(text: str) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Split a comma-separated skill filter into (any_of, all_of, none_of).
+
+    ``python, django`` matches either skill, ``+sql`` is required and
+    ``-php`` excluded; skills are normalized with ``normalize_skill``.
+    """
+    any_of, all_of, none_of = [], [], []
+    for term in (text or '').split(','):
+        term = term.strip()
+        target = any_of
+        if term[:1] == '+':
+            target, term = all_of, term[1:]
+        elif term[:1] == '-':
+            target, term = none_of, term[1:]
+        skill = normalize_skill(term)
+        if skill:
+            target.append(skill)
+    return any_of, all_of, none_of
+
+
+class SkillIndex(ProfileIndex):
+    """Skill -> profiles inverted index of this process."""
+
+    name = 'skill index'
+    projection = {'user_id': 1, 'skills': 1, 'skills_normalized': 1, 'updated_at': 1, 'schema_version': 1}
+
+    def __init__(self):
+        super().__init__()
+        self._ordinals: Dict[int, int] = {}
+        self._user_ids: List[int] = []
+        self._skills_of: List[frozenset] = []
+        self._postings: Dict[str, object] = {}
+        # Ordinals of deleted profiles, excluded from NOT-only queries
+        self._deleted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.SKILL_INDEX_ENABLED
+
+    @property
+    def refresh_seconds(self) -> float:
+        return settings.SKILL_INDEX_REFRESH_SECONDS
+
+    @property
+    def rebuild_seconds(self) -> float:
+        return settings.SKILL_INDEX_REBUILD_SECONDS
+
+    @staticmethod
+    def _profile_skills(profile: Dict) -> frozenset:
+        skills = profile.get('skills_normalized')
+        if skills is None:
+            skills = [normalize_skill(skill) for skill in profile.get('skills') or []]
+        return frozenset(skill for skill in skills if skill)
+
+    def _bitmap(self, ordinals: Iterable[int]) -> int:
+        buffer = bytearray((len(self._user_ids) + 7) // 8)
+        for ordinal in ordinals:
+            buffer[ordinal >> 3] |= 1 << (ordinal & 7)
+        return int.from_bytes(buffer, 'little')
+
+    def _add(self, skill: str, ordinal: int):
+        posting = self._postings.get(skill)
+        if posting is None:
+            self._postings[skill] = {ordinal}
+        elif isinstance(posting, int):
+            self._postings[skill] = posting | (1 << ordinal)
+        else:
+            posting.add(ordinal)
+            # During a build all dense lists are converted once at the end
+            if not self._building and len(posting) * _DENSE_RATIO >= len(self._user_ids):
+                self._postings[skill] = self._bitmap(posting)
+
+    def _remove(self, skill: str, ordinal: int):
+        posting = self._postings.get(skill)
+        if isinstance(posting, int):
+            posting &= ~(1 << ordinal)
+            if posting:
+                self._postings[skill] = posting
+            else:
+                del self._postings[skill]
+        elif posting is not None:
+            posting.discard(ordinal)
+            if not posting:
+                del self._postings[skill]
+
+    def _set_skills(self, ordinal: int, skills: frozenset):
+        old_skills = self._skills_of[ordinal]
+        for skill in old_skills - skills:
+            self._remove(skill, ordinal)
+        for skill in skills - old_skills:
+            self._add(skill, ordinal)
+        self._skills_of[ordinal] = skills
+
+    def _index_profile(self, profile: Dict):
+        user_id = profile['user_id']
+        ordinal = self._ordinals.get(user_id)
+        if ordinal is None:
+            ordinal = len(self._user_ids)
+            self._ordinals[user_id] = ordinal
+            self._user_ids.append(user_id)
+            self._skills_of.append(frozenset())
+        elif self._deleted >> ordinal & 1:
+            self._deleted &= ~(1 << ordinal)
+        self._set_skills(ordinal, self._profile_skills(profile))
+
+    def _remove_profile(self, user_id: int):
+        ordinal = self._ordinals.get(user_id)
+        if ordinal is not None:
+            self._set_skills(ordinal, frozenset())
+            self._deleted |= 1 << ordinal
+
+    def _finish_build(self):
+        for skill, ordinals in self._postings.items():
+            if len(ordinals) * _DENSE_RATIO >= len(self._user_ids):
+                self._postings[skill] = self._bitmap(ordinals)
+
+    def _posting_bitmap(self, skill: str) -> int:
+        posting = self._postings.get(skill, 0)
+        return posting if isinstance(posting, int) else self._bitmap(posting)
+
+    def _decode(self, bitmap: int) -> List[int]:
+        # str.find skips the zero bits in C, so this costs one step per match
+        bits = bin(bitmap)[2:]
+        top = len(bits) - 1
+        user_ids = []
+        position = bits.find('1')
+        while position != -1:
+            user_ids.append(self._user_ids[top - position])
+            position = bits.find('1', position + 1)
+        return user_ids
+
+    def match(
+        self,
+        any_of: Iterable[str] = (),
+        all_of: Iterable[str] = (),
+        none_of: Iterable[str] = (),
+        max_matches: Optional[int] = None,
+    ) -> Optional[List[int]]:
+        """
+        User ids of the profiles with any of ``any_of``, all of ``all_of`` and none of ``none_of``.
+
+        Args:
+            any_of: Normalized skills of which at least one is required (ignored if empty)
+            all_of: Normalized skills that are all required
+            none_of: Normalized skills that exclude a profile
+            max_matches: Return None instead of larger results (default:
+                SKILL_INDEX_MAX_MATCHES), so broad filters can use the MongoDB index
+
+        Returns:
+            Matching user ids, or None if the index is disabled, unavailable
+            or the result is too large
+        """
+        if not self.enabled:
+            return None
+        try:
+            self.ensure_fresh()
+        except PyMongoError as e:
+            logger.warning(f'Skill index unavailable, filtering in MongoDB: {str(e)}')
+            MongoDBManager.reset_connection()
+            return None
+        if max_matches is None:
+            max_matches = settings.SKILL_INDEX_MAX_MATCHES
+
+        with self._lock:
+            result = ((1 << len(self._user_ids)) - 1) & ~self._deleted
+            any_of = list(any_of)
+            if any_of:
+                matches_any = 0
+                for skill in any_of:
+                    matches_any |= self._posting_bitmap(skill)
+                result &= matches_any
+            for skill in all_of:
+                if not result:
+                    break
+                result &= self._posting_bitmap(skill)
+            for skill in none_of:
+                result &= ~self._posting_bitmap(skill)
+            if result.bit_count() > max_matches:
+                return None
+            return self._decode(result)
+
+
+skill_index = SkillIndex()
@@ -0,0 +1,30 @@
+from django.test import SimpleTestCase
+
+from .skill_catalog import skill_catalog
+
+
+class SkillCatalogTests(SimpleTestCase):
+    """Misspellings that must be fixed and different skills that must not be merged."""
+
+    # Spelling -> expected canonical id
+    EXPECTATIONS = (
+        ('Pyhton', 'python'),
+        ('Javascipt', 'javascript'),
+        ('Machine Lerning', 'machine learning'),
+        ('Artifical Intelligance', 'artificial intelligence'),
+        ('machinelearning', 'machine learning'),
+        ('Scalar', 'scalar'),
+        ('Microsoft Exel', 'microsoft excel'),
+        ('Project Managment', 'project management'),
+        ('Product Managment', 'product management'),
+        ('Process Management', 'process management'),
+        ('Data Analytics', 'data analysis'),
+        ('Data Analysts', 'data analyst'),
+        ('Data Analyzer', 'data analyzer'),
+        ('Project Manager', 'project manager'),
+    )
+
+    def test_canonical_ids(self):
+        for spelling, expected in self.EXPECTATIONS:
+            with self.subTest(spelling=spelling):
+                self.assertEqual(skill_catalog.canonical_id(spelling), expected)
@@ -0,0 +1,209 @@
+"""
+Text extraction from uploaded CV files.
+
+Extractors are generators that yield one page (PDF) or paragraph (DOCX) at a
+time, so ``collect_text`` can stop parsing as soon as the character, page or
+CPU time budget is spent. The LLM prompt cannot use more text than
+``EXTRACTION_MAX_TEXT_CHARS`` anyway, and a long scanned portfolio should not
+hold a worker for seconds.
+
+PDF pages are joined with ``PAGE_BREAK`` so prompt compaction can tell page
+headers and footers apart from content.
+"""
+import logging
+import signal
+import time
+from io import BytesIO
+from typing import Iterator, Iterable, Optional, Tuple
+
+import PyPDF2
+from docx import Document
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Separates the pages of PDF text (form feed; str.splitlines also splits on it)
+PAGE_BREAK = '\f'
+
+
+def _iter_reader_pages(pdf_reader, start_page: int = 0, end_page: Optional[int] = None) -> Iterator[str]:
+    pages = pdf_reader.pages
+    end_page = len(pages) if end_page is None else min(end_page, len(pages))
+    for page_number in range(start_page, end_page):
+        yield pages[page_number].extract_text() or ''
+
+
+def iter_pdf_pages(file_content: bytes, start_page: int = 0, end_page: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the text of each PDF page lazily.
+
+    Args:
+        file_content: PDF file content as bytes
+        start_page: Index of the first page to extract
+        end_page: Index after the last page to extract (default: last page)
+    """
+    try:
+        pdf_reader = PyPDF2.PdfReader(BytesIO(file_content))
+        yield from _iter_reader_pages(pdf_reader, start_page, end_page)
+    except ParseTimeout:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error extracting text from PDF: {str(e)}")
+
+
+def extract_pdf_range(
+    file_content: bytes,
+    start_page: int,
+    end_page: int,
+    max_chars: Optional[int] = None,
+    cpu_seconds: Optional[float] = None,
+) -> Tuple[str, int, float]:
+    """
+    Extract the text of a page range within a budget.
+
+    Returns:
+        Tuple of (text of the range, total number of pages in the document,
+        CPU seconds spent)
+    """
+    started = time.thread_time()
+    try:
+        pdf_reader = PyPDF2.PdfReader(BytesIO(file_content))
+        total_pages = len(pdf_reader.pages)
+        text = collect_text(
+            _iter_reader_pages(pdf_reader, start_page, end_page),
+            max_chars=max_chars,
+            cpu_seconds=cpu_seconds,
+            separator=PAGE_BREAK,
+        )
+        return text, total_pages, time.thread_time() - started
+    except ParseTimeout:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error extracting text from PDF: {str(e)}")
+
+
+def count_pdf_pages(file_content: bytes) -> int:
+    """Number of pages in a PDF without extracting any text."""
+    try:
+        return len(PyPDF2.PdfReader(BytesIO(file_content)).pages)
+    except ParseTimeout:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error extracting text from PDF: {str(e)}")
+
+
+def iter_docx_paragraphs(file_content: bytes) -> Iterator[str]:
+    """Yield the text of each DOCX paragraph lazily."""
+    try:
+        doc = Document(BytesIO(file_content))
+        for paragraph in doc.paragraphs:
+            yield paragraph.text
+    except ParseTimeout:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error extracting text from DOCX: {str(e)}")
+
+
+def is_pdf(filename: str) -> bool:
+    return filename.lower().endswith('.pdf')
+
+
+def iter_text(file_content: bytes, filename: str) -> Iterator[str]:
+    """Yield text chunks from a file based on its extension."""
+    filename_lower = filename.lower()
+    if filename_lower.endswith('.pdf'):
+        return iter_pdf_pages(file_content)
+    elif filename_lower.endswith('.docx') or filename_lower.endswith('.doc'):
+        return iter_docx_paragraphs(file_content)
+    else:
+        raise ValueError(f"Unsupported file type: {filename}")
+
+
+def collect_text(
+    chunks: Iterable[str],
+    max_chars: Optional[int] = None,
+    max_chunks: Optional[int] = None,
+    cpu_seconds: Optional[float] = None,
+    separator: str = '\n',
+) -> str:
+    """
+    Join text chunks until a budget is reached.
+
+    Parsing stops (the generator is not advanced further) once the text
+    reaches ``max_chars``, ``max_chunks`` chunks were read, or the calling
+    thread has spent ``cpu_seconds`` of CPU time on this document.
+
+    Returns:
+        Chunks joined with ``separator`` (PAGE_BREAK for PDF pages), at most
+        ``max_chars`` long
+    """
+    parts = []
+    total_chars = 0
+    started = time.thread_time()
+    for index, chunk in enumerate(chunks):
+        parts.append(chunk)
+        total_chars += len(chunk) + 1
+        if max_chars is not None and total_chars >= max_chars:
+            break
+        if max_chunks is not None and index + 1 >= max_chunks:
+            break
+        if cpu_seconds is not None and time.thread_time() - started >= cpu_seconds:
+            logger.warning(f'Text extraction stopped after {index + 1} chunks: CPU budget of {cpu_seconds}s spent')
+            break
+    text = separator.join(parts)
+    if max_chars is not None:
+        text = text[:max_chars]
+    return text
+
+
+class ParseTimeout(ValueError):
+    """Raised inside a parsing pool child whose parse ran past its deadline."""
+
+
+def call_with_timeout(timeout: float, fn, *args):
+    """
+    Run ``fn(*args)`` in a parsing pool child, raising ParseTimeout after ``timeout`` seconds.
+
+    The timer interrupts the parse inside the child, so only this task fails
+    and the pool keeps its process. Without SIGALRM (Windows) the parent's
+    deadline is the only limit.
+    """
+    if not hasattr(signal, 'setitimer'):
+        return fn(*args)
+
+    def expire(signum, frame):
+        raise ParseTimeout(f'Parsing the CV took longer than {timeout:.0f}s and was stopped')
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    signal.setitimer(signal.ITIMER_REAL, max(timeout, 0.01))
+    try:
+        return fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def check_file_size(file_content: bytes):
+    """Reject files above EXTRACTION_MAX_FILE_BYTES before parsing them."""
+    if len(file_content) > settings.EXTRACTION_MAX_FILE_BYTES:
+        raise ValueError(
+            f"File is too large to process ({len(file_content)} bytes, "
+            f"max {settings.EXTRACTION_MAX_FILE_BYTES})"
+        )
+
+
+def extract_docx_text(file_content: bytes, max_chars: Optional[int] = None, cpu_seconds: Optional[float] = None) -> str:
+    """Extract DOCX text within a budget (picklable entry point for the parsing pool)."""
+    return collect_text(iter_docx_paragraphs(file_content), max_chars=max_chars, cpu_seconds=cpu_seconds)
+
+
+def extract_text(file_content: bytes, filename: str) -> str:
+    """Extract text in this process within the configured size, page and CPU budgets."""
+    check_file_size(file_content)
+    return collect_text(
+        iter_text(file_content, filename),
+        max_chars=settings.EXTRACTION_MAX_TEXT_CHARS,
+        max_chunks=settings.EXTRACTION_MAX_PDF_PAGES if is_pdf(filename) else None,
+        cpu_seconds=settings.EXTRACTION_PARSE_CPU_SECONDS,
+        separator=PAGE_BREAK if is_pdf(filename) else '\n',
+    )
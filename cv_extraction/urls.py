@@ -13,6 +13,8 @@ urlpatterns = [
     path('student/dashboard/', views.student_dashboard, name='student_dashboard'),
     path('student/upload/', views.upload_cv, name='upload_cv'),
     path('student/extracted-data/', views.show_extracted_data, name='show_extracted_data'),
+    path('student/extraction-jobs/<str:job_id>/', views.extraction_job_status, name='extraction_job_status'),
+    path('student/extraction-jobs/<str:job_id>/status/', views.extraction_job_status_api, name='extraction_job_status_api'),
     path('student/browse/', views.student_browse, name='student_browse'),
     path('student/profile/', views.student_profile, name='student_profile'),
     path('student/profile/<int:user_id>/', views.student_profile, name='student_profile_view'),
@@ -21,6 +23,8 @@ urlpatterns = [
     # Company routes
     path('company/dashboard/', views.company_dashboard, name='company_dashboard'),
     path('company/compare/', views.compare_students, name='compare_students'),
+    path('company/ranking-weights/', views.ranking_weights, name='ranking_weights'),
+    path('company/job-match/', views.job_match, name='job_match'),
     
     # Admin routes (using 'manage' prefix to avoid conflict with Django admin)
     path('manage/dashboard/', views.admin_dashboard, name='admin_dashboard'),
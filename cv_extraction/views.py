@@ -4,14 +4,28 @@ Views for CV extraction app.
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db.models import Count
+from django.http import JsonResponse, Http404
+from django.urls import reverse
 from accounts.models import User
-from .forms import CVUploadForm, StudentFilterForm, StudentComparisonForm, CVProfileEditForm
-from .cv_extractor import CVExtractor
+from .forms import (
+    CVUploadForm, StudentFilterForm, StudentComparisonForm, CVProfileEditForm, RankingWeightsForm,
+    JobDescriptionForm,
+)
 from .mongodb_utils import (
-    save_cv_profile, get_cv_profile, get_all_cv_profiles,
-    search_cv_profiles, delete_cv_profile, delete_cv_profile_by_id
+    save_cv_profile, get_cv_profile, get_profile_analytics, get_profile_cache_stats,
+    search_cv_profiles, count_cv_profiles, paginate_cv_profiles, get_cv_profile_user_ids,
+    delete_cv_profile, delete_cv_profile_by_id, HAS_USER_FILTER
+)
+from .extraction_jobs import (
+    enqueue_extraction_job, get_extraction_job, get_latest_extraction_job,
+    STATUS_SUCCEEDED, FINISHED_STATUSES
 )
-from collections import Counter
+from .extraction_cache import get_extraction_cache_stats
+from .search_engine import search_profiles
+from .ranking import get_ranking_weights, rank_profiles, save_ranking_weights, score_profiles
+from .job_matching import match_job_description
+from .rate_limiter import get_rate_limit_stats
 import json
 
 
@@ -87,25 +101,14 @@ def upload_cv(request):
                 cv_file = request.FILES['cv_file']
                 file_content = cv_file.read()
                 
-                # Extract CV data using Cohere
-                extractor = CVExtractor()
-                cv_data = extractor.process_cv_file(file_content, cv_file.name)
-                
-                # Convert Pydantic model to dict
-                cv_dict = cv_data.model_dump()
-                
-                # Save to MongoDB
-                save_cv_profile(request.user.id, cv_dict)
-                
-                # Store extracted data in session to show on next page
-                request.session['extracted_cv_data'] = cv_dict
-                request.session['cv_filename'] = cv_file.name
+                # Queue extraction - the Cohere call runs in run_extraction_worker
+                job_id = enqueue_extraction_job(request.user.id, file_content, cv_file.name)
                 
-                messages.success(request, 'CV uploaded and processed successfully!')
-                return redirect('cv_extraction:show_extracted_data')
+                messages.success(request, 'CV uploaded! Your information is being extracted.')
+                return redirect('cv_extraction:extraction_job_status', job_id=job_id)
                 
             except Exception as e:
-                messages.error(request, f'Error processing CV: {str(e)}')
+                messages.error(request, f'Error uploading CV: {str(e)}')
         else:
             messages.error(request, 'Please correct the errors in the form.')
     else:
@@ -182,30 +185,87 @@ def edit_cv_profile(request):
 
 @login_required
 def show_extracted_data(request):
-    """Show extracted CV data after upload."""
+    """Show the latest extraction job of the current student."""
     if not request.user.is_student():
         messages.error(request, 'Access denied. Student access only.')
         return redirect('cv_extraction:home')
     
-    # Get extracted data from session
-    extracted_data = request.session.get('extracted_cv_data')
-    cv_filename = request.session.get('cv_filename')
-    
-    if not extracted_data:
+    job = get_latest_extraction_job(request.user.id)
+    if not job:
         messages.info(request, 'No extracted data found. Please upload a CV first.')
         return redirect('cv_extraction:upload_cv')
     
-    # Clear session data after showing
-    del request.session['extracted_cv_data']
-    if 'cv_filename' in request.session:
-        del request.session['cv_filename']
+    return redirect('cv_extraction:extraction_job_status', job_id=job['_id'])
+
+
+def _extraction_job_payload(job):
+    """Public fields of an extraction job for the status endpoint."""
+    return {
+        'id': job['_id'],
+        'status': job['status'],
+        'attempts': job.get('attempts', 0),
+        'max_attempts': job.get('max_attempts'),
+        'error': job.get('error'),
+        'finished': job['status'] in FINISHED_STATUSES,
+    }
+
+
+@login_required
+def extraction_job_status(request, job_id):
+    """Show the progress of an extraction job, or its extracted data once done."""
+    if not request.user.is_student():
+        messages.error(request, 'Access denied. Student access only.')
+        return redirect('cv_extraction:home')
+    
+    job = get_extraction_job(job_id, user_id=request.user.id)
+    if not job:
+        raise Http404('Extraction job not found')
+    
+    if job['status'] == STATUS_SUCCEEDED:
+        context = {
+            'extracted_data': job.get('result') or {},
+            'cv_filename': job.get('filename'),
+        }
+        return render(request, 'cv_extraction/show_extracted_data.html', context)
     
     context = {
-        'extracted_data': extracted_data,
-        'cv_filename': cv_filename,
+        'job': _extraction_job_payload(job),
+        'cv_filename': job.get('filename'),
     }
+    return render(request, 'cv_extraction/extraction_job_status.html', context)
+
+
+@login_required
+def extraction_job_status_api(request, job_id):
+    """JSON status of an extraction job, polled by the status page."""
+    if not request.user.is_student():
+        return JsonResponse({'error': 'Access denied. Student access only.'}, status=403)
     
-    return render(request, 'cv_extraction/show_extracted_data.html', context)
+    job = get_extraction_job(job_id, user_id=request.user.id)
+    if not job:
+        return JsonResponse({'error': 'Extraction job not found'}, status=404)
+    
+    return JsonResponse(_extraction_job_payload(job))
+
+
+def _page_params(request):
+    """Page token and size requested in the query string."""
+    try:
+        page_size = int(request.GET.get('page_size', 0)) or None
+    except ValueError:
+        page_size = None
+    return {'page_token': request.GET.get('cursor'), 'page_size': page_size}
+
+
+def _pagination_context(request, page):
+    """Template context for the next/previous links, keeping the other query parameters."""
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    return {
+        'next_token': page['next_token'],
+        'prev_token': page['prev_token'],
+        'page_query': params.urlencode(),
+    }
 
 
 @login_required
@@ -215,53 +275,21 @@ def student_browse(request):
         messages.error(request, 'Access denied. Student access only.')
         return redirect('cv_extraction:home')
     
-    # Get all CV profiles
-    all_profiles = get_all_cv_profiles()
-    
-    # Filter and normalize user_ids, exclude current user
-    student_profiles = []
-    for p in all_profiles:
-        user_id = p.get('user_id')
-        # Convert to int if it's a string or ensure it's an int
-        try:
-            if user_id:
-                user_id = int(user_id)
-                # Exclude current user's profile
-                if user_id != request.user.id:
-                    p['user_id'] = user_id
-                    student_profiles.append(p)
-        except (ValueError, TypeError):
-            # Skip profiles with invalid user_ids
-            continue
-    
-    # Get user info for all profiles (not just students)
-    user_ids = [p.get('user_id') for p in student_profiles if p.get('user_id')]
-    if user_ids:
-        # Get all users (not filtered by role yet)
-        all_users = {user.id: user for user in User.objects.filter(id__in=user_ids)}
-        # Separate students from others
-        student_users = {uid: user for uid, user in all_users.items() if user.role == 'student'}
-    else:
-        all_users = {}
-        student_users = {}
+    # Other students' profiles, one page at a time (user fields are stored in the profile)
+    query = {'user_id': {'$ne': request.user.id}, **HAS_USER_FILTER}
+    page = paginate_cv_profiles(query, shape='card', **_page_params(request))
     
-    # Add user info to profiles - show all profiles but mark which are students
-    valid_profiles = []
+    # Show all profiles but mark which belong to students
+    role_labels = dict(User.ROLE_CHOICES)
+    student_profiles = page['profiles']
     for profile in student_profiles:
-        user_id = profile.get('user_id')
-        if user_id:
-            # Add user if exists
-            if user_id in all_users:
-                profile['user'] = all_users[user_id]
-                profile['is_student'] = user_id in student_users
-            else:
-                profile['user'] = None
-                profile['is_student'] = False
-            valid_profiles.append(profile)
+        profile['is_student'] = profile['user']['role'] == 'student'
+        profile['user']['role_display'] = role_labels.get(profile['user']['role'], profile['user']['role'])
     
     context = {
-        'profiles': valid_profiles,
-        'total_count': len(valid_profiles),
+        'profiles': student_profiles,
+        'total_count': count_cv_profiles(query),
+        **_pagination_context(request, page),
     }
     
     return render(request, 'cv_extraction/student_browse.html', context)
@@ -321,94 +349,89 @@ def company_dashboard(request):
         messages.error(request, 'Access denied. Company access only.')
         return redirect('cv_extraction:home')
     
-    # Get all CV profiles
-    all_profiles = get_all_cv_profiles()
-    
-    # Normalize and filter user_ids
-    valid_user_ids = []
-    for profile in all_profiles:
-        user_id = profile.get('user_id')
-        try:
-            if user_id:
-                user_id = int(user_id)
-                profile['user_id'] = user_id
-                valid_user_ids.append(user_id)
-        except (ValueError, TypeError):
-            # Skip profiles with invalid user_ids
-            continue
-    
-    # Get user info for each profile
-    if valid_user_ids:
-        users = {user.id: user for user in User.objects.filter(id__in=valid_user_ids)}
+    # Filters run inside MongoDB; only the requested page is loaded
+    form = StudentFilterForm(request.GET)
+    valid = form.is_valid()
+    rank_all = valid and form.cleaned_data['rank']
+    weights = get_ranking_weights(request.user.id)
+    page = None
+    
+    if rank_all:
+        # Every matching student is scored with the company's weights
+        page = rank_profiles(
+            weights, form.to_mongo_query(), form.ranking_skills(), **_page_params(request)
+        )
+    search_text = form.ranked_search_text() if valid and page is None else ''
+    query = form.to_mongo_query(text_search=not search_text) if valid else {}
+    # Skip profiles whose user was deleted
+    query.update(HAS_USER_FILTER)
+    
+    # Search text is ranked by relevance; the text index is the fallback
+    if search_text:
+        page = search_profiles(search_text, query, **_page_params(request))
+    total_capped = False
+    if page is not None:
+        total_count = page['total_count']
+        total_capped = page.get('total_capped', False)
     else:
-        users = {}
+        if search_text:
+            query['$text'] = {'$search': search_text}
+        total_count = count_cv_profiles(query)
+        page = paginate_cv_profiles(query, shape='card', **_page_params(request))
+    
+    context = {
+        'profiles': page['profiles'],
+        'form': form,
+        'weights_form': RankingWeightsForm.for_weights(weights),
+        'total_count': total_count,
+        'total_capped': total_capped,
+        **_pagination_context(request, page),
+    }
     
-    # Add user info to profiles and filter out invalid ones
-    valid_profiles = []
-    for profile in all_profiles:
-        user_id = profile.get('user_id')
-        if user_id and user_id in users:
-            profile['user'] = users.get(user_id)
-            valid_profiles.append(profile)
+    return render(request, 'cv_extraction/company_dashboard.html', context)
+
+
+@login_required
+def ranking_weights(request):
+    """Save the company's candidate ranking weights."""
+    if not request.user.is_company():
+        messages.error(request, 'Access denied. Company access only.')
+        return redirect('cv_extraction:home')
+    if request.method != 'POST':
+        return redirect('cv_extraction:company_dashboard')
     
-    all_profiles = valid_profiles
+    form = RankingWeightsForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, 'Ranking weights must be whole numbers from 0 to 100.')
+    elif save_ranking_weights(request.user.id, form.cleaned_data):
+        messages.success(request, 'Ranking weights saved.')
+    else:
+        messages.error(request, 'Could not save the ranking weights. Please try again.')
+    return redirect(f"{reverse('cv_extraction:company_dashboard')}?rank=on")
+
+
+@login_required
+def job_match(request):
+    """Shortlist the students best matching a pasted job description."""
+    if not request.user.is_company():
+        messages.error(request, 'Access denied. Company access only.')
+        return redirect('cv_extraction:home')
     
-    # Apply filters
-    form = StudentFilterForm(request.GET)
-    if form.is_valid():
-        filtered_profiles = all_profiles.copy()
-        
-        # GPA filter
-        gpa_min = form.cleaned_data.get('gpa_min')
-        gpa_max = form.cleaned_data.get('gpa_max')
-        if gpa_min is not None:
-            filtered_profiles = [
-                p for p in filtered_profiles
-                if p.get('gpa') is not None and p.get('gpa') >= gpa_min
-            ]
-        if gpa_max is not None:
-            filtered_profiles = [
-                p for p in filtered_profiles
-                if p.get('gpa') is not None and p.get('gpa') <= gpa_max
-            ]
-        
-        # Major filter
-        major = form.cleaned_data.get('major')
-        if major:
-            filtered_profiles = [
-                p for p in filtered_profiles
-                if major.lower() in (p.get('major') or '').lower()
-            ]
-        
-        # Skills filter
-        skills = form.cleaned_data.get('skills')
-        if skills:
-            skill_list = [s.strip().lower() for s in skills.split(',')]
-            filtered_profiles = [
-                p for p in filtered_profiles
-                if any(skill in [sk.lower() for sk in p.get('skills', [])] for skill in skill_list)
-            ]
-        
-        # Search filter
-        search = form.cleaned_data.get('search')
-        if search:
-            search_lower = search.lower()
-            filtered_profiles = [
-                p for p in filtered_profiles
-                if (search_lower in (p.get('full_name') or '').lower() or
-                    search_lower in (p.get('email') or '').lower() or
-                    search_lower in (p.get('summary') or '').lower())
-            ]
-        
-        all_profiles = filtered_profiles
+    shortlist = None
+    if request.method == 'POST':
+        form = JobDescriptionForm(request.POST)
+        if form.is_valid():
+            shortlist = match_job_description(form.cleaned_data['description'], form.to_mongo_query())
+            if shortlist is None:
+                messages.warning(request, 'Job matching is not available right now. Please use the filters instead.')
+    else:
+        form = JobDescriptionForm()
     
     context = {
-        'profiles': all_profiles,
         'form': form,
-        'total_count': len(all_profiles),
+        'shortlist': shortlist,
     }
-    
-    return render(request, 'cv_extraction/company_dashboard.html', context)
+    return render(request, 'cv_extraction/job_match.html', context)
 
 
 @login_required
@@ -418,44 +441,29 @@ def compare_students(request):
         messages.error(request, 'Access denied. Company access only.')
         return redirect('cv_extraction:home')
     
-    all_profiles = get_all_cv_profiles()
-    
-    # Normalize and filter user_ids - only include profiles with valid users
-    valid_profiles = []
-    valid_user_ids = []
-    for profile in all_profiles:
-        user_id = profile.get('user_id')
-        try:
-            if user_id:
-                user_id = int(user_id)
-                profile['user_id'] = user_id
-                valid_user_ids.append(user_id)
-                valid_profiles.append(profile)
-        except (ValueError, TypeError):
-            continue
-    
-    # Get user info
-    if valid_user_ids:
-        users = {user.id: user for user in User.objects.filter(id__in=valid_user_ids)}
-        for profile in valid_profiles:
-            profile['user'] = users.get(profile.get('user_id'))
-    
-    all_profiles = valid_profiles
+    # Students offered for selection, one page at a time
+    page = paginate_cv_profiles(HAS_USER_FILTER, shape='card', **_page_params(request))
+    page_profiles = page['profiles']
     
     if request.method == 'POST':
-        form = StudentComparisonForm(request.POST, students=all_profiles)
+        # Validate against the selected profiles, which may come from any page
+        selected_ids = []
+        for sid in request.POST.getlist('student_ids'):
+            try:
+                selected_ids.append(int(sid))
+            except ValueError:
+                continue
+        selected_profiles = search_cv_profiles(
+            {'user_id': {'$in': selected_ids}, **HAS_USER_FILTER}, shape='compare'
+        )
+        form = StudentComparisonForm(request.POST, students=selected_profiles)
         if form.is_valid():
             student_ids = [int(sid) for sid in form.cleaned_data['student_ids']]
             selected_profiles = [
-                p for p in all_profiles
+                p for p in selected_profiles
                 if p.get('user_id') in student_ids
             ]
             
-            # Get user info
-            users = {user.id: user for user in User.objects.filter(id__in=student_ids)}
-            for profile in selected_profiles:
-                profile['user'] = users.get(profile.get('user_id'))
-            
             # Calculate comparison metrics
             comparison_data = []
             for profile in selected_profiles:
@@ -470,14 +478,9 @@ def compare_students(request):
             
             # Find strongest candidate
             if comparison_data:
-                # Score based on GPA (40%), skills (30%), experience (20%), certifications (10%)
-                for data in comparison_data:
-                    score = (
-                        (data['gpa'] / 4.0) * 40 +
-                        min(data['skills_count'] / 20, 1) * 30 +
-                        min(data['experience_count'] / 10, 1) * 20 +
-                        min(data['certifications_count'] / 5, 1) * 10
-                    )
+                # Same weighted score as the dashboard ranking, with the company's weights
+                scores = score_profiles(selected_profiles, get_ranking_weights(request.user.id))
+                for data, score in zip(comparison_data, scores.tolist()):
                     data['score'] = score
                 
                 comparison_data.sort(key=lambda x: x['score'], reverse=True)
@@ -485,15 +488,20 @@ def compare_students(request):
             
             context = {
                 'comparison_data': comparison_data,
-                'form': StudentComparisonForm(students=all_profiles),
+                'form': StudentComparisonForm(students=page_profiles),
+                **_pagination_context(request, page),
             }
             return render(request, 'cv_extraction/compare_students.html', context)
+        # Show the page's students again, keeping the error message
+        form.fields['student_ids'].choices = StudentComparisonForm(students=page_profiles).fields['student_ids'].choices
     else:
-        form = StudentComparisonForm(students=all_profiles)
+        form = StudentComparisonForm(students=page_profiles)
     
     context = {
         'form': form,
-        'profiles': all_profiles,
+        'profiles': page_profiles,
+        'total_count': count_cv_profiles(HAS_USER_FILTER),
+        **_pagination_context(request, page),
     }
     
     return render(request, 'cv_extraction/compare_students.html', context)
@@ -506,33 +514,15 @@ def admin_dashboard(request):
         messages.error(request, 'Access denied. Admin access only.')
         return redirect('cv_extraction:home')
     
-    # Get all data
-    all_profiles = get_all_cv_profiles()
-    all_users = User.objects.all()
-    
-    # Calculate analytics
-    total_students = all_users.filter(role='student').count()
-    total_companies = all_users.filter(role='company').count()
-    
-    # Most common skills
-    all_skills = []
-    for profile in all_profiles:
-        all_skills.extend(profile.get('skills', []))
-    skill_counts = Counter(all_skills)
-    most_common_skills = skill_counts.most_common(10)
+    # Profile statistics come from the cv_stats rollup, role counts from one grouped query
+    analytics = get_profile_analytics()
+    role_counts = dict(User.objects.values_list('role').annotate(count=Count('id')).order_by())
+    total_students = role_counts.get('student', 0)
+    total_companies = role_counts.get('company', 0)
     
-    # Majors distribution
-    majors = [p.get('major') for p in all_profiles if p.get('major')]
-    major_counts = Counter(majors)
-    majors_distribution = dict(major_counts.most_common(10))
-    
-    # Average GPA
-    gpas = [p.get('gpa') for p in all_profiles if p.get('gpa') is not None]
-    avg_gpa = sum(gpas) / len(gpas) if gpas else 0
-    
-    # Prepare chart data
-    from django.utils.safestring import mark_safe
-    import json
+    most_common_skills = analytics['top_skills']
+    majors_distribution = dict(analytics['top_majors'])
+    avg_gpa = analytics['avg_gpa']
     
     # Users distribution for pie chart
     users_distribution = {
@@ -540,7 +530,7 @@ def admin_dashboard(request):
         'data': json.dumps([
             total_students,
             total_companies,
-            all_users.filter(role='admin').count()
+            role_counts.get('admin', 0)
         ])
     }
     
@@ -562,19 +552,7 @@ def admin_dashboard(request):
     }
     
     # GPA distribution (bins)
-    gpa_bins = {'0-2.0': 0, '2.0-2.5': 0, '2.5-3.0': 0, '3.0-3.5': 0, '3.5-4.0': 0}
-    for gpa in gpas:
-        if gpa < 2.0:
-            gpa_bins['0-2.0'] += 1
-        elif gpa < 2.5:
-            gpa_bins['2.0-2.5'] += 1
-        elif gpa < 3.0:
-            gpa_bins['2.5-3.0'] += 1
-        elif gpa < 3.5:
-            gpa_bins['3.0-3.5'] += 1
-        else:
-            gpa_bins['3.5-4.0'] += 1
-    
+    gpa_bins = analytics['gpa_bins']
     gpa_distribution = {
         'labels': json.dumps(list(gpa_bins.keys())),
         'data': json.dumps(list(gpa_bins.values()))
@@ -583,7 +561,7 @@ def admin_dashboard(request):
     context = {
         'total_students': total_students,
         'total_companies': total_companies,
-        'total_profiles': len(all_profiles),
+        'total_profiles': analytics['total_profiles'],
         'most_common_skills': most_common_skills,
         'majors_distribution': majors_distribution,
         'avg_gpa': round(avg_gpa, 2),
@@ -591,6 +569,9 @@ def admin_dashboard(request):
         'skills_chart_data': skills_chart_data,
         'majors_chart_data': majors_chart_data,
         'gpa_distribution': gpa_distribution,
+        'extraction_cache_stats': get_extraction_cache_stats(),
+        'rate_limit_stats': get_rate_limit_stats(),
+        'profile_cache_stats': get_profile_cache_stats(),
     }
     
     return render(request, 'cv_extraction/admin_dashboard.html', context)
@@ -644,8 +625,7 @@ def admin_users(request):
     all_users = User.objects.all().order_by('-date_joined')
     
     # Get CV profile status for each user
-    all_profiles = get_all_cv_profiles()
-    profile_user_ids = {p.get('user_id') for p in all_profiles}
+    profile_user_ids = get_cv_profile_user_ids()
     
     for user in all_users:
         user.has_cv_profile = user.id in profile_user_ids
@@ -190,7 +190,139 @@ LOGOUT_REDIRECT_URL = '/accounts/login/'  # Redirect to login page after logout
 # MongoDB Configuration
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
 MONGODB_DB_NAME = os.getenv('MONGODB_DB_NAME', 'cv_platform')
+# Create missing indexes (see cv_extraction/mongo_indexes.py) in a background thread at startup
+MONGODB_ENSURE_INDEXES_ON_STARTUP = os.getenv('MONGODB_ENSURE_INDEXES_ON_STARTUP', 'False').lower() == 'true'
 
 # Cohere API Configuration
 COHERE_API_KEY = os.getenv('COHERE_API_KEY', '')
+# HTTP client shared by all extractions in a process (see cohere_client.py)
+COHERE_TIMEOUT_SECONDS = float(os.getenv('COHERE_TIMEOUT_SECONDS', '60'))
+COHERE_CONNECT_TIMEOUT_SECONDS = float(os.getenv('COHERE_CONNECT_TIMEOUT_SECONDS', '10'))
+COHERE_MAX_CONNECTIONS = int(os.getenv('COHERE_MAX_CONNECTIONS', '10'))
+COHERE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('COHERE_MAX_KEEPALIVE_CONNECTIONS', '5'))
+COHERE_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv('COHERE_KEEPALIVE_EXPIRY_SECONDS', '120'))
+# Chat models in preference order (command-r and command-r-plus were removed in Nov 2025)
+COHERE_MODELS = [
+    model.strip()
+    for model in os.getenv('COHERE_MODELS', 'command-r7b-12-2024,command').split(',')
+    if model.strip()
+]
+# Circuit breaker for models that are removed or keep failing (see model_registry.py)
+COHERE_MODEL_REMOVED_COOLDOWN_SECONDS = int(os.getenv('COHERE_MODEL_REMOVED_COOLDOWN_SECONDS', str(24 * 60 * 60)))
+COHERE_MODEL_FAILURE_THRESHOLD = int(os.getenv('COHERE_MODEL_FAILURE_THRESHOLD', '3'))
+COHERE_MODEL_FAILURE_COOLDOWN_SECONDS = int(os.getenv('COHERE_MODEL_FAILURE_COOLDOWN_SECONDS', '300'))
+COHERE_MODEL_STATE_REFRESH_SECONDS = float(os.getenv('COHERE_MODEL_STATE_REFRESH_SECONDS', '30'))
+# Shared token bucket for Cohere calls across all web and extraction workers
+COHERE_RATE_LIMIT_PER_MINUTE = float(os.getenv('COHERE_RATE_LIMIT_PER_MINUTE', '40'))
+COHERE_RATE_LIMIT_BURST = int(os.getenv('COHERE_RATE_LIMIT_BURST', '5'))
+COHERE_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv('COHERE_RATE_LIMIT_MAX_WAIT_SECONDS', '60'))
+# How often each process adds its wait-time stats to the shared stats document
+COHERE_RATE_LIMIT_STATS_FLUSH_SECONDS = float(os.getenv('COHERE_RATE_LIMIT_STATS_FLUSH_SECONDS', '30'))
+# Retries of 429/5xx responses with exponential backoff and jitter
+COHERE_MAX_RETRIES = int(os.getenv('COHERE_MAX_RETRIES', '3'))
+COHERE_RETRY_BASE_DELAY_SECONDS = float(os.getenv('COHERE_RETRY_BASE_DELAY_SECONDS', '1'))
+COHERE_RETRY_MAX_DELAY_SECONDS = float(os.getenv('COHERE_RETRY_MAX_DELAY_SECONDS', '30'))
+
+
+# CV Extraction Job Queue
+# Uploads are queued in MongoDB and processed by `manage.py run_extraction_worker`
+EXTRACTION_JOB_MAX_ATTEMPTS = int(os.getenv('EXTRACTION_JOB_MAX_ATTEMPTS', '3'))
+EXTRACTION_JOB_LEASE_SECONDS = int(os.getenv('EXTRACTION_JOB_LEASE_SECONDS', '300'))
+EXTRACTION_JOB_RETRY_DELAY_SECONDS = int(os.getenv('EXTRACTION_JOB_RETRY_DELAY_SECONDS', '10'))
+EXTRACTION_WORKER_CONCURRENCY = int(os.getenv('EXTRACTION_WORKER_CONCURRENCY', '2'))
+EXTRACTION_WORKER_POLL_INTERVAL = float(os.getenv('EXTRACTION_WORKER_POLL_INTERVAL', '2'))
+
+# CV Extraction Cache
+# Extraction results are reused for identical files / identical CV text
+EXTRACTION_CACHE_ENABLED = os.getenv('EXTRACTION_CACHE_ENABLED', 'True').lower() == 'true'
+EXTRACTION_CACHE_TTL_SECONDS = int(os.getenv('EXTRACTION_CACHE_TTL_SECONDS', str(30 * 24 * 60 * 60)))
+EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv('EXTRACTION_CACHE_MAX_ENTRIES', '5000'))
+# How often each process checks the entry count against EXTRACTION_CACHE_MAX_ENTRIES
+EXTRACTION_CACHE_EVICT_INTERVAL_SECONDS = float(os.getenv('EXTRACTION_CACHE_EVICT_INTERVAL_SECONDS', '300'))
+
+# CV Text Extraction Budgets
+# Parsing stops once the prompt budget is filled; larger files are rejected
+EXTRACTION_MAX_FILE_BYTES = int(os.getenv('EXTRACTION_MAX_FILE_BYTES', str(10 * 1024 * 1024)))
+EXTRACTION_MAX_TEXT_CHARS = int(os.getenv('EXTRACTION_MAX_TEXT_CHARS', '30000'))
+EXTRACTION_MAX_PDF_PAGES = int(os.getenv('EXTRACTION_MAX_PDF_PAGES', '20'))
+EXTRACTION_PARSE_CPU_SECONDS = float(os.getenv('EXTRACTION_PARSE_CPU_SECONDS', '10'))
+
+# CV Parsing Pool
+# PDF/DOCX parsing runs in child processes so it does not hold the web worker's GIL
+EXTRACTION_PARSE_POOL_ENABLED = os.getenv('EXTRACTION_PARSE_POOL_ENABLED', 'True').lower() == 'true'
+EXTRACTION_PARSE_POOL_SIZE = int(os.getenv('EXTRACTION_PARSE_POOL_SIZE', '2'))
+EXTRACTION_PARSE_POOL_MAX_TASKS_PER_CHILD = int(os.getenv('EXTRACTION_PARSE_POOL_MAX_TASKS_PER_CHILD', '50'))
+EXTRACTION_PARSE_TIMEOUT_SECONDS = float(os.getenv('EXTRACTION_PARSE_TIMEOUT_SECONDS', '30'))
+# PDFs longer than this have their remaining pages parsed in parallel ranges of
+# EXTRACTION_PARSE_PAGES_PER_TASK pages (each range re-reads the file)
+EXTRACTION_PARSE_SPLIT_MIN_PAGES = int(os.getenv('EXTRACTION_PARSE_SPLIT_MIN_PAGES', '20'))
+EXTRACTION_PARSE_PAGES_PER_TASK = int(os.getenv('EXTRACTION_PARSE_PAGES_PER_TASK', '10'))
+
+# Prompt Compaction
+# Extracted text is cleaned and trimmed to this estimated token budget before the Cohere call
+EXTRACTION_PROMPT_COMPACTION_ENABLED = os.getenv('EXTRACTION_PROMPT_COMPACTION_ENABLED', 'True').lower() == 'true'
+EXTRACTION_PROMPT_TOKEN_BUDGET = int(os.getenv('EXTRACTION_PROMPT_TOKEN_BUDGET', '4000'))
+
+# Local Extraction
+# Email, phone, GPA and major are parsed with regexes and left out of the Cohere prompt.
+# Offline mode: 'auto' falls back to local extraction when Cohere fails (profile flagged
+# needs_enrichment), 'always' never calls Cohere, 'never' surfaces Cohere errors
+EXTRACTION_LOCAL_FAST_PATH_ENABLED = os.getenv('EXTRACTION_LOCAL_FAST_PATH_ENABLED', 'True').lower() == 'true'
+EXTRACTION_OFFLINE_MODE = os.getenv('EXTRACTION_OFFLINE_MODE', 'auto').lower()
+
+# Profile Listings
+# Keyset-paginated listings (company dashboard, student browse, compare); ?page_size= is capped at the max
+PROFILE_PAGE_SIZE = int(os.getenv('PROFILE_PAGE_SIZE', '20'))
+PROFILE_PAGE_SIZE_MAX = int(os.getenv('PROFILE_PAGE_SIZE_MAX', '100'))
+
+# Cache
+# Local memory by default; use a shared backend (file, Redis, Memcached) when running
+# several processes so profile cache invalidations reach all of them
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'cv-platform'),
+    }
+}
+
+# Profile Cache
+# get_cv_profile reads through the cache; every profile write/delete invalidates the entry
+PROFILE_CACHE_ENABLED = os.getenv('PROFILE_CACHE_ENABLED', 'True').lower() == 'true'
+PROFILE_CACHE_ALIAS = os.getenv('PROFILE_CACHE_ALIAS', 'default')
+PROFILE_CACHE_TTL_SECONDS = int(os.getenv('PROFILE_CACHE_TTL_SECONDS', '300'))
+
+# Skill Index
+# In-process skill -> profiles index used by the company skill filters; refreshed from
+# updated_at every REFRESH seconds and rebuilt (dropping deleted profiles) every REBUILD seconds.
+# Filters matching more than MAX_MATCHES profiles run on the MongoDB skills index instead.
+SKILL_INDEX_ENABLED = os.getenv('SKILL_INDEX_ENABLED', 'True').lower() == 'true'
+SKILL_INDEX_REFRESH_SECONDS = float(os.getenv('SKILL_INDEX_REFRESH_SECONDS', '10'))
+SKILL_INDEX_REBUILD_SECONDS = float(os.getenv('SKILL_INDEX_REBUILD_SECONDS', '3600'))
+SKILL_INDEX_MAX_MATCHES = int(os.getenv('SKILL_INDEX_MAX_MATCHES', '5000'))
+
+# Search Engine
+# In-process BM25 index over the profile text used to rank company searches, kept fresh like
+# the skill index. The other filters are applied first, then the best MAX_RESULTS matching
+# profiles are ranked; with the engine disabled or unavailable, searches use the MongoDB
+# text index unranked.
+SEARCH_ENGINE_ENABLED = os.getenv('SEARCH_ENGINE_ENABLED', 'True').lower() == 'true'
+SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv('SEARCH_INDEX_REFRESH_SECONDS', '10'))
+SEARCH_INDEX_REBUILD_SECONDS = float(os.getenv('SEARCH_INDEX_REBUILD_SECONDS', '3600'))
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', '500'))
+
+# Candidate Ranking
+# In-process NumPy columns of the scoring features used by "rank all candidates" on the company
+# dashboard; refreshed and rebuilt like the skill index. Disabled, the dashboard lists by date.
+RANKING_ENABLED = os.getenv('RANKING_ENABLED', 'True').lower() == 'true'
+RANKING_INDEX_REFRESH_SECONDS = float(os.getenv('RANKING_INDEX_REFRESH_SECONDS', '10'))
+RANKING_INDEX_REBUILD_SECONDS = float(os.getenv('RANKING_INDEX_REBUILD_SECONDS', '3600'))
 
+# Job Matching
+# TF-IDF matrix of the profiles' skills, summary and experience used to shortlist students for a
+# pasted job description; refreshed and rebuilt like the skill index and saved to INDEX_DIR so a
+# starting process memory-maps it instead of re-reading every profile.
+JOB_MATCHING_ENABLED = os.getenv('JOB_MATCHING_ENABLED', 'True').lower() == 'true'
+JOB_MATCHING_INDEX_DIR = os.getenv('JOB_MATCHING_INDEX_DIR', str(BASE_DIR / 'job_matching_index'))
+JOB_MATCHING_REFRESH_SECONDS = float(os.getenv('JOB_MATCHING_REFRESH_SECONDS', '10'))
+JOB_MATCHING_REBUILD_SECONDS = float(os.getenv('JOB_MATCHING_REBUILD_SECONDS', '3600'))
+JOB_MATCHING_SHORTLIST_SIZE = int(os.getenv('JOB_MATCHING_SHORTLIST_SIZE', '20'))